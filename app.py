@@ -1,10 +1,17 @@
 print("Starting app.py...")
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response
+import json
 import os
+import threading
 print("Importing main...")
 import main
 print("Importing config...")
 import config
+from scraper.driver_pool import get_pool
+from utils.job_queue import JobQueue
+from utils import tracing
+from utils.file_manager import format_of, iter_csv, iter_gzip, parquet_available, resolve_format
+from utils.lead_store import get_lead_store
 
 print("Initializing Flask app...")
 app = Flask(__name__)
@@ -13,9 +20,41 @@ OUTPUT_DIR = "output"
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
 
+def warm_driver_pool():
+    try:
+        get_pool().warm()
+    except Exception as e:
+        print(f"Failed to warm driver pool: {e}")
+
+job_queue = JobQueue(main.run_scraper)
+_started = False
+_start_lock = threading.Lock()
+
+def start_background():
+    """
+    Starts the job workers and the driver pool warm-up once per serving
+    process: from __main__ under `python app.py`, on the first request
+    under gunicorn. Not at import, because spawned Maps worker processes
+    re-import this module as __mp_main__ and must not start either.
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    if config.DRIVER_POOL_WARM_ON_START:
+        threading.Thread(target=warm_driver_pool, daemon=True).start()
+    job_queue.start()
+
+@app.before_request
+def ensure_background():
+    if not _started:
+        start_background()
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    # Parquet is only offered when pyarrow is installed (it is not in requirements.txt)
+    return render_template('index.html', parquet_available=parquet_available())
 
 @app.route('/scrape', methods=['POST'])
 def scrape():
@@ -23,45 +62,153 @@ def scrape():
     city = data.get('city')
     query = data.get('query') # Optional override
     max_leads = data.get('max_leads')
+    resume = data.get('resume') # Run ID of a crashed run to continue
+    harvest_mode = data.get('harvest_mode') # "click" or "network"; HARVEST_MODE when omitted
+    tiles = bool(data.get('tiles')) # Search the city tile by tile (max_leads then caps the whole city)
+    output_format = data.get('format') # "csv", "csv.gz", "jsonl" or "parquet"; OUTPUT_FORMAT when omitted
 
-    if not city:
+    if not city and not resume:
         return jsonify({"status": "error", "message": "City is required"}), 400
+    if harvest_mode not in (None, "", "click", "network"):
+        return jsonify({"status": "error", "message": "harvest_mode must be 'click' or 'network'"}), 400
+    try:
+        output_format = resolve_format(output_format or None)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
     query_list = [query] if query else None
 
-    # Run the scraper
-    # Note: This is blocking. In production, use Celery/Redis.
-    try:
-        result = main.run_scraper(city, query_list=query_list, max_leads=max_leads)
-        
+    # Queue the scrape; a background worker runs it and the client polls or streams progress
+    params = {"city": city, "query_list": query_list, "max_leads": max_leads, "harvest_mode": harvest_mode or None,
+              "tiles": tiles, "output_format": output_format}
+    if resume:
+        params = {"resume": resume}
+    job_id = job_queue.submit(params)
+    return jsonify({"status": "queued", "job_id": job_id}), 202
+
+def job_response(job):
+    """
+    Shapes a job for the API; finished jobs carry the same fields the
+    blocking /scrape used to return.
+    """
+    response = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+    }
+    result = job["result"]
+    if job["status"] == "finished" and result:
         if result['success']:
-            return jsonify({
-                "status": "success", 
+            response["result"] = {
+                "status": "success",
+                "run_id": result.get('run_id'),
                 "filename": result['filename'],
                 "summary": {
                     "total_leads": result['total_leads'],
                     "message": result['message']
                 }
-            })
+            }
         else:
-             return jsonify({
-                "status": "warning", 
-                "message": result['message']
-            })
+            response["result"] = {"status": "warning", "message": result['message']}
+    elif job["status"] == "failed":
+        response["result"] = {"status": "error", "message": job["error"]}
+    return response
 
-    except Exception as e:
-        print(f"Scraping error: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify(job_response(job))
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    if not job_queue.get(job_id):
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+
+    def stream():
+        for job in job_queue.events(job_id, max_seconds=config.JOB_EVENTS_MAX_SECONDS):
+            yield f"data: {json.dumps(job_response(job))}\n\n"
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route('/pool')
+def pool_stats():
+    return jsonify(get_pool().stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    # Counters and stage timings of every run this process has done
+    return Response(tracing.metrics.render(), mimetype="text/plain; version=0.0.4")
+
+def lead_filters(args):
+    """
+    Lead store filters from the query string; raises ValueError on bad values.
+    """
+    filters = {name: args.get(name) or None for name in ("city", "state", "domain", "run_id")}
+    if args.get("min_score"):
+        filters["min_score"] = float(args["min_score"])
+    if args.get("since"):
+        filters["since"] = float(args["since"]) # Unix timestamp
+    if args.get("has_email"):
+        filters["has_email"] = args["has_email"].lower() in ("1", "true", "yes")
+    return filters
+
+@app.route('/leads')
+def list_leads():
+    # Pages through every stored lead: ?city=&state=&min_score=&has_email=&domain=&since=&run_id=&limit=&cursor=
+    store = get_lead_store()
+    if store is None:
+        return jsonify({"status": "error", "message": "Lead store is disabled"}), 404
+    try:
+        filters = lead_filters(request.args)
+        limit = int(request.args.get("limit") or config.LEAD_PAGE_SIZE)
+        if not 1 <= limit <= config.LEAD_PAGE_MAX:
+            raise ValueError(f"limit must be between 1 and {config.LEAD_PAGE_MAX}")
+        leads, next_cursor = store.query(cursor=request.args.get("cursor"), limit=limit, **filters)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"leads": leads, "count": len(leads), "next_cursor": next_cursor})
+
+@app.route('/leads/export.csv')
+def export_leads():
+    # The same filters as /leads, every match as one streamed CSV
+    store = get_lead_store()
+    if store is None:
+        return jsonify({"status": "error", "message": "Lead store is disabled"}), 404
+    try:
+        filters = lead_filters(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    response = Response(iter_csv(store.iter_leads(**filters)), mimetype="text/csv")
+    response.headers["Content-Disposition"] = "attachment; filename=leads_export.csv"
+    return response
 
 @app.route('/download/<filename>')
 def download_file(filename):
     # Security check: ensure filename is just a name, not a path
     if '/' in filename or '\\' in filename:
          return "Invalid filename", 400
-    try:
-        return send_from_directory(OUTPUT_DIR, filename, as_attachment=True)
-    except FileNotFoundError:
+    path = os.path.join(OUTPUT_DIR, filename)
+    if not os.path.isfile(path):
         return "File not found", 404
 
+    # Text outputs are gzipped on the fly for clients that accept it. Range requests and
+    # already compressed formats get the stored bytes (send_from_directory handles Range/ETag)
+    if format_of(filename) in ("csv", "jsonl") and not request.range and request.accept_encodings["gzip"]:
+        mimetype = "text/csv" if format_of(filename) == "csv" else "application/x-ndjson"
+        response = Response(iter_gzip(path), mimetype=mimetype)
+        response.headers["Content-Encoding"] = "gzip"
+        response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    else:
+        mimetype = {"csv.gz": "application/gzip", "parquet": "application/vnd.apache.parquet"}.get(format_of(filename))
+        response = send_from_directory(os.path.abspath(OUTPUT_DIR), filename, as_attachment=True, conditional=True,
+                                       mimetype=mimetype)
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
 if __name__ == '__main__':
+    # The debug reloader runs this file twice; only its child process serves requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background()
     app.run(debug=True, port=5002)
@@ -0,0 +1,248 @@
+# batch.py
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import config
+from main import run_scraper
+from utils.file_manager import setup_output_dir, get_lead_writer, iter_lead_rows, output_filename, output_stem, resolve_format
+from utils.journal import RunJournal
+from utils.rate_limit import shared_limiters, install_shared_limiters, rate_limit_stats
+
+def load_cities(path):
+    """
+    Reads a batch file into [(city, queries or None)].
+    Text files hold one city per line, optionally followed by "|" and
+    ";"-separated query overrides:
+        Austin, TX
+        Boise, ID | Orthodontist near {city}; Dentist near {city}
+    JSON files hold a list of city names or {"city": ..., "queries": [...]} objects.
+    Blank lines, "#" comments and repeated cities are skipped.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            entries = []
+            for item in json.load(f):
+                if isinstance(item, str):
+                    entries.append((item, None))
+                else:
+                    entries.append((item["city"], item.get("queries") or None))
+        else:
+            entries = []
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                city, _, queries = line.partition("|")
+                queries = [q.strip() for q in queries.split(";") if q.strip()]
+                entries.append((city.strip(), queries or None))
+
+    cities = []
+    seen = set()
+    for city, queries in entries:
+        if city and city.lower() not in seen:
+            seen.add(city.lower())
+            cities.append((city, queries))
+    return cities
+
+def slugify(text):
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_")
+
+def city_filename(batch_id, city, fmt=None):
+    # Fixed per batch and city, so a rerun finds the city's journal again
+    return output_filename(f"leads_{batch_id}_{slugify(city)}", fmt)
+
+def city_state(filename):
+    """
+    "new", "partial" (a journal without a result) or "finished", plus the
+    finished run's result.
+    """
+    journal = RunJournal(output_stem(filename))
+    if not journal.exists():
+        return "new", None
+    state = journal.load()
+    if state.result is None:
+        return "partial", None
+    return "finished", state.result
+
+def run_city(city, queries, filename, max_leads=None, harvest_mode=None, tiles=False):
+    """
+    Scrapes one city in a worker process, resuming its journal when an
+    earlier batch run was interrupted. Returns (result, seconds, this
+    city's rate limiter calls and waits).
+    """
+    start = time.time()
+    limits_before = rate_limit_stats()
+    run_id = output_stem(filename)
+    if RunJournal(run_id).exists():
+        result = run_scraper(resume=run_id)
+    else:
+        # The batch pool is the parallelism; each city runs its queries in one browser
+        result = run_scraper(city, queries, max_leads=max_leads, workers=1, harvest_mode=harvest_mode,
+                             filename=filename, tiles=tiles)
+    return result, time.time() - start, rate_limit_delta(limits_before, rate_limit_stats())
+
+def rate_limit_delta(before, after):
+    # A worker process runs several cities, and its limiter counters cover all of them
+    delta = {}
+    for name, stats in after.items():
+        previous = before.get(name, {})
+        delta[name] = {"per_minute": stats["per_minute"],
+                       "calls": stats["calls"] - previous.get("calls", 0),
+                       "waited_s": round(stats["waited_s"] - previous.get("waited_s", 0.0), 1)}
+    return delta
+
+def add_rate_limits(total, limits):
+    for name, stats in limits.items():
+        entry = total.setdefault(name, {"per_minute": stats["per_minute"], "calls": 0, "waited_s": 0.0})
+        entry["calls"] += stats["calls"]
+        entry["waited_s"] = round(entry["waited_s"] + stats["waited_s"], 1)
+    return total
+
+def combine_outputs(cities, filename):
+    """
+    Streams the per-city outputs (in batch order, any format) into one
+    file in the format of `filename`, dropping rows repeated across
+    cities. Returns the row count.
+    """
+    path = os.path.join(config.OUTPUT_DIR, filename)
+    if os.path.isfile(path):
+        os.remove(path)
+    seen = set()
+    with get_lead_writer(filename) as writer:
+        for city in cities:
+            if not city.get("filename"):
+                continue
+            city_path = os.path.join(config.OUTPUT_DIR, city["filename"])
+            if not os.path.isfile(city_path):
+                continue
+            for row in iter_lead_rows(city_path):
+                key = tuple(sorted((k, str(v)) for k, v in row.items()))
+                if key in seen:
+                    continue
+                seen.add(key)
+                writer.write(row)
+    return writer.count
+
+def run_batch(path, batch_id=None, workers=None, output=None, max_leads=None, harvest_mode=None,
+              maps_rate=None, fetch_rate=None, tiles=False, output_format=None):
+    """
+    Scrapes every city of a batch file, BATCH_WORKERS cities at a time in
+    separate processes. All workers share one Maps rate limit and one
+    website-fetch rate limit (MAPS_RATE_PER_MINUTE / FETCH_RATE_PER_MINUTE
+    unless overridden). Cities a previous run of the same batch finished
+    are skipped; interrupted ones resume from their journal.
+    output "city" keeps one file per city; "combined" also merges them into
+    one leads_<batch_id> file. tiles=True searches every city tile by tile (see
+    scraper.tiling). output_format (OUTPUT_FORMAT by default) applies to
+    every file written. Writes <batch_id>.batch.json and returns the summary.
+    """
+    batch_id = batch_id or slugify(os.path.splitext(os.path.basename(path))[0])
+    workers = workers or config.BATCH_WORKERS
+    output = output or config.BATCH_OUTPUT
+    output_format = resolve_format(output_format)
+    cities = load_cities(path)
+    print(f"--- Batch {batch_id}: {len(cities)} cities, {workers} workers ---")
+
+    results = []
+    tasks = []
+    for city, queries in cities:
+        filename = city_filename(batch_id, city, output_format)
+        entry = {"city": city, "queries": queries, "filename": None, "leads": 0, "seconds": 0.0}
+        status, result = city_state(filename)
+        if status == "finished":
+            print(f"Skipping finished city: {city}")
+            entry.update(status="skipped", filename=result.get("filename"), leads=result.get("total_leads", 0),
+                         message=result.get("message"))
+        else:
+            entry["status"] = "resumed" if status == "partial" else "pending"
+            tasks.append((entry, filename))
+        results.append(entry)
+
+    rates = {}
+    if maps_rate is not None:
+        rates["maps"] = maps_rate
+    if fetch_rate is not None:
+        rates["web"] = fetch_rate
+
+    start = time.time()
+    # The limiters count calls in the city worker processes, so each city reports its own
+    rate_limits = {}
+    if tasks:
+        # spawn: forked workers would inherit this process's browser pool and HTTP sockets
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context,
+                                 initializer=install_shared_limiters,
+                                 initargs=(shared_limiters(context, rates),)) as executor:
+            futures = {
+                executor.submit(run_city, entry["city"], entry["queries"], filename, max_leads, harvest_mode,
+                                tiles): entry
+                for entry, filename in tasks
+            }
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    result, seconds, limits = future.result()
+                    add_rate_limits(rate_limits, limits)
+                    entry.update(status="finished", filename=result.get("filename"),
+                                 leads=result.get("total_leads", 0), message=result.get("message"),
+                                 seconds=round(seconds, 1))
+                except Exception as e:
+                    print(f"City failed: {entry['city']}: {e}")
+                    entry.update(status="failed", message=str(e))
+                done = sum(1 for r in results if r["status"] in ("finished", "skipped", "failed"))
+                print(f"Batch progress: {done}/{len(results)} cities ({entry['city']}: {entry['status']})")
+
+    summary = {
+        "batch_id": batch_id,
+        "cities": len(results),
+        "finished": sum(1 for r in results if r["status"] == "finished"),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "total_leads": sum(r["leads"] for r in results),
+        "seconds": round(time.time() - start, 1),
+        "rate_limits": rate_limits,
+        "output": output,
+        "combined_file": None,
+        "results": results,
+    }
+    if output == "combined":
+        combined = output_filename(f"leads_{batch_id}", output_format)
+        summary["combined_leads"] = combine_outputs(results, combined)
+        summary["combined_file"] = combined
+        print(f"Combined {summary['combined_leads']} leads into {combined}")
+
+    setup_output_dir()
+    summary_path = os.path.join(config.OUTPUT_DIR, f"{batch_id}.batch.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"Batch {batch_id}: {summary['finished']} finished, {summary['skipped']} skipped, "
+          f"{summary['failed']} failed, {summary['total_leads']} leads in {summary['seconds']:.0f}s")
+    print(f"Batch summary: {summary_path}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape every city of a batch file")
+    parser.add_argument("cities", help="Text file (one city per line, optional '| query; query') or JSON list")
+    parser.add_argument("--batch-id", help="Names the outputs; defaults to the file name. Reuse it to skip finished cities")
+    parser.add_argument("--workers", type=int, help="Cities scraped at the same time")
+    parser.add_argument("--output", choices=["city", "combined"], help="One CSV per city, or also one merged CSV")
+    parser.add_argument("--max-leads", type=int, help="Leads per query")
+    parser.add_argument("--harvest-mode", choices=["click", "network"])
+    parser.add_argument("--format", choices=["csv", "csv.gz", "jsonl", "parquet"], help="Output file format")
+    parser.add_argument("--tiles", action="store_true", help="Search each city tile by tile (see main.py --tiles)")
+    parser.add_argument("--maps-rate", type=float, help="Maps actions per minute across all workers (0 = unlimited)")
+    parser.add_argument("--fetch-rate", type=float, help="Website fetches per minute across all workers (0 = unlimited)")
+    args = parser.parse_args()
+
+    run_batch(args.cities, batch_id=args.batch_id, workers=args.workers, output=args.output,
+              max_leads=args.max_leads, harvest_mode=args.harvest_mode,
+              maps_rate=args.maps_rate, fetch_rate=args.fetch_rate, tiles=args.tiles,
+              output_format=args.format)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_enrichment.py
+"""
+Measures website enrichment throughput (leads/minute) at several
+concurrency levels against a local stub HTTP server.
+
+Usage: python -m benchmarks.bench_enrichment [--leads 60] [--delay 0.3]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from scraper.enrichment import EnrichmentEngine
+
+# Measure real fetches, not cache hits
+config.HTTP_CACHE_ENABLED = False
+
+STUB_PAGE = b"""<html><head><meta name="viewport" content="width=device-width">
+<title>Smile Dental</title></head><body>
+<p>Call us at (555) 123-4567 or email frontdesk@smiledental.example</p>
+<a href="https://www.facebook.com/smiledental">Facebook</a>
+<p>Request appointment today. &copy; 2016 Smile Dental</p>
+</body></html>"""
+
+def start_stub_server(delay):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay) # Simulate a slow dentist site
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(STUB_PAGE)))
+            self.end_headers()
+            self.wfile.write(STUB_PAGE)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def make_leads(port, count, domains):
+    # Distinct loopback addresses stand in for distinct hosts
+    return [
+        {
+            "Business Name": f"Stub Dental {i}",
+            "Website": f"http://127.0.0.{(i % domains) + 1}:{port}/",
+            "Phone": "(555) 000-0000",
+        }
+        for i in range(count)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Enrichment throughput benchmark")
+    parser.add_argument("--leads", type=int, default=60)
+    parser.add_argument("--delay", type=float, default=0.3, help="Stub server response delay in seconds")
+    parser.add_argument("--domains", type=int, default=10)
+    parser.add_argument("--per-domain", type=int, default=2)
+    parser.add_argument("--levels", type=str, default="1,4,8,16,32")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.delay)
+    port = server.server_address[1]
+
+    print(f"{'concurrency':>11} {'seconds':>8} {'leads/min':>10}")
+    try:
+        for level in [int(x) for x in args.levels.split(",")]:
+            engine = EnrichmentEngine(concurrency=level, per_domain=args.per_domain, timeout=10)
+            leads = make_leads(port, args.leads, args.domains)
+            start = time.perf_counter()
+            # Silence per-lead prints from the engine
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull, "w")
+            try:
+                enriched = engine.enrich(leads)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            elapsed = time.perf_counter() - start
+            assert all(lead["Email"] for lead in enriched)
+            print(f"{level:>11} {elapsed:>8.2f} {len(enriched) / elapsed * 60:>10.0f}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+# benchmarks/bench_offline.py
+"""
+End-to-end offline benchmark. A local HTTP server stands in for Google
+Maps (saved search page, feed and place panel HTML in corpus/maps) and for
+the dentists' websites (corpus/websites), and each pipeline stage is run
+against it:
+
+    maps            MapsScraper search + iter_leads (skipped without Chrome)
+    analyze_website website fetch and analysis through EnrichmentEngine
+    quality_score   calculate_quality_score on freshly parsed pages
+    filter_leads    keyword and score filtering
+    save_to_csv     CSV output
+
+For every stage it reports leads/min, p50/p95 latency per item and peak
+RSS of this process and its children (Chrome), and writes everything to a
+JSON file so runs can be compared between commits. The maps stage also
+reads every clicked place panel both ways, the old per-field
+find_element path and the single EXTRACT_DETAILS_JS call, and reports
+the per-lead extraction latency of each.
+
+Usage: python -m benchmarks.bench_offline [--leads 40] [--output results.json]
+"""
+import argparse
+import contextlib
+import html
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from string import Template
+from urllib.parse import urlparse, parse_qs
+from selenium.webdriver.common.by import By
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+
+# Measure real work: no cache hits, no cross-run skips, no politeness floor
+config.HTTP_CACHE_ENABLED = False
+config.LEAD_INDEX_ENABLED = False
+
+from scraper.driver_pool import create_driver, process_tree_rss_mb
+from scraper.enrichment import EnrichmentEngine
+from scraper.maps_scraper import MapsScraper
+from scraper.website_scraper import Page, analyze_website
+from utils.quality_score import calculate_quality_score
+from utils.file_manager import save_to_csv
+from utils.keyword_filter import get_skip_matcher
+import main
+
+CORPUS_DIR = os.path.join(ROOT, "benchmarks", "corpus")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+FEED_PAGE_SIZE = 7
+
+def load_corpus():
+    maps_dir = os.path.join(CORPUS_DIR, "maps")
+    corpus = {"templates": {}, "sites": []}
+    for name in ("search", "feed_item", "place_panel"):
+        with open(os.path.join(maps_dir, f"{name}.html"), encoding="utf-8") as f:
+            corpus["templates"][name] = f.read()
+    with open(os.path.join(maps_dir, "places.json"), encoding="utf-8") as f:
+        corpus["places"] = json.load(f)
+
+    sites_dir = os.path.join(CORPUS_DIR, "websites")
+    for name in sorted(os.listdir(sites_dir)):
+        if name.endswith(".html"):
+            with open(os.path.join(sites_dir, name), "rb") as f:
+                corpus["sites"].append(f.read())
+    return corpus
+
+def place_id(index):
+    return f"0x8085800000000000:0x{index + 1:016x}"
+
+def website_url(base_url, index, places):
+    if not places[index]["has_website"]:
+        return ""
+    return f"{base_url}/sites/{index}/"
+
+def place_array(place, index, website):
+    # Same positions scraper.maps_network reads from real search payloads
+    array = [None] * 179
+    array[4] = [None] * 7 + [float(place["rating"]), int(place["reviews"])]
+    array[7] = [website] if website else None
+    array[10] = place_id(index)
+    array[11] = place["name"]
+    array[13] = [place["category"]]
+    array[39] = place["address"]
+    array[178] = [[place["phone"]]]
+    return array
+
+def start_server(corpus, maps_delay, site_delay):
+    """
+    Serves the Maps stand-in under /maps (plus its /search?tbm=map payloads)
+    and one website per place under /sites/<index>/ (pages from
+    corpus/websites, reused round robin).
+    """
+    places = corpus["places"]
+    templates = corpus["templates"]
+
+    class Handler(BaseHTTPRequestHandler):
+        def send_body(self, status, body, content_type="text/html; charset=utf-8"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def place_fields(self, index):
+            place = places[index]
+            base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+            website = website_url(base_url, index, places)
+            fields = {k: html.escape(str(v)) for k, v in place.items()}
+            fields["place_id"] = place_id(index)
+            fields["slug"] = place["name"].replace(" ", "+")
+            fields["website_link"] = (
+                f'<a data-item-id="authority" aria-label="Website: {website}" href="{website}">Website</a>'
+                if website else ""
+            )
+            fields["phone_button"] = (
+                f'<button data-item-id="phone:tel:{place["phone"]}" aria-label="Phone: {place["phone"]}">'
+                f'<div class="Io6YTe">{place["phone"]}</div></button>'
+            )
+            return fields
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path == "/maps":
+                self.send_body(200, templates["search"].encode())
+            elif url.path == "/maps/feed":
+                time.sleep(maps_delay)
+                offset = int(params.get("offset", ["0"])[0])
+                items = [
+                    Template(templates["feed_item"]).substitute(self.place_fields(i))
+                    for i in range(offset, min(offset + FEED_PAGE_SIZE, len(places)))
+                ]
+                self.send_body(200, "".join(items).encode())
+            elif url.path == "/search":
+                time.sleep(maps_delay)
+                offset = int(params.get("offset", ["0"])[0])
+                base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+                results = [
+                    [None] * 14 + [place_array(places[i], i, website_url(base_url, i, places))]
+                    for i in range(offset, min(offset + FEED_PAGE_SIZE, len(places)))
+                ]
+                payload = ")]}'\n" + json.dumps([[params.get("q", [""])[0], results]])
+                self.send_body(200, payload.encode(), "application/json; charset=utf-8")
+            elif url.path == "/maps/panel":
+                time.sleep(maps_delay)
+                ids = [place_id(i) for i in range(len(places))]
+                wanted = params.get("place", [""])[0]
+                if wanted not in ids:
+                    self.send_body(404, b"")
+                    return
+                panel = Template(templates["place_panel"]).substitute(self.place_fields(ids.index(wanted)))
+                self.send_body(200, panel.encode())
+            elif url.path.startswith("/sites/"):
+                time.sleep(site_delay)
+                try:
+                    index = int(url.path.split("/")[2])
+                except ValueError:
+                    self.send_body(404, b"")
+                    return
+                if url.path.rstrip("/") != f"/sites/{index}":
+                    self.send_body(404, b"") # Contact/about links of the saved pages
+                    return
+                self.send_body(200, corpus["sites"][index % len(corpus["sites"])])
+            else:
+                self.send_body(404, b"")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class RssSampler:
+    """
+    Samples the resident memory of this process tree (so Chrome counts
+    too) in the background and keeps the peak since the last reset.
+    """
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def sample(self):
+        rss = process_tree_rss_mb(os.getpid())
+        if rss is not None and rss > self.peak_mb:
+            self.peak_mb = rss
+
+    def reset(self):
+        self.peak_mb = 0.0
+        self.sample()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def percentile(values, pct):
+    # Nearest-rank percentile
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def stage_result(items, seconds, latencies, rss):
+    return {
+        "items": items,
+        "seconds": round(seconds, 3),
+        "leads_per_min": round(items / seconds * 60, 1) if seconds else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        "peak_rss_mb": round(rss.peak_mb, 1),
+    }
+
+@contextlib.contextmanager
+def quiet():
+    # The stages print per-lead progress; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def legacy_extract_fields(driver):
+    """
+    The place panel read as extract_details did before EXTRACT_DETAILS_JS:
+    one find_element (plus its fallback) per field, each a WebDriver round trip.
+    """
+    def safe_get(by, selector, attr=None):
+        try:
+            el = driver.find_element(by, selector)
+            return el.get_attribute(attr) if attr else el.text
+        except Exception:
+            return ""
+
+    return {
+        "website": safe_get(By.CSS_SELECTOR, 'a[data-item-id="authority"]', "href")
+        or safe_get(By.CSS_SELECTOR, 'a[aria-label^="Website:"]', "href"),
+        "phone": safe_get(By.CSS_SELECTOR, 'button[data-item-id^="phone"]')
+        or safe_get(By.CSS_SELECTOR, 'button[data-item-id^="phone"]', "aria-label"),
+        "address": safe_get(By.CSS_SELECTOR, 'button[data-item-id="address"]')
+        or safe_get(By.CSS_SELECTOR, 'button[data-item-id="address"]', "aria-label"),
+        "rating": safe_get(By.XPATH, '//span[@role="img" and contains(@aria-label, "stars")]', "aria-label"),
+        "reviews": safe_get(By.CSS_SELECTOR, 'span[role="img"][aria-label$="reviews"]', "aria-label")
+        or safe_get(By.CSS_SELECTOR, 'button[jsaction*="reviewChart"] span'),
+        "category": safe_get(By.CSS_SELECTOR, 'button[jsaction*="category"]'),
+    }
+
+class ComparingMapsScraper(MapsScraper):
+    """
+    MapsScraper that also reads each open place panel the legacy way, so
+    both extraction paths are timed on the same panels.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.legacy_timings = []
+
+    def extract_details(self):
+        details = super().extract_details()
+        start = time.perf_counter()
+        legacy_extract_fields(self.driver)
+        self.legacy_timings.append(time.perf_counter() - start)
+        return details
+
+def latency_stats(timings):
+    return {
+        "count": len(timings),
+        "p50_ms": round(percentile(timings, 50) * 1000, 3) if timings else None,
+        "p95_ms": round(percentile(timings, 95) * 1000, 3) if timings else None,
+    }
+
+def bench_maps(base_url, max_leads, harvest_mode, rss):
+    try:
+        driver = create_driver()
+    except Exception as e:
+        return {"skipped": f"Chrome unavailable: {str(e).splitlines()[0] if str(e) else type(e).__name__}"}, None
+
+    leads = []
+    latencies = []
+    try:
+        rss.reset()
+        maps_scraper = ComparingMapsScraper(driver=driver, harvest_mode=harvest_mode)
+        start = time.perf_counter()
+        with quiet():
+            maps_scraper.search("dentist near San Francisco")
+            last = time.perf_counter()
+            for lead in maps_scraper.iter_leads(max_leads):
+                now = time.perf_counter()
+                latencies.append(now - last)
+                last = now
+                leads.append(lead)
+        elapsed = time.perf_counter() - start
+        result = stage_result(len(leads), elapsed, latencies, rss)
+        result["clicks"] = maps_scraper.stats["clicks"]
+        result["keyword_skips"] = maps_scraper.stats["keyword_skips"]
+        result["harvest_mode"] = maps_scraper.harvest_mode
+        result["clicks_avoided_network"] = maps_scraper.stats["network_leads"]
+        result["waits"] = maps_scraper.waits.stats()
+        # Per-lead extract_details latency: old per-field lookups vs the one script call
+        result["extract"] = {
+            "per_field": latency_stats(maps_scraper.legacy_timings),
+            "single_script": latency_stats(maps_scraper.extract_timings),
+        }
+    finally:
+        driver.quit()
+    return result, leads
+
+def bench_websites(leads, concurrency, rss):
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def timed_analyze(url, timeout=None):
+        start = time.perf_counter()
+        try:
+            return analyze_website(url, timeout=timeout)
+        finally:
+            with latencies_lock:
+                latencies.append(time.perf_counter() - start)
+
+    engine = EnrichmentEngine(concurrency=concurrency, analyze=timed_analyze)
+    rss.reset()
+    start = time.perf_counter()
+    with quiet():
+        enriched = engine.enrich([dict(lead) for lead in leads])
+    elapsed = time.perf_counter() - start
+    result = stage_result(len(enriched), elapsed, latencies, rss)
+    result["concurrency"] = concurrency
+    return result, enriched
+
+def bench_quality_score(corpus, rounds, rss):
+    latencies = []
+    rss.reset()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for body in corpus["sites"]:
+            page = Page("https://bench.example/", "https://bench.example/", 200, {}, body.decode("utf-8"))
+            item_start = time.perf_counter()
+            calculate_quality_score(page)
+            latencies.append(time.perf_counter() - item_start)
+    return stage_result(len(latencies), time.perf_counter() - start, latencies, rss)
+
+def bench_filter(leads, rounds, rss):
+    latencies = []
+    rss.reset()
+    start = time.perf_counter()
+    with quiet():
+        for _ in range(rounds):
+            for lead in leads:
+                item_start = time.perf_counter()
+                main.filter_leads([lead])
+                latencies.append(time.perf_counter() - item_start)
+    result = stage_result(len(latencies), time.perf_counter() - start, latencies, rss)
+    with quiet():
+        result["kept"] = len(main.filter_leads(leads))
+    return result
+
+def bench_save(leads, rounds, rss):
+    latencies = []
+    output_dir = config.OUTPUT_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        config.OUTPUT_DIR = tmp
+        try:
+            rss.reset()
+            start = time.perf_counter()
+            with quiet():
+                for i in range(rounds):
+                    item_start = time.perf_counter()
+                    save_to_csv(leads, f"bench_{i}.csv")
+                    latencies.append((time.perf_counter() - item_start) / max(1, len(leads)))
+            elapsed = time.perf_counter() - start
+        finally:
+            config.OUTPUT_DIR = output_dir
+    return stage_result(len(leads) * rounds, elapsed, latencies, rss)
+
+def synthetic_leads(corpus, base_url, count):
+    """
+    Raw Maps leads straight from places.json, for when the Maps stage
+    cannot run.
+    """
+    places = corpus["places"]
+    leads = []
+    for i in range(count):
+        index = i % len(places)
+        place = places[index]
+        leads.append({
+            "Business Name": place["name"] if i < len(places) else f"{place['name']} #{i}",
+            "Website": website_url(base_url, index, places),
+            "Phone": place["phone"],
+            "Address": place["address"],
+            "Rating": place["rating"],
+            "Reviews": place["reviews"],
+            "Category": place["category"],
+        })
+    return leads
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--leads", type=int, default=40, help="Leads to harvest/enrich")
+    parser.add_argument("--rounds", type=int, default=20, help="Repetitions of the CPU-only stages")
+    parser.add_argument("--concurrency", type=int, default=config.ENRICH_CONCURRENCY)
+    parser.add_argument("--maps-delay", type=float, default=0.05, help="Seconds per feed/panel response")
+    parser.add_argument("--site-delay", type=float, default=0.1, help="Seconds per website response")
+    parser.add_argument("--no-maps", action="store_true", help="Skip the browser stage")
+    parser.add_argument("--harvest-mode", choices=["click", "network"], default=config.HARVEST_MODE)
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    config.POLITENESS_DELAY = 0
+    corpus = load_corpus()
+    server = start_server(corpus, args.maps_delay, args.site_delay)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    config.MAPS_URL = f"{base_url}/maps"
+    rss = RssSampler()
+
+    stages = {}
+    try:
+        leads = None
+        if args.no_maps:
+            stages["maps"] = {"skipped": "--no-maps"}
+        else:
+            # Chains on SKIP_KEYWORDS are never clicked, so only the rest can be found
+            eligible = sum(1 for p in corpus["places"] if not get_skip_matcher().match(p["name"]))
+            stages["maps"], leads = bench_maps(base_url, min(args.leads, eligible), args.harvest_mode, rss)
+        if not leads:
+            leads = synthetic_leads(corpus, base_url, args.leads)
+
+        stages["analyze_website"], enriched = bench_websites(leads, args.concurrency, rss)
+        stages["quality_score"] = bench_quality_score(corpus, args.rounds, rss)
+        stages["filter_leads"] = bench_filter(enriched, args.rounds, rss)
+        stages["save_to_csv"] = bench_save(enriched, args.rounds, rss)
+    finally:
+        rss.stop()
+        server.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": vars(args),
+        "stages": stages,
+    }
+
+    output = args.output
+    if not output:
+        if not os.path.exists(RESULTS_DIR):
+            os.makedirs(RESULTS_DIR)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{report['commit'] or 'nogit'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'stage':<16}{'items':>7}{'leads/min':>12}{'p50 ms':>10}{'p95 ms':>10}{'peak MB':>9}")
+    for name, stage in stages.items():
+        if "skipped" in stage:
+            print(f"{name:<16} skipped ({stage['skipped']})")
+            continue
+        print(f"{name:<16}{stage['items']:>7}{stage['leads_per_min']:>12}{stage['p50_ms']:>10}"
+              f"{stage['p95_ms']:>10}{stage['peak_rss_mb']:>9}")
+    extract = stages["maps"].get("extract")
+    if extract and extract["single_script"]["count"]:
+        print(f"extract_details per lead (p50/p95 ms): "
+              f"per-field {extract['per_field']['p50_ms']}/{extract['per_field']['p95_ms']}, "
+              f"single script {extract['single_script']['p50_ms']}/{extract['single_script']['p95_ms']}")
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,95 @@
+# benchmarks/bench_signals.py
+"""
+Compares per-page analysis cost of the old BeautifulSoup path (parse,
+serialize the tree twice, get_text, one regex per signal) with the
+single-pass signal scanner, over the saved pages in corpus/websites.
+Both paths must find the same signals on every page; pages where they
+differ are listed and the script exits non-zero.
+
+Usage: python -m benchmarks.bench_signals [--rounds 20]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from utils.signals import EMAIL_REGEX, PHONE_REGEX, MODERN_TECH_KEYWORDS, BOOKING_KEYWORDS, scan_signals
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "websites")
+
+def legacy_analyze(html):
+    """
+    The analysis as it was before utils.signals: every check walked or
+    re-serialized the parsed tree on its own.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    text = soup.get_text()
+    emails = set(re.findall(EMAIL_REGEX, text))
+    phones = {m.group(0) for m in re.finditer(PHONE_REGEX, text)}
+    links = [a["href"] for a in soup.find_all("a", href=True)]
+    has_viewport = soup.find("meta", attrs={"name": "viewport"}) is not None
+    html_str = str(soup).lower()
+    has_modern_tech = any(k in html_str for k in MODERN_TECH_KEYWORDS)
+    html_str = str(soup).lower()
+    years = [int(y) for y in re.findall(r"(?:copyright|©)\s*(20\d{2})", html_str)]
+    text_lower = text.lower()
+    has_booking = any(k in text_lower for k in BOOKING_KEYWORDS)
+    return has_viewport, has_modern_tech, max(years) if years else None, has_booking, emails, phones, links
+
+def single_pass_analyze(html):
+    s = scan_signals(html)
+    return s.has_viewport, s.has_modern_tech, s.copyright_year, s.has_booking, s.emails, s.phones, s.links
+
+SIGNAL_NAMES = ("viewport", "tech", "year", "booking", "emails", "phones", "links")
+
+def mismatches(html):
+    legacy = legacy_analyze(html)
+    scanned = single_pass_analyze(html)
+    return [name for name, old, new in zip(SIGNAL_NAMES, legacy, scanned) if old != new]
+
+def time_per_page(analyze, html, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        analyze(html)
+    return (time.perf_counter() - start) / rounds * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Signal scanner microbenchmark")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html")))
+    if not paths:
+        print(f"No pages found in {CORPUS_DIR}")
+        return
+
+    print(f"{'page':<28}{'KB':>7}{'legacy ms':>12}{'scan ms':>10}{'speedup':>9}  flags (viewport, tech, year, booking)")
+    legacy_total = scan_total = 0.0
+    differing = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        legacy_ms = time_per_page(legacy_analyze, html, args.rounds)
+        scan_ms = time_per_page(single_pass_analyze, html, args.rounds)
+        legacy_total += legacy_ms
+        scan_total += scan_ms
+        flags = single_pass_analyze(html)[:4]
+        differ = mismatches(html)
+        if differ:
+            differing[os.path.basename(path)] = differ
+        print(f"{os.path.basename(path):<28}{len(html) / 1024:>7.0f}{legacy_ms:>12.2f}{scan_ms:>10.2f}{legacy_ms / scan_ms:>8.1f}x  {flags}")
+
+    print(f"{'total':<35}{legacy_total:>12.2f}{scan_total:>10.2f}{legacy_total / scan_total:>8.1f}x")
+
+    for name, differ in differing.items():
+        print(f"MISMATCH {name}: {', '.join(differ)}")
+    if differing:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
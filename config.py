@@ -21,16 +21,119 @@ SKIP_KEYWORDS = [
 ]
 
 # Scraping settings
+MAPS_URL = "https://www.google.com/maps?hl=en"  # hl=en keeps labels/IDs in English
 MAX_LEADS_PER_RUN = 100
-SCROLL_PAUSE_TIME = 2  # Seconds
-ACTION_DELAY_MIN = 2
-ACTION_DELAY_MAX = 5
+MAPS_WORKERS = 1  # Browser sessions (worker processes) running queries in parallel
+HARVEST_MODE = "click"  # "click" opens every card; "network" reads leads from captured search responses
+NETWORK_CAPTURE_ENABLED = True  # Turn on the DevTools network log in Chrome (required for "network")
+NETWORK_REQUIRED_FIELDS = ("Address",)  # A captured lead missing one of these is clicked instead
+# Tiling (--tiles): search a city as a quadtree of map viewports to get past ~120 results per search
+TILE_START_LEVEL = 2  # A city without tile history starts as 4**level tiles (2 = a 4x4 grid)
+TILE_MAX_LEVEL = 5  # Deepest split (a level 5 tile is 1/32 of the bounding box on each side)
+TILE_SATURATION = 100  # A tile whose feed lists this many results is split into four
+TILE_SPARSE_CARDS = 20  # Four sibling tiles with fewer results than this in total are searched as one next run
+TILE_MAX_LEADS = 120  # Leads read per tile search
+TILE_HISTORY_DIR = "output/tiles"  # Per-city bounding box and leaf tiles from earlier tiled runs
+GEOCODE_URL = "https://nominatim.openstreetmap.org/search"  # City bounding boxes (OpenStreetMap Nominatim)
+GEOCODE_USER_AGENT = "google-maps-lead-scraper/1.0"  # Nominatim requires an identifying User-Agent
+MAPS_RATE_PER_MINUTE = 0  # Maps searches, card clicks and feed scrolls per minute across all workers; 0 = unlimited
+
+# Wait settings (waits end as soon as the page is ready)
+WAIT_TIMEOUT = 20  # Seconds for search box / results to appear
+PANEL_WAIT_TIMEOUT = 10  # Seconds for the place panel to show the clicked business
+SCROLL_WAIT_TIMEOUT = 6  # Seconds for new feed items after a scroll
+FEED_END_STALLS = 3  # Scrolls without the feed growing before the results list counts as finished
+CARD_CLICK_RETRIES = 1  # Times a card whose click or panel wait failed is returned by the feed again
+POLITENESS_DELAY = 0.5  # Minimum seconds each wait takes; 0 disables
+
+PIPELINE_QUEUE_SIZE = 20  # Leads buffered between pipeline stages before backpressure
+
+# Website enrichment settings
+ENRICH_CONCURRENCY = 8  # Websites fetched at the same time
+ENRICH_PER_DOMAIN = 2  # Max simultaneous fetches against one host
+ENRICH_TIMEOUT = 15  # Seconds, total deadline per website fetch
+FETCH_CONNECT_TIMEOUT = 5  # Seconds to establish the connection
+FETCH_READ_TIMEOUT = 10  # Seconds between received bytes
+FETCH_MAX_BYTES = 2 * 1024 * 1024  # Stop reading a page past this size
+FETCH_BODY_BYTES = 256 * 1024  # Body kept past </head>; beyond it only the page's tail is kept...
+FETCH_TAIL_BYTES = 64 * 1024  # ...this many last bytes, so the footer (copyright, contact email) is still scanned
+FETCH_RATE_PER_MINUTE = 0  # Website fetches per minute across all workers; 0 = unlimited
+
+# Shared HTTP client (keep-alive pool, DNS cache, retries) used for website fetches
+HTTP_POOL_HOSTS = 64  # Hosts with a keep-alive connection pool kept open
+HTTP_POOL_SIZE = 4  # Keep-alive connections kept per host
+HTTP_DNS_TTL = 300  # Seconds a host's resolved addresses are reused
+HTTP_RETRIES = 2  # Retries after connect errors, read errors and HTTP_RETRY_STATUSES
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+HTTP_BACKOFF_FACTOR = 0.5  # Backoff before retry n is factor * 2 ** (n - 1) seconds...
+HTTP_BACKOFF_JITTER = 0.5  # ...plus up to this many random seconds
+HTTP_BACKOFF_MAX = 8  # Seconds, longest backoff between retries
+HTTP_RETRY_AFTER_MAX = 10  # Seconds, longest Retry-After we honour
+
+# Contact crawl (follow contact/about links when the homepage has no email)
+CONTACT_CRAWL_ENABLED = True
+CONTACT_CRAWL_MAX_PAGES = 3  # Extra pages fetched per website
+CONTACT_CRAWL_MAX_BYTES = 512 * 1024  # Total bytes read across those pages
+CONTACT_CRAWL_CONCURRENCY = 2  # Pages of one website fetched at the same time
+
+# Cross-run lead index (skip businesses already scraped)
+LEAD_INDEX_ENABLED = True
+LEAD_INDEX_PATH = "output/lead_index.sqlite3"
+LEAD_REFRESH_DAYS = 30  # Re-scrape known leads older than this; None never refreshes
+
+# Lead store (every qualified lead of every run, queryable through /leads)
+LEAD_STORE_ENABLED = True
+LEAD_STORE_BACKEND = "sqlite"  # Only "sqlite" for now
+LEAD_STORE_PATH = "output/leads.sqlite3"
+LEAD_STORE_BATCH_SIZE = 50  # Leads upserted per transaction
+LEAD_PAGE_SIZE = 100  # Leads per /leads page when no limit is given
+LEAD_PAGE_MAX = 1000  # Largest limit /leads accepts
+
+# Website enrichment cache (reused across runs)
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_PATH = "output/http_cache.sqlite3"
+HTTP_CACHE_TTL = 7 * 24 * 3600  # Seconds before an entry is revalidated
+HTTP_CACHE_MAX_ENTRIES = 50000
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Stored results, not page bodies
+
+# Browser pool settings
+DRIVER_POOL_SIZE = 1  # Warm Chrome sessions kept per process
+DRIVER_MAX_PAGES = 50  # Recycle a browser after this many page loads
+DRIVER_MAX_RSS_MB = 1500  # Recycle a browser once its process tree uses this much RAM
+DRIVER_LEASE_TIMEOUT = 600  # Seconds a run waits for a free session
+DRIVER_POOL_WARM_ON_START = True  # Flask app starts the sessions in the background at boot (first request under gunicorn)
+BROWSER_PROFILE = "listings-only"  # "listings-only" blocks tiles, images, fonts, media and beacons; "full" blocks nothing
+BROWSER_BLOCKED_URLS = ()  # Extra DevTools URL patterns to block on top of the profile ("*" is a wildcard)
+BROWSER_DISK_CACHE_MB = 64  # Chrome disk cache cap per session
+BROWSER_JS_HEAP_MB = 512  # V8 heap cap per renderer (bounds the in-memory page state)
+BROWSER_RENDERER_LIMIT = 2  # Renderer processes one browser may start
+BROWSER_RSS_SAMPLE_SECONDS = 5  # How often a query samples its browser's memory for the peak RSS report
+
+# Background job settings (web app)
+JOB_BACKEND = "memory"  # "memory" (single process) or "sqlite" (shared across gunicorn workers)
+JOB_WORKERS = 1  # Scrape jobs running at the same time per process
+JOB_DB_PATH = "output/jobs.sqlite3"
+JOB_HEARTBEAT_SECONDS = 30  # How often a running job's updated_at is refreshed
+JOB_STALE_SECONDS = 120  # Running jobs without a heartbeat this long are marked failed when a queue starts
+JOB_EVENTS_MAX_SECONDS = 60  # An SSE stream ends after this long (it holds a sync worker); the page then polls
+
+# Batch mode (batch.py: many cities, one worker process per city at a time)
+BATCH_WORKERS = 2  # Cities scraped at the same time
+BATCH_OUTPUT = "city"  # "city" = one CSV per city; "combined" = also merge them into one CSV
 
 # Proxy settings (Placeholder)
 PROXY_LIST = [
     # "http://user:pass@ip:port",
 ]
 
+# Tracing (per-stage timings and counters; summary JSON next to each CSV, /metrics in the app)
+TRACING_ENABLED = True
+TRACE_SLOWEST_SPANS = 25  # Slowest spans kept with their lead/query/url in the summary
+
 # Output settings
 OUTPUT_DIR = "output"
 CSV_FILENAME = "leads.csv"
+OUTPUT_FORMAT = "csv"  # "csv", "csv.gz", "jsonl" or "parquet" (needs pyarrow)
+OUTPUT_CHUNK_ROWS = 500  # Rows per Parquet row group / between gzip flushes
+DOWNLOAD_CHUNK_BYTES = 64 * 1024  # Read size when streaming a download
+JOURNAL_DIR = "output/journals"  # Run journals used by --resume
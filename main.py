@@ -1,173 +1,374 @@
 print("Loading main.py...")
 import argparse
+import json
+import os
 import time
 import config
-print("Importing MapsScraper...")
-from scraper.maps_scraper import MapsScraper
-print("Importing analyze_website...")
-from scraper.website_scraper import analyze_website
-from utils.file_manager import save_to_csv, generate_summary
+print("Importing QueryExecutor...")
+from scraper.query_executor import QueryExecutor, expand_queries
+from scraper.driver_pool import get_pool
+from scraper.tiling import TileHarvester, tile_queries, city_bbox, parse_bbox
+print("Importing EnrichmentEngine...")
+from scraper.enrichment import EnrichmentEngine
+from scraper.website_scraper import fetch_stats
+from scraper.contact_crawler import crawl_stats
+from utils.http_client import http_stats
+from utils.file_manager import LeadSummary, setup_output_dir, get_lead_writer, resolve_format, output_filename, output_stem
+from utils.http_cache import get_cache
+from utils.lead_index import get_lead_index, lead_keys
+from utils.lead_store import get_lead_store, LeadStoreWriter
+from utils.us_states import address_state
+from utils.pipeline import buffered
+from utils.journal import RunJournal, JournalState
+from utils.keyword_filter import get_skip_matcher
+from utils import tracing
+
+def keep_lead(lead, matcher=None):
+    """
+    True if a lead passes SKIP_KEYWORDS and the Quality Score threshold.
+    Pass the run's get_skip_matcher() when filtering many leads.
+    """
+    # Check skip keywords
+    matcher = matcher or get_skip_matcher()
+    if matcher.match(lead.get("Business Name", "")):
+        print(f"Skipping (Keyword match): {lead['Business Name']}")
+        tracing.count("leads_skipped", reason="keyword")
+        return False
+    
+    # Check Quality Score
+    score = lead.get("Quality Score", 5) # Default to 5 if missing
+    if score < 8:
+        print(f"Skipping (Low Quality Score {score}): {lead['Business Name']}")
+        tracing.count("leads_skipped", reason="low_score")
+        return False
+        
+    return True
 
 def filter_leads(leads):
     """
     Filters leads based on SKIP_KEYWORDS and Quality Score.
     """
-    filtered_leads = []
-    
+    matcher = get_skip_matcher()
+    return [lead for lead in leads if keep_lead(lead, matcher)]
+
+def dedup_leads(leads, seen_names):
+    """
+    Drops leads without a name or whose name was already seen this run,
+    so a lead several queries return is only enriched once.
+    """
     for lead in leads:
-        name = lead.get("Business Name", "").lower()
-        
-        # Check skip keywords
-        skip = False
-        for keyword in config.SKIP_KEYWORDS:
-            if keyword.lower() in name:
-                skip = True
-                print(f"Skipping (Keyword match): {lead['Business Name']}")
-                break
-        if skip: continue
-        
-        # Check Quality Score
-        score = lead.get("Quality Score", 5) # Default to 5 if missing
-        if score < 8:
-            print(f"Skipping (Low Quality Score {score}): {lead['Business Name']}")
+        name = lead.get("Business Name")
+        if not name:
             continue
-            
-        filtered_leads.append(lead)
-        
-    return filtered_leads
+        if name in seen_names:
+            print(f"Skipping duplicate: {name}")
+            tracing.count("leads_skipped", reason="duplicate")
+            continue
+        seen_names.add(name)
+        yield lead
+
+def skip_blocked_leads(leads, counts, matcher):
+    """
+    Drops SKIP_KEYWORDS matches before their website is fetched.
+    """
+    for lead in leads:
+        if matcher.match(lead["Business Name"]):
+            print(f"Skipping (Keyword match): {lead['Business Name']}")
+            tracing.count("leads_skipped", reason="keyword")
+            if lead.get("Website"):
+                counts["fetches_saved"] += 1
+            continue
+        yield lead
 
-def run_scraper(city, query_list=None, max_leads=None):
+def skip_known_leads(leads, lead_index, counts, exempt_names=()):
+    """
+    Details (phone, address, website) can reveal a lead from an earlier
+    run that its feed card did not; those skip enrichment too.
+    """
+    for lead in leads:
+        if lead["Business Name"] not in exempt_names and lead_index.is_known(lead_keys(lead)):
+            print(f"Skipping known lead: {lead['Business Name']}")
+            tracing.count("leads_skipped", reason="known")
+            counts["enrichments_avoided"] += 1
+            continue
+        yield lead
+
+def run_scraper(city=None, query_list=None, max_leads=None, workers=None, progress=None, resume=None,
+                harvest_mode=None, filename=None, tiles=False, bbox=None, output_format=None):
     """
     Runs the scraper logic and returns the generated filename.
+    The run is a streaming pipeline: harvest -> dedup -> enrich -> filter -> write.
+    Stages are connected by bounded queues, and each qualifying lead is
+    written to the CSV as soon as it is finished.
+    Qualified leads are also upserted into the lead store (see
+    utils.lead_store), tagged with the run ID.
+    Every step is recorded in a run journal; pass resume=<run_id> to skip
+    the work a crashed run already did and rebuild the same CSV.
+    progress(**fields), when given, receives live counters
+    (queries_total, queries_done, leads_scraped, leads_enriched, leads_qualified).
+    harvest_mode ("click" or "network", HARVEST_MODE by default) picks how
+    Maps leads are read; see MapsScraper.
+    filename (leads_<city>_<timestamp> plus the output_format's extension
+    by default) also names the run and its journal. output_format is "csv",
+    "csv.gz", "jsonl" or "parquet" (OUTPUT_FORMAT by default); a given
+    filename's extension wins.
+    tiles=True searches the city as a quadtree of map viewports (see
+    scraper.tiling) within bbox (south, west, north, east; geocoded when
+    omitted); max_leads then caps the unique leads for the whole city.
     """
-    print(f"--- Starting Scraper for City: {city} ---")
-    
-    # Update config if max_leads is provided
-    original_max_leads = config.MAX_LEADS_PER_RUN
-    if max_leads:
-        config.MAX_LEADS_PER_RUN = int(max_leads)
+    def report(**fields):
+        if progress:
+            progress(**fields)
+
+    if resume:
+        journal = RunJournal(resume)
+        if not journal.exists():
+            raise ValueError(f"No journal found for run {resume}")
+        state = journal.load()
+        if state.result is not None:
+            print(f"Run {resume} already finished.")
+            return state.result
+        city = state.params["city"]
+        queries = state.params["queries"]
+        max_leads = state.params["max_leads"]
+        filename = state.params["filename"]
+        harvest_mode = state.params.get("harvest_mode")
+        tiles = state.params.get("tiles", False)
+        bbox = state.params.get("bbox")
+        print(f"--- Resuming run {resume} for City: {city} ---")
+    else:
+        if not city:
+            raise ValueError("City is required")
+        print(f"--- Starting Scraper for City: {city} ---")
         
-    maps_scraper = MapsScraper()
-    unique_leads = {}
-    
-    try:
         queries = config.SEARCH_QUERIES
         if query_list:
             queries = query_list
-            
-        for query_template in queries:
-            # Handle if template or direct string
-            if "{city}" in query_template:
-                query = query_template.format(city=city)
-            else:
-                query = query_template
-                
-            print(f"Running Query: {query}")
-            
-            maps_scraper.search(query)
-            leads = maps_scraper.get_leads()
-            print(f"Found {len(leads)} leads from Maps.")
-            
-            # Enrich with Website Data
-            print("Enriching leads with website data...")
-            for i, lead in enumerate(leads):
-                name = lead.get("Business Name")
-                if not name:
-                    continue
-                    
-                if name in unique_leads:
-                    print(f"Skipping duplicate: {name}")
-                    continue
-                
-                website = lead.get("Website")
-                if website:
-                    print(f"[{i+1}/{len(leads)}] Visiting {website}...")
-                    web_data = analyze_website(website)
-                    
-                    # Merge data
-                    lead.update(web_data)
-                else:
-                    lead["Quality Score"] = 10 # No website
-                    lead["Notes"] = "No Website listed on Maps."
-                
-                # Default empty fields if missing
-                for field in ["Email", "Instagram", "Facebook", "LinkedIn", "WhatsApp"]:
-                     if field not in lead: lead[field] = ""
-                     
-                # Flatten Socials for CSV
-                socials = lead.get("Socials", {})
-                if socials:
-                    lead["Instagram"] = socials.get("Instagram", "")
-                    lead["Facebook"] = socials.get("Facebook", "")
-                    lead["LinkedIn"] = socials.get("LinkedIn", "")
-                    lead["WhatsApp"] = socials.get("WhatsApp", "") 
-                
-                # Flatten specific fields
-                if isinstance(lead.get("Emails"), list):
-                    lead["Email"] = ", ".join(lead["Emails"])
-                
-                # Ensure duplicate phones are handled
-                web_phones = []
-                if isinstance(lead.get("Phones"), list):
-                     web_phones = lead.get("Phones")
-                
-                current_phone = lead.get("Phone", "")
-                all_phones = set()
-                if current_phone: 
-                    all_phones.add(current_phone)
-                for p in web_phones: 
-                    all_phones.add(p)
-                
-                lead["Phone"] = ", ".join(list(all_phones))
-
-                unique_leads[name] = lead
+        if tiles:
+            # Each tile search is anchored by coordinates, so "near {city}" is dropped
+            queries = tile_queries(queries)
+            max_leads = int(max_leads) if max_leads else None
+            bbox = list(bbox or city_bbox(city))
+        else:
+            # max_leads is passed down instead of patching config, so concurrent jobs don't clash
+            max_leads = int(max_leads or config.MAX_LEADS_PER_RUN)
+            queries = expand_queries([city], queries)
+        harvest_mode = harvest_mode or config.HARVEST_MODE
+
+        output_format = resolve_format(output_format)
+        filename = filename or output_filename(f"leads_{city.replace(' ', '_')}_{int(time.time())}", output_format)
+        journal = RunJournal(output_stem(filename))
+        state = JournalState()
+        journal.append("start", params={
+            "city": city, "queries": queries, "max_leads": max_leads, "filename": filename,
+            "harvest_mode": harvest_mode, "tiles": tiles, "bbox": bbox,
+        })
+        print(f"Run ID: {journal.run_id} (resume with --resume {journal.run_id})")
+
+    trace = tracing.start_run(journal.run_id)
+    enricher = EnrichmentEngine()
+    executor = QueryExecutor(workers=workers, harvest_mode=harvest_mode)
+    tiler = None
+    if tiles:
+        tiler = TileHarvester(city, queries, bbox=bbox, workers=workers, harvest_mode=harvest_mode,
+                              max_leads=max_leads, stats=executor.stats)
+    lead_index = get_lead_index()
+    report(queries_total=len(queries))
+
+    counts = {
+        "queries_done": 0,
+        "leads_scraped": 0,
+        "leads_enriched": 0,
+        "leads_qualified": 0,
+        "enrichments_avoided": 0,
+        "fetches_saved": 0,
+        "leads_harvested_live": 0,
+        "harvest_seconds": 0.0,
+    }
+    def on_query_done(query, lead_count, cards=None):
+        if cards is None:
+            journal.append("query_done", query=query)
+        else:
+            journal.append("query_done", query=query, cards=cards)
+        counts["queries_done"] += 1
+        report(queries_done=counts["queries_done"])
+        if tiler is not None:
+            report(queries_total=tiler.planned)
+
+    def harvest():
+        # Replay what the journal already has, in the original order
+        for query, lead in state.harvested:
+            yield lead
+        if state.done_queries:
+            counts["queries_done"] += len(state.done_queries)
+            report(queries_done=counts["queries_done"])
+
+        harvest_start = time.time()
+        if tiler is not None:
+            leads = tiler.iter_leads(done=state.query_cards, harvested_names=state.harvested_names,
+                                     on_tile_done=on_query_done,
+                                     known_leads=[lead for query, lead in state.harvested])
+        else:
+            remaining = [query for query in queries if query not in state.done_queries]
+            skip_names = {query: state.harvested_names(query) for query in remaining}
+            leads = executor.iter_leads(remaining, max_leads=max_leads, on_query_done=on_query_done,
+                                        skip_names=skip_names)
+        for lead in leads:
+            journal.append("harvested", query=lead["Search Query"], lead=lead)
+            counts["leads_harvested_live"] += 1
+            counts["harvest_seconds"] = time.time() - harvest_start
+            yield lead
+
+    def count_scraped(leads):
+        for lead in leads:
+            counts["leads_scraped"] += 1
+            tracing.count("leads_harvested")
+            report(leads_scraped=counts["leads_scraped"])
+            yield lead
+
+    # A resumed run rewrites the output from the journal, so it matches an uninterrupted run
+    writer = get_lead_writer(filename)
+    if resume and os.path.isfile(writer.filepath):
+        os.remove(writer.filepath)
+    lead_store = get_lead_store()
+    store_writer = LeadStoreWriter(lead_store, run_id=journal.run_id) if lead_store else None
+    summary = LeadSummary()
+    seen_names = set()
+    skip_matcher = get_skip_matcher()
+    # Leads this run harvested before a crash may already be in the lead index
+    journal_names = set(state.harvested_names())
+
+    try:
+        # Harvest
+        leads = buffered(count_scraped(harvest()), maxsize=config.PIPELINE_QUEUE_SIZE, name="harvest")
+        # Dedup
+        leads = dedup_leads(leads, seen_names)
+        leads = skip_blocked_leads(leads, counts, skip_matcher)
+        if lead_index:
+            leads = skip_known_leads(leads, lead_index, counts, exempt_names=journal_names)
+        # Enrich with Website Data
+        leads = buffered(enricher.iter_enriched(leads, done=state.enriched),
+                         maxsize=config.PIPELINE_QUEUE_SIZE, name="enrich")
+
+        for lead in leads:
+            if lead["Business Name"] not in state.enriched:
+                journal.append("enriched", lead=lead)
+            counts["leads_enriched"] += 1
+            tracing.count("leads_enriched")
+            report(leads_enriched=counts["leads_enriched"])
+            if lead_index:
+                lead_index.record(lead)
+
+            # Filter and write
+            if not keep_lead(lead, skip_matcher):
+                continue
+            lead.setdefault("City", city)
+            if not lead.get("State"):
+                lead["State"] = address_state(lead.get("Address")) or address_state(city)
+            writer.write(lead)
+            if store_writer:
+                store_writer.write(lead)
+            summary.add(lead)
+            counts["leads_qualified"] += 1
+            tracing.count("leads_qualified")
+            report(leads_qualified=counts["leads_qualified"])
 
     finally:
-        maps_scraper.close()
-        # Restore config
-        config.MAX_LEADS_PER_RUN = original_max_leads
+        writer.close()
+        if store_writer:
+            try:
+                store_writer.close()
+                print(f"Lead store: {store_writer.count} leads upserted into {lead_store.path}")
+            except Exception as e:
+                print(f"Failed to write the lead store: {e}")
+        if trace is not None:
+            tracing.end_run(trace)
+            trace_path = trace.write(os.path.join(config.OUTPUT_DIR, f"{journal.run_id}.metrics.json"))
+            print(f"Run metrics: {trace_path}")
+        if tiler is not None:
+            tile_report = tiler.report()
+            setup_output_dir()
+            tile_path = os.path.join(config.OUTPUT_DIR, f"{journal.run_id}.tiles.json")
+            with open(tile_path, "w", encoding="utf-8") as f:
+                json.dump(tile_report, f, indent=2)
+            for level, row in tile_report["levels"].items():
+                print(f"Tiles level {level}: {row['tiles']} tiles, {row['saturated']} saturated, "
+                      f"{row['unique']} new leads ({row['marginal_yield']} per tile)")
+            print(f"Tile report: {tile_path}")
+        print(f"Driver pool: {get_pool().stats()}")
+        if get_cache():
+            print(f"Enrichment cache: {get_cache().stats()}")
+        print(f"Website fetches: {fetch_stats()}")
+        print(f"HTTP client: {http_stats()}")
+        if config.CONTACT_CRAWL_ENABLED:
+            print(f"Contact crawl: {crawl_stats()}")
+        if lead_index:
+            print(f"Lead index: {executor.stats['clicks_avoided']} clicks avoided, "
+                  f"{counts['enrichments_avoided']} enrichments avoided.")
+        print(f"Keyword filter: {executor.stats.get('keyword_skips', 0)} clicks saved, "
+              f"{counts['fetches_saved']} fetches saved.")
+        harvest_seconds = counts["harvest_seconds"]
+        rate = counts["leads_harvested_live"] / harvest_seconds * 60 if harvest_seconds else 0.0
+        print(f"Harvest ({executor.harvest_mode}): {counts['leads_harvested_live']} leads in {harvest_seconds:.0f}s "
+              f"({rate:.1f} leads/min), {executor.stats.get('network_leads', 0)} clicks avoided via network capture.")
+        print(f"Browser ({config.BROWSER_PROFILE}): {executor.stats.get('bytes_downloaded', 0) / (1024 * 1024):.1f} MB downloaded, "
+              f"{executor.stats.get('requests_blocked', 0)} requests blocked, "
+              f"peak RSS {executor.stats.get('peak_rss_mb', 0):.0f} MB per session.")
         
-    all_leads = list(unique_leads.values())
-    print(f"Total Unique Leads: {len(all_leads)}")
+    print(f"Total Unique Leads: {len(seen_names)}")
     
-    # Filter
-    print("Filtering leads...")
-    final_leads = filter_leads(all_leads)
-    
-    # Save
-    if final_leads:
-        filename = f"leads_{city.replace(' ', '_')}_{int(time.time())}.csv"
-        save_to_csv(final_leads, filename=filename)
-        generate_summary(final_leads)
+    if writer.count:
+        summary.write()
         print(f"Done! Saved to {filename}")
         
-        return {
+        result = {
             "success": True,
+            "run_id": journal.run_id,
             "filename": filename,
-            "total_leads": len(final_leads),
-            "message": f"Successfully scraped {len(final_leads)} leads."
+            "total_leads": writer.count,
+            "message": f"Successfully scraped {writer.count} leads."
         }
     else:
         print("No leads found matching criteria.")
-        return {
+        result = {
             "success": False,
+            "run_id": journal.run_id,
             "filename": None,
             "total_leads": 0,
             "message": "No leads found matching criteria."
         }
 
+    journal.append("finished", result=result)
+    journal.close()
+    return result
+
 def main():
     parser = argparse.ArgumentParser(description="Autonomous Lead Scraper")
-    parser.add_argument("--city", type=str, help="Target city for scraping", required=True)
+    parser.add_argument("--city", type=str, help="Target city for scraping")
     parser.add_argument("--query", type=str, help="Specific query override")
+    parser.add_argument("--workers", type=int, help="Browser sessions running queries in parallel")
+    parser.add_argument("--resume", type=str, metavar="RUN_ID", help="Resume a crashed run from its journal")
+    parser.add_argument("--harvest-mode", choices=["click", "network"],
+                        help="Read Maps leads by clicking cards or from captured search responses")
+    parser.add_argument("--format", choices=["csv", "csv.gz", "jsonl", "parquet"],
+                        help="Output file format (default: OUTPUT_FORMAT)")
+    parser.add_argument("--max-leads", type=int, help="Leads per query (with --tiles: unique leads for the city)")
+    parser.add_argument("--tiles", action="store_true",
+                        help="Search the city tile by tile to get past the per-search result cap")
+    parser.add_argument("--bbox", type=str, metavar="S,W,N,E",
+                        help="Bounding box for --tiles (default: geocoded from the city)")
     
     args = parser.parse_args()
+    if not args.city and not args.resume:
+        parser.error("--city is required unless --resume is given")
     
     queries = None
     if args.query:
         queries = [args.query]
         
-    run_scraper(args.city, queries)
+    bbox = parse_bbox(args.bbox) if args.bbox else None
+    run_scraper(args.city, queries, max_leads=args.max_leads, workers=args.workers, resume=args.resume,
+                harvest_mode=args.harvest_mode, tiles=args.tiles, bbox=bbox, output_format=args.format)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,157 @@
+# scraper/contact_crawler.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from scraper.website_scraper import analyze_website, fetch_and_analyze
+from utils.http_cache import get_cache, normalize_url
+import config
+from utils import tracing
+
+# Contact crawl counters, shared by every thread in the process
+_crawl_stats = {"sites": 0, "pages": 0, "bytes_read": 0, "emails_found": 0, "stopped_early": 0}
+_crawl_stats_lock = threading.Lock()
+
+def _count_crawl(**fields):
+    with _crawl_stats_lock:
+        for name, value in fields.items():
+            _crawl_stats[name] += value
+
+def crawl_stats():
+    with _crawl_stats_lock:
+        return dict(_crawl_stats)
+
+class CrawlFrontier:
+    """
+    The pages still to visit on one website, shared by the threads
+    crawling it. URLs are handed out best first and at most once until
+    the page or byte budget runs out or stop() is called.
+    """
+    def __init__(self, urls, max_pages=None, max_bytes=None, seen=()):
+        self.pages_left = max_pages or config.CONTACT_CRAWL_MAX_PAGES
+        self.bytes_left = max_bytes or config.CONTACT_CRAWL_MAX_BYTES
+        self.stopped = False
+        self._queue = deque()
+        self._seen = {normalize_url(url) for url in seen if url}
+        self._lock = threading.Lock()
+        for url in urls:
+            self.add(url)
+
+    def add(self, url):
+        key = normalize_url(url)
+        with self._lock:
+            if key not in self._seen:
+                self._seen.add(key)
+                self._queue.append(url)
+
+    def next(self):
+        """
+        Returns (url, byte allowance), or (None, 0) when the crawl is over.
+        The remaining bytes are split evenly over the fetches still allowed.
+        """
+        with self._lock:
+            if self.stopped or not self._queue or self.pages_left <= 0 or self.bytes_left <= 0:
+                return None, 0
+            allowance = self.bytes_left // min(self.pages_left, len(self._queue))
+            self.pages_left -= 1
+            self.bytes_left -= allowance
+            return self._queue.popleft(), allowance
+
+    def release(self, allowance, used):
+        # Hand back whatever part of the allowance the page did not need
+        with self._lock:
+            self.bytes_left += max(0, allowance - used)
+
+    def stop(self):
+        with self._lock:
+            self.stopped = True
+            return len(self._queue)
+
+def merge_contacts(data, page_data):
+    """
+    Adds the emails, phones and social links found on another page of the
+    same website to `data`, keeping what the homepage already had.
+    """
+    for field in ("Emails", "Phones"):
+        known = data.setdefault(field, [])
+        for value in page_data.get(field) or []:
+            if value not in known:
+                known.append(value)
+
+    socials = data.setdefault("Socials", {})
+    for network, link in (page_data.get("Socials") or {}).items():
+        if link and not socials.get(network):
+            socials[network] = link
+    return data
+
+def crawl_contacts(data, timeout=None, cache=None):
+    """
+    Visits the homepage's best contact/about links (data["Contact Links"])
+    when the homepage itself had no email, and merges what they contain
+    into data. Pages are fetched CONTACT_CRAWL_CONCURRENCY at a time and the
+    crawl stops as soon as an email turns up.
+    """
+    links = data.get("Contact Links") or []
+    if not links or data.get("Emails"):
+        return data
+
+    if cache is None:
+        cache = get_cache()
+    deadline = time.monotonic() + (timeout or config.ENRICH_TIMEOUT)
+    frontier = CrawlFrontier(links, seen=[data.get("Website")])
+    merge_lock = threading.Lock()
+
+    def visit(url, allowance):
+        used = 0
+
+        def fetch(headers):
+            nonlocal used
+            page, page_data = fetch_and_analyze(url, deadline - time.monotonic(), headers, allowance)
+            if page is not None:
+                used = len(page.html)
+            return page, page_data
+
+        if cache is not None:
+            page_data = cache.lookup(url, fetch)
+        else:
+            page_data = fetch({})[1]
+        return page_data, used
+
+    def worker():
+        while time.monotonic() < deadline:
+            url, allowance = frontier.next()
+            if url is None:
+                return
+            print(f"Visiting {url}...")
+            page_data, used = visit(url, allowance)
+            frontier.release(allowance, used)
+            _count_crawl(pages=1, bytes_read=used)
+            with merge_lock:
+                merge_contacts(data, page_data)
+                if data["Emails"] and not frontier.stopped:
+                    if frontier.stop():
+                        _count_crawl(stopped_early=1)
+
+    workers = min(config.CONTACT_CRAWL_CONCURRENCY, len(links))
+    with tracing.span("web.crawl", url=data.get("Website")) as span:
+        if workers <= 1:
+            worker()
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(tracing.bind(worker)) for _ in range(workers)]:
+                    future.result()
+        span.set(emails=len(data["Emails"]))
+
+    _count_crawl(sites=1, emails_found=int(bool(data["Emails"])))
+    return data
+
+def crawl_website(url, timeout=None, cache=None):
+    """
+    analyze_website plus, when CONTACT_CRAWL_ENABLED is on, a shallow crawl
+    of the site's contact pages. Same return value as analyze_website.
+    """
+    data = analyze_website(url, timeout=timeout, cache=cache)
+    if config.CONTACT_CRAWL_ENABLED:
+        crawl_contacts(data, timeout, cache)
+    data.pop("Contact Links", None)
+    return data
@@ -0,0 +1,387 @@
+# scraper/driver_pool.py
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+import config
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+def get_driver_path():
+    """
+    Resolves the chromedriver binary once per process instead of on every run.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = ChromeDriverManager().install()
+    return _driver_path
+
+# Request blocking per BROWSER_PROFILE. URL patterns go to DevTools
+# Network.setBlockedURLs ("*" matches anything); images are also switched off
+# at the renderer so nothing decodes them.
+BROWSER_PROFILES = {
+    "full": {"blocked_urls": (), "images": True},
+    "listings-only": {
+        "blocked_urls": (
+            # Map tiles, satellite and street view imagery
+            "*/maps/vt*", "*://khms*.google.com/*", "*://*.ggpht.com/*", "*://streetviewpixels-pa.googleapis.com/*",
+            # Place photos and other images
+            "*://lh*.googleusercontent.com/*", "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.ico*",
+            # Fonts
+            "*://fonts.gstatic.com/*", "*.woff2*", "*.woff*", "*.ttf*",
+            # Video and audio
+            "*.mp4*", "*.webm*", "*://*.googlevideo.com/*",
+            # Analytics and logging beacons
+            "*/gen_204*", "*://play.google.com/log*", "*://www.google-analytics.com/*", "*://*.doubleclick.net/*",
+        ),
+        "images": False,
+    },
+}
+
+def get_browser_profile(name=None):
+    name = name or config.BROWSER_PROFILE
+    if name not in BROWSER_PROFILES:
+        raise ValueError(f"Unknown BROWSER_PROFILE {name!r}, expected one of {sorted(BROWSER_PROFILES)}")
+    return BROWSER_PROFILES[name]
+
+def blocked_urls(name=None):
+    return list(get_browser_profile(name)["blocked_urls"]) + list(config.BROWSER_BLOCKED_URLS)
+
+def apply_profile(driver, name=None):
+    """
+    Turns on the profile's request blocking for the driver's tab. It stays
+    on across navigations for the life of the session.
+    """
+    urls = blocked_urls(name)
+    if urls:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+
+def build_options():
+    options = webdriver.ChromeOptions()
+    # Stealth options
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+    # DevTools network log, read by HARVEST_MODE="network" (scraper.maps_network)
+    if config.NETWORK_CAPTURE_ENABLED:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+    # Lean profile: bounded caches, fewer renderer processes, no background traffic
+    options.add_argument(f"--disk-cache-size={config.BROWSER_DISK_CACHE_MB * 1024 * 1024}")
+    options.add_argument(f"--js-flags=--max-old-space-size={config.BROWSER_JS_HEAP_MB}")
+    options.add_argument(f"--renderer-process-limit={config.BROWSER_RENDERER_LIMIT}")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-component-update")
+    options.add_argument("--disable-features=Translate,OptimizationHints,MediaRouter")
+    options.add_argument("--no-first-run")
+    options.add_argument("--mute-audio")
+    if not get_browser_profile()["images"]:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+    
+    # Headless mode for deployment
+    if os.environ.get("HEADLESS") == "true":
+        options.add_argument("--headless=new")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        # No fixed --remote-debugging-port: pooled sessions run side by side
+        options.add_argument("--window-size=1280,720")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-infobars")
+        options.add_argument("--disable-popup-blocking")
+    return options
+
+def create_driver():
+    service = Service(get_driver_path())
+    driver = webdriver.Chrome(service=service, options=build_options())
+    try:
+        apply_profile(driver)
+    except Exception as e:
+        print(f"Could not apply request blocking ({config.BROWSER_PROFILE}): {e}")
+    return driver
+
+def process_tree_rss_mb(pid):
+    """
+    Resident memory of a process and all its descendants, in MB.
+    Reads /proc, so returns None on platforms without it.
+    """
+    if not pid or not os.path.isdir("/proc"):
+        return None
+
+    children = {}
+    rss = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as f:
+                ppid, vm_rss = None, 0
+                for line in f:
+                    if line.startswith("PPid:"):
+                        ppid = int(line.split()[1])
+                    elif line.startswith("VmRSS:"):
+                        vm_rss = int(line.split()[1])
+        except (OSError, ValueError):
+            continue
+        rss[int(entry)] = vm_rss
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total_kb += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total_kb / 1024
+
+class PooledSession:
+    def __init__(self, driver, startup_time):
+        self.driver = driver
+        self.startup_time = startup_time
+        self.pages = 0
+        self.leases = 0
+        self.created_at = time.time()
+
+    def rss_mb(self):
+        try:
+            return process_tree_rss_mb(self.driver.service.process.pid)
+        except Exception:
+            return None
+
+    def is_healthy(self):
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def reset(self):
+        """
+        Clears state left by the previous lease: extra tabs, cookies, storage.
+        """
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+        self.driver.delete_all_cookies()
+        try:
+            self.driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            pass
+        if config.NETWORK_CAPTURE_ENABLED:
+            try:
+                self.driver.get_log("performance")
+            except Exception:
+                pass
+        self.driver.get("about:blank")
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+class DriverPool:
+    """
+    Keeps up to `size` warm Chrome sessions and leases them to runs.
+    A session is recycled after `max_pages` page loads or once its
+    browser process tree passes `max_rss_mb` of resident memory.
+    """
+    def __init__(self, size=None, max_pages=None, max_rss_mb=None, factory=None):
+        self.size = size or config.DRIVER_POOL_SIZE
+        self.max_pages = max_pages or config.DRIVER_MAX_PAGES
+        self.max_rss_mb = max_rss_mb or config.DRIVER_MAX_RSS_MB
+        self.factory = factory or create_driver
+        self._idle = []
+        self._total = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats_counters = {
+            "leases": 0,
+            "warm_hits": 0,
+            "cold_starts": 0,
+            "recycles": 0,
+            "health_failures": 0,
+            "startup_seconds_total": 0.0,
+        }
+
+    def _start_session(self):
+        start = time.perf_counter()
+        driver = self.factory()
+        startup_time = time.perf_counter() - start
+        with self._cond:
+            self.stats_counters["cold_starts"] += 1
+            self.stats_counters["startup_seconds_total"] += startup_time
+        print(f"Started Chrome session in {startup_time:.1f}s")
+        return PooledSession(driver, startup_time)
+
+    def warm(self, count=None):
+        """
+        Pre-starts sessions so the first runs get a warm browser.
+        """
+        count = min(count or self.size, self.size)
+        while True:
+            with self._cond:
+                if self._closed or self._total >= count:
+                    return
+                self._total += 1
+            try:
+                session = self._start_session()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                raise
+            with self._cond:
+                self._idle.append(session)
+                self._cond.notify()
+
+    def _acquire(self, timeout):
+        deadline = time.time() + timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    if self._idle:
+                        session = self._idle.pop()
+                        break
+                    if self._total < self.size:
+                        self._total += 1
+                        session = None
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a browser session")
+                    self._cond.wait(remaining)
+
+            if session is None:
+                try:
+                    return self._start_session()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+
+            if session.is_healthy():
+                with self._cond:
+                    self.stats_counters["warm_hits"] += 1
+                return session
+
+            print("Pooled Chrome session failed health check, replacing it.")
+            self._discard(session, "health_failures")
+
+    def _discard(self, session, counter):
+        session.quit()
+        with self._cond:
+            self._total -= 1
+            self.stats_counters[counter] += 1
+            self._cond.notify()
+
+    def _release(self, session):
+        rss = session.rss_mb()
+        if session.pages >= self.max_pages:
+            print(f"Recycling Chrome session after {session.pages} pages.")
+            self._discard(session, "recycles")
+            return
+        if rss is not None and rss >= self.max_rss_mb:
+            print(f"Recycling Chrome session at {rss:.0f} MB RSS.")
+            self._discard(session, "recycles")
+            return
+
+        try:
+            session.reset()
+        except Exception as e:
+            print(f"Failed to reset Chrome session: {e}")
+            self._discard(session, "health_failures")
+            return
+
+        with self._cond:
+            if self._closed:
+                session.quit()
+                self._total -= 1
+                return
+            self._idle.append(session)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        Usage:
+            with pool.lease() as session:
+                scraper = MapsScraper(driver=session.driver)
+        Callers add the pages they loaded to session.pages. A
+        WebDriverException escaping the block discards the session.
+        """
+        session = self._acquire(timeout or config.DRIVER_LEASE_TIMEOUT)
+        session.leases += 1
+        with self._cond:
+            self.stats_counters["leases"] += 1
+        failed = False
+        try:
+            yield session
+        except WebDriverException:
+            failed = True
+            raise
+        finally:
+            if failed:
+                print("Discarding Chrome session after a WebDriver error.")
+                self._discard(session, "health_failures")
+            else:
+                # A failed reset discards the session, so a broken browser is never re-leased
+                self._release(session)
+
+    def stats(self):
+        with self._cond:
+            counters = dict(self.stats_counters)
+            idle = len(self._idle)
+            total = self._total
+        cold_starts = counters["cold_starts"]
+        avg_startup = counters["startup_seconds_total"] / cold_starts if cold_starts else 0.0
+        return {
+            "size": self.size,
+            "sessions": total,
+            "idle": idle,
+            "leases": counters["leases"],
+            "warm_hits": counters["warm_hits"],
+            "cold_starts": cold_starts,
+            "recycles": counters["recycles"],
+            "health_failures": counters["health_failures"],
+            "avg_startup_seconds": round(avg_startup, 2),
+            "startup_seconds_saved": round(avg_startup * counters["warm_hits"], 2),
+        }
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for session in idle:
+            session.quit()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    Process-wide pool shared by the CLI and the Flask app.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            atexit.register(_pool.shutdown)
+    return _pool
@@ -0,0 +1,194 @@
+# scraper/enrichment.py
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import config
+from utils import tracing
+from scraper.contact_crawler import crawl_website
+
+def get_domain(url):
+    try:
+        return urlparse(url).netloc.lower()
+    except Exception:
+        return ""
+
+def merge_web_data(lead, web_data=None):
+    """
+    Merges analyze_website output into a Maps lead and flattens
+    Socials, Emails and Phones into the CSV columns.
+    """
+    if web_data is not None:
+        lead.update(web_data)
+    elif not lead.get("Website"):
+        lead["Quality Score"] = 10 # No website
+        lead["Notes"] = "No Website listed on Maps."
+
+    # Default empty fields if missing
+    for field in ["Email", "Instagram", "Facebook", "LinkedIn", "WhatsApp"]:
+         if field not in lead: lead[field] = ""
+         
+    # Flatten Socials for CSV
+    socials = lead.get("Socials", {})
+    if socials:
+        lead["Instagram"] = socials.get("Instagram", "")
+        lead["Facebook"] = socials.get("Facebook", "")
+        lead["LinkedIn"] = socials.get("LinkedIn", "")
+        lead["WhatsApp"] = socials.get("WhatsApp", "") 
+    
+    # Flatten specific fields
+    if isinstance(lead.get("Emails"), list):
+        lead["Email"] = ", ".join(lead["Emails"])
+    
+    # Ensure duplicate phones are handled
+    web_phones = []
+    if isinstance(lead.get("Phones"), list):
+         web_phones = lead.get("Phones")
+    
+    current_phone = lead.get("Phone", "")
+    all_phones = set()
+    if current_phone: 
+        all_phones.add(current_phone)
+    for p in web_phones: 
+        all_phones.add(p)
+    
+    lead["Phone"] = ", ".join(list(all_phones))
+    return lead
+
+class EnrichmentEngine:
+    """
+    Enriches many leads at once on a thread pool.
+    - concurrency: total websites fetched at the same time
+    - per_domain: max simultaneous fetches against one host; leads over
+      the limit wait outside the pool, so they never hold a worker
+    - timeout: per-request deadline handed to analyze (crawl_website by default)
+    """
+    def __init__(self, concurrency=None, per_domain=None, timeout=None, analyze=None):
+        self.concurrency = concurrency or config.ENRICH_CONCURRENCY
+        self.per_domain = per_domain or config.ENRICH_PER_DOMAIN
+        self.timeout = timeout or config.ENRICH_TIMEOUT
+        self.analyze = analyze or crawl_website
+
+    def _fetch_domain(self, lead, done=None):
+        # The host a lead's enrichment will fetch from, or None when it fetches nothing
+        if (done and lead.get("Business Name") in done) or not lead.get("Website"):
+            return None
+        return get_domain(lead["Website"])
+
+    def _enrich_one(self, lead, done=None):
+        # Already enriched by an earlier (resumed) run
+        if done and lead.get("Business Name") in done:
+            return done[lead["Business Name"]]
+
+        website = lead.get("Website")
+        if not website:
+            return merge_web_data(lead)
+
+        with tracing.span("enrich", lead=lead.get("Business Name"), url=website):
+            print(f"Visiting {website}...")
+            web_data = self.analyze(website, timeout=self.timeout)
+        return merge_web_data(lead, web_data)
+
+    def iter_enriched(self, leads, done=None):
+        """
+        Yields enriched leads in input order, each one as soon as it and
+        every lead before it have finished, while up to `concurrency`
+        fetches run in the background. `leads` may be any iterable; a reader
+        thread pulls it at most `concurrency * 2` leads ahead of what has
+        been yielded, so a slow consumer holds back the producer and a slow
+        producer never holds back finished leads.
+        `done` maps business names to results to reuse instead of fetching.
+        A lead whose host already has per_domain fetches running waits in a
+        per-host queue outside that window, and is submitted as soon as one
+        of them finishes, so the workers stay free for other hosts.
+        """
+        events = queue.Queue() # ("lead", lead), ("done", entry) or ("end", upstream error or None)
+        window = threading.Semaphore(self.concurrency * 2)
+        stopped = threading.Event()
+
+        def read():
+            try:
+                iterator = iter(leads)
+                while True:
+                    while not window.acquire(timeout=0.5):
+                        if stopped.is_set():
+                            return
+                    lead = next(iterator, None)
+                    if lead is None or stopped.is_set():
+                        break
+                    events.put(("lead", lead))
+                events.put(("end", None))
+            except Exception as e:
+                # Upstream failed: the leads already in flight are finished first, then it is re-raised
+                events.put(("end", e))
+
+        pending = deque() # [lead, domain, future, holds a window slot] in input order
+        waiting = {} # domain -> entries queued for a host slot
+        active = {} # domain -> fetches submitted and not finished
+        upstream_done = False
+        upstream_error = None
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            def submit(entry):
+                entry[2] = executor.submit(tracing.bind(self._enrich_one), entry[0], done)
+                entry[2].add_done_callback(lambda future: events.put(("done", entry)))
+
+            def schedule(entry):
+                domain = entry[1]
+                if domain is not None and active.get(domain, 0) >= self.per_domain:
+                    waiting.setdefault(domain, deque()).append(entry)
+                    entry[3] = False
+                    window.release()
+                    return
+                if domain is not None:
+                    active[domain] = active.get(domain, 0) + 1
+                submit(entry)
+
+            def release(domain):
+                active[domain] -= 1
+                host_queue = waiting.get(domain)
+                if host_queue:
+                    entry = host_queue.popleft()
+                    if not host_queue:
+                        del waiting[domain]
+                    active[domain] += 1
+                    submit(entry)
+
+            reader = threading.Thread(target=tracing.bind(read), name="enrich-reader", daemon=True)
+            reader.start()
+            try:
+                while True:
+                    # Flush every finished lead at the head before waiting for anything else
+                    while pending and pending[0][2] is not None and pending[0][2].done():
+                        lead, domain, future, holds_slot = pending.popleft()
+                        if holds_slot:
+                            window.release()
+                        try:
+                            yield future.result()
+                        except Exception as e:
+                            print(f"Error enriching {lead.get('Business Name')}: {e}")
+                            tracing.count_error("enrich", e)
+                            yield merge_web_data(lead, {"Quality Score": 10, "Notes": f"Scraping Error: {str(e)}"})
+                    if upstream_done and not pending:
+                        if upstream_error is not None:
+                            raise upstream_error
+                        return
+
+                    kind, value = events.get()
+                    if kind == "lead":
+                        entry = [value, self._fetch_domain(value, done), None, True]
+                        pending.append(entry)
+                        schedule(entry)
+                    elif kind == "done":
+                        if value[1] is not None:
+                            release(value[1])
+                    else:
+                        upstream_done = True
+                        upstream_error = value
+            finally:
+                # Consumer finished or bailed out: let the reader thread exit
+                stopped.set()
+
+    def enrich(self, leads):
+        return list(self.iter_enriched(leads))
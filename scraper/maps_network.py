@@ -0,0 +1,209 @@
+# scraper/maps_network.py
+import json
+from urllib.parse import urlparse, parse_qs, quote
+
+# Every Maps JSON response starts with this anti-XSSI guard
+XSSI_PREFIX = ")]}'"
+
+def dig(node, *path):
+    """
+    node[path[0]][path[1]]..., or None as soon as a step is missing.
+    Maps payloads are positional arrays that change shape between releases.
+    """
+    for index in path:
+        try:
+            node = node[index]
+        except (IndexError, KeyError, TypeError):
+            return None
+    return node
+
+def decode_payload(body):
+    """
+    Parses a /search?tbm=map response body. Older responses wrap the JSON
+    in {"c":..,"d":"<json>"}/*""*/, newer ones send it bare; both start
+    the JSON with the XSSI guard. Returns None if the body is not a payload.
+    """
+    text = (body or "").strip()
+    if text.endswith('/*""*/'):
+        text = text[:-len('/*""*/')]
+    if text.startswith("{"):
+        try:
+            text = json.loads(text)["d"]
+        except (ValueError, KeyError, TypeError):
+            return None
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+def is_place(node):
+    return isinstance(node, list) and len(node) > 11 and isinstance(node[11], str) and bool(node[11])
+
+def iter_places(payload, depth=0):
+    """
+    Yields the place arrays of a decoded payload. Results usually sit at
+    payload[0][1][i][14]; searching a few levels deep survives small
+    layout changes.
+    """
+    if not isinstance(payload, list) or depth > 6:
+        return
+    for item in payload:
+        if isinstance(item, list) and len(item) > 14 and is_place(item[14]):
+            yield item[14]
+        elif isinstance(item, list):
+            yield from iter_places(item, depth + 1)
+
+def clean_website(url):
+    # Some results link through a Google redirect
+    if url and url.startswith("/url?"):
+        url = parse_qs(urlparse(url).query).get("q", [""])[0]
+    return url or ""
+
+def place_to_lead(place):
+    """
+    Maps a place array to the same dict MapsScraper.extract_details returns.
+    Unknown positions simply come back empty.
+    """
+    name = dig(place, 11) or ""
+    address = dig(place, 39)
+    if not isinstance(address, str):
+        parts = dig(place, 2)
+        address = ", ".join(p for p in parts if isinstance(p, str)) if isinstance(parts, list) else ""
+
+    phone = dig(place, 178, 0, 0)
+    phone = "".join(c for c in phone if c.isascii()).strip() if isinstance(phone, str) else ""
+
+    rating = dig(place, 4, 7)
+    reviews = dig(place, 4, 8)
+    categories = dig(place, 13)
+    website = dig(place, 7, 0)
+
+    lead = {
+        "Business Name": name,
+        "Rating": str(rating) if isinstance(rating, (int, float)) else "",
+        "Reviews": str(reviews) if isinstance(reviews, int) else "",
+        "Address": address or "",
+        "Website": clean_website(website) if isinstance(website, str) else "",
+        "Phone": phone,
+        "Category": categories[0] if isinstance(categories, list) and categories and isinstance(categories[0], str) else "",
+        "Socials": {},
+    }
+    feature_id = dig(place, 10)
+    if isinstance(feature_id, str) and feature_id.startswith("0x"):
+        lead["Maps URL"] = f"https://www.google.com/maps/place/{quote(name)}/data=!4m2!3m1!1s{feature_id}"
+    return lead
+
+def parse_search_payload(body):
+    payload = decode_payload(body)
+    if payload is None:
+        return []
+    return [place_to_lead(place) for place in iter_places(payload)]
+
+def log_messages(entries):
+    # DevTools events from driver.get_log("performance") entries
+    for entry in entries:
+        try:
+            yield json.loads(entry["message"])["message"]
+        except (ValueError, KeyError, TypeError):
+            continue
+
+def count_traffic(message, traffic):
+    """
+    Adds a DevTools network event to traffic["bytes_downloaded"] (bytes on
+    the wire per finished request) or traffic["requests_blocked"].
+    """
+    method = message.get("method")
+    params = message.get("params", {})
+    if method == "Network.loadingFinished":
+        traffic["bytes_downloaded"] = traffic.get("bytes_downloaded", 0) + int(params.get("encodedDataLength") or 0)
+    elif method == "Network.loadingFailed" and params.get("blockedReason"):
+        traffic["requests_blocked"] = traffic.get("requests_blocked", 0) + 1
+
+def is_search_response(url):
+    parsed = urlparse(url)
+    return parsed.path.endswith("/search") and "tbm=map" in parsed.query
+
+class NetworkCapture:
+    """
+    Reads Maps search responses from the browser's DevTools network log
+    (performance logging, see scraper.driver_pool.build_options) and turns
+    them into leads, keyed by feature ID and by name. Every network event
+    read is also counted into `traffic` (see count_traffic).
+    """
+    def __init__(self, driver, traffic=None):
+        self.driver = driver
+        self.traffic = traffic if traffic is not None else {}
+        self.by_id = {}
+        self.by_name = {}
+        self.stats = {"payloads": 0, "places": 0, "bytes": 0, "body_errors": 0}
+        self._pending = {}
+
+    def start(self):
+        # Keep response bodies around long enough to be fetched, and drop older log entries
+        self.driver.execute_cdp_cmd("Network.enable", {
+            "maxTotalBufferSize": 64 * 1024 * 1024,
+            "maxResourceBufferSize": 16 * 1024 * 1024,
+        })
+        self.discard()
+
+    def discard(self):
+        try:
+            self.driver.get_log("performance")
+        except Exception:
+            pass
+
+    def poll(self):
+        """
+        Processes the log entries since the last poll; returns how many new
+        places were captured.
+        """
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception:
+            return 0
+
+        found = 0
+        for message in log_messages(entries):
+            count_traffic(message, self.traffic)
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                url = dig(params, "response", "url") or ""
+                if is_search_response(url):
+                    self._pending[params.get("requestId")] = url
+            elif method == "Network.loadingFinished" and params.get("requestId") in self._pending:
+                self._pending.pop(params["requestId"])
+                found += self._read_body(params["requestId"])
+        return found
+
+    def _read_body(self, request_id):
+        try:
+            response = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            self.stats["body_errors"] += 1
+            return 0
+
+        body = response.get("body") or ""
+        self.stats["payloads"] += 1
+        self.stats["bytes"] += len(body)
+        leads = parse_search_payload(body)
+        for lead in leads:
+            place_id = lead.get("Maps URL", "").rsplit("!1s", 1)[-1] if lead.get("Maps URL") else None
+            if place_id:
+                self.by_id[place_id] = lead
+            self.by_name.setdefault(lead["Business Name"], lead)
+        self.stats["places"] += len(leads)
+        return len(leads)
+
+    def lookup(self, name, maps_url):
+        """
+        The captured lead for a feed card, matched on the feature ID in its
+        link first and on its name otherwise.
+        """
+        if maps_url and "!1s" in maps_url:
+            feature_id = maps_url.split("!1s", 1)[1].split("!", 1)[0]
+            if feature_id in self.by_id:
+                return self.by_id[feature_id]
+        return self.by_name.get(name)
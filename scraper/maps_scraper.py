@@ -1,45 +1,188 @@
 # scraper/maps_scraper.py
 import time
-import random
-import os
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+from urllib.parse import quote_plus
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 import config
+from scraper.driver_pool import create_driver
+from scraper.waits import WaitStrategy
+from utils.lead_index import place_keys
+from utils.keyword_filter import get_skip_matcher
+from utils import tracing
+from utils.rate_limit import get_limiter
+from scraper.maps_network import NetworkCapture, log_messages, count_traffic
+
+# Returns the feed cards added since the previous call (each as [element, aria-label, place link]),
+# plus the feed's scrollHeight and whether the end-of-list marker is showing.
+# Cards already returned are tagged so the next call skips them
+# (FeedCursor.release untags a card whose click failed).
+FEED_CURSOR_JS = """
+const feed = document.querySelector('div[role="feed"]');
+if (!feed) return null;
+const items = [];
+for (const card of feed.querySelectorAll(':scope > div > div[role="article"]')) {
+    if (card.hasAttribute('data-lead-cursor')) continue;
+    card.setAttribute('data-lead-cursor', '1');
+    const link = card.querySelector('a[href*="/maps/place/"]');
+    items.push([card, card.getAttribute('aria-label') || '', link ? link.href : '']);
+}
+const last = feed.lastElementChild;
+const atEnd = !!feed.querySelector('span.HlvSq') || (!!last && /reached the end/i.test(last.textContent || ''));
+return {items: items, atEnd: atEnd, scrollHeight: feed.scrollHeight};
+"""
+
+# Reads every place panel field in the page and returns them as one object.
+# Each field lists its fallback selectors in order; the first non-empty value wins.
+EXTRACT_DETAILS_JS = """
+const fields = {
+    website: [
+        ['a[data-item-id="authority"]', 'href'],
+        ['a[aria-label^="Website:"]', 'href']
+    ],
+    phone: [
+        ['button[data-item-id^="phone"]', 'text'],
+        ['button[data-item-id^="phone"]', 'aria-label']
+    ],
+    address: [
+        ['button[data-item-id="address"]', 'text'],
+        ['button[data-item-id="address"]', 'aria-label']
+    ],
+    rating: [
+        ['span[role="img"][aria-label*="stars"]', 'aria-label']
+    ],
+    reviews: [
+        ['span[role="img"][aria-label$="reviews"]', 'aria-label'],
+        ['button[jsaction*="reviewChart"] span', 'text']
+    ],
+    category: [
+        ['button[jsaction*="category"]', 'text']
+    ]
+};
+const read = (el, source) => {
+    if (source === 'text') return (el.innerText || '').trim();
+    if (source === 'href') return el.href || '';
+    return el.getAttribute(source) || '';
+};
+const result = {};
+for (const [name, candidates] of Object.entries(fields)) {
+    result[name] = '';
+    for (const [selector, source] of candidates) {
+        const el = document.querySelector(selector);
+        const value = el ? read(el, source) : '';
+        if (value) {
+            result[name] = value;
+            break;
+        }
+    }
+}
+return result;
+"""
+
+def search_url(query, lat, lng, zoom):
+    # A search URL anchored to a map viewport; Maps lists the results in and around it
+    return f"https://www.google.com/maps/search/{quote_plus(query)}/@{lat:.6f},{lng:.6f},{zoom}z?hl=en"
+
+class FeedCursor:
+    """
+    Reads the results feed incrementally: each read() makes one script call
+    and returns only the cards added since the previous read. The list is
+    over once Maps shows its end marker or the feed's scrollHeight has not
+    grown for FEED_END_STALLS reads in a row.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.height = 0
+        self.stalls = 0
+        self.at_end = False
+
+    def read(self):
+        state = self.driver.execute_script(FEED_CURSOR_JS) or {}
+        items = state.get("items") or []
+        height = state.get("scrollHeight") or 0
+        self.at_end = bool(state.get("atEnd"))
+        if items or height > self.height:
+            self.stalls = 0
+        else:
+            self.stalls += 1
+        self.height = max(self.height, height)
+        return items
+
+    def finished(self):
+        return self.at_end or self.stalls >= config.FEED_END_STALLS
+
+    def release(self, card):
+        """
+        Untags a card so the next read() returns it again.
+        """
+        try:
+            self.driver.execute_script("arguments[0].removeAttribute('data-lead-cursor');", card)
+        except Exception:
+            # A re-rendered card is a new, untagged element already
+            pass
 
 class MapsScraper:
-    def __init__(self):
-        options = webdriver.ChromeOptions()
-        # Stealth options
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option("useAutomationExtension", False)
-        options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        # Headless mode for deployment
-        if os.environ.get("HEADLESS") == "true":
-            options.add_argument("--headless=new")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--remote-debugging-port=9222")
-            options.add_argument("--window-size=1280,720")
-            options.add_argument("--disable-extensions")
-            options.add_argument("--disable-infobars")
-            options.add_argument("--disable-popup-blocking")
-            options.add_argument("--blink-settings=imagesEnabled=false") # Disable images for speed/memory
-        
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=options)
+    def __init__(self, driver=None, lead_index=None, harvest_mode=None):
+        """
+        Uses a leased driver when one is passed (see scraper.driver_pool),
+        otherwise starts and owns a browser of its own.
+        lead_index (utils.lead_index) lets get_leads skip businesses seen in earlier runs.
+        harvest_mode (HARVEST_MODE by default): "click" opens every card;
+        "network" reads leads from the search responses the page fetches
+        and only clicks cards those responses did not fully cover.
+        """
+        self.owns_driver = driver is None
+        self.driver = driver if driver is not None else create_driver()
         self.wait = WebDriverWait(self.driver, 20)
+        self.waits = WaitStrategy(self.driver)
+        self.pages_loaded = 0
+        self.extract_timings = []
+        self.lead_index = lead_index
+        self.stats = {"clicks": 0, "clicks_avoided": 0, "keyword_skips": 0, "network_leads": 0,
+                      "bytes_downloaded": 0, "requests_blocked": 0, "feed_cards": 0}
+        self.skip_matcher = get_skip_matcher()
+        self.harvest_mode = harvest_mode or config.HARVEST_MODE
+        self.network = None
+        self.rate = get_limiter("maps")
 
-    def search(self, query):
-        self.driver.get('https://www.google.com/maps?hl=en') # Force English to standardize IDs/Labels if possible
-        time.sleep(5)
+    def search(self, query, viewport=None):
+        """
+        Types the query into the Maps search box. With a viewport
+        (lat, lng, zoom) the search URL is opened directly instead, so the
+        results are anchored to that map area (see scraper.tiling).
+        """
+        with tracing.span("maps.search", query=query):
+            if viewport:
+                self._search_at(query, *viewport)
+            else:
+                self._search(query)
+
+    def start_network_capture(self):
+        # Capture has to be on before the search request goes out
+        self.network = None
+        if self.harvest_mode == "network":
+            try:
+                self.network = NetworkCapture(self.driver, traffic=self.stats)
+                self.network.start()
+            except Exception as e:
+                print(f"Network capture unavailable, clicking every card: {e}")
+                self.network = None
+
+    def _search_at(self, query, lat, lng, zoom):
+        self.start_network_capture()
+        self.rate.wait()
+        self.driver.get(search_url(query, lat, lng, zoom))
+        self.pages_loaded += 1
+        print(f"Searching for: {query} at {lat:.5f},{lng:.5f} (zoom {zoom})")
+        self.waits.results()
+
+    def _search(self, query):
+        self.rate.wait()
+        self.driver.get(config.MAPS_URL) # Force English to standardize IDs/Labels if possible
+        self.pages_loaded += 1
+        self.start_network_capture()
         
         selectors = [
             (By.ID, "searchboxinput"),
@@ -49,16 +192,7 @@ class MapsScraper:
             (By.CSS_SELECTOR, "input[aria-label='Search Google Maps']")
         ]
         
-        search_box_input = None
-        for by, value in selectors:
-            try:
-                element = self.driver.find_element(by, value)
-                if element.is_displayed():
-                    search_box_input = element
-                    print(f"Found search box using {by}={value}")
-                    break
-            except:
-                continue
+        search_box_input = self.waits.search_box(selectors)
                 
         if not search_box_input:
             print("Could not find search box. Saving debug info to debug_screenshot.png and debug_page.html")
@@ -73,22 +207,30 @@ class MapsScraper:
         try:
             search_box_input.clear()
             search_box_input.send_keys(query)
-            # small delay
-            time.sleep(1)
             search_box_input.send_keys(Keys.ENTER)
             print(f"Searching for: {query}")
         except Exception as e:
             print(f"Error interacting with search box: {e}")
             return
             
-        time.sleep(random.uniform(3, 5))
+        self.waits.results()
+
+    def get_leads(self, max_leads=None):
+        """
+        Scrolls the results list and collects details for up to max_leads
+        (MAX_LEADS_PER_RUN by default).
+        """
+        return list(self.iter_leads(max_leads))
 
-    def get_leads(self):
+    def iter_leads(self, max_leads=None, skip_names=None):
         """
-        Scrolls the results list and collects details for up to MAX_LEADS_PER_RUN.
+        Same as get_leads, but yields each lead as soon as it is extracted.
+        skip_names are feed items already harvested (e.g. by a resumed run);
+        they are not clicked again and count towards max_leads.
         """
-        leads = []
-        processed_names = set()
+        max_leads = int(max_leads or config.MAX_LEADS_PER_RUN)
+        processed_names = set(skip_names or ())
+        found = len(processed_names)
         
         try:
             # Locate the scrollable feed
@@ -96,61 +238,145 @@ class MapsScraper:
             feed = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="feed"]')))
         except:
             print("Could not find results feed.")
-            return leads
+            return
+
+        item_count = self.waits.feed_count()
+        cursor = FeedCursor(self.driver)
+        click_failures = {}
 
         # Scroll loop
-        while len(leads) < config.MAX_LEADS_PER_RUN:
-            # Find all current items
-            items = self.driver.find_elements(By.CSS_SELECTOR, 'div[role="feed"] > div > div[role="article"]')
-            
-            # Filter for unprocessed items
-            new_items = []
-            for item in items:
-                try:
-                    aria_label = item.get_attribute("aria-label")
-                    if aria_label and aria_label not in processed_names:
-                        new_items.append(item)
-                except:
-                    continue
+        while found < max_leads:
+            self.read_network_log()
+
+            # Only the cards added since the last read, with their labels and links
+            # A feed re-rendering under us ends the query; any other WebDriver error (a crashed
+            # browser) propagates, so the query is not recorded as done and the session is dropped
+            try:
+                items = cursor.read()
+            except (StaleElementReferenceException, TimeoutException) as e:
+                print(f"Error reading results feed: {e}")
+                break
+            self.stats["feed_cards"] += len(items)
+            new_items = [(item, name, maps_url) for item, name, maps_url in items
+                         if name and name not in processed_names]
 
             if not new_items:
+                if cursor.finished():
+                    print(f"Reached the end of the results list ({found} leads).")
+                    break
                 # Scroll down
-                self.driver.execute_script("arguments[0].scrollBy(0, 1000);", feed)
-                time.sleep(random.uniform(2, 4))
-                
-                # Check if end of list
-                # (Simple check: if no new items found after scroll, maybe end)
-                # But let's verify if scrollHeight increased or textual "You've reached the end"
+                self.rate.wait()
+                with tracing.span("maps.scroll"):
+                    self.driver.execute_script("arguments[0].scrollBy(0, 1000);", feed)
+                    item_count = self.waits.feed_grew(item_count)
                 continue
             
             # Process new items (click and extract)
-            for item in new_items:
-                if len(leads) >= config.MAX_LEADS_PER_RUN:
+            for item, name, maps_url in new_items:
+                if found >= max_leads:
                     break
                     
                 try:
-                    name = item.get_attribute("aria-label")
-                    if not name: 
+                    # Blocked chains are dropped from the card name, before paying for a click
+                    if self.skip_matcher.match(name):
+                        print(f"Skipping (Keyword match): {name}")
+                        self.stats["keyword_skips"] += 1
+                        tracing.count("leads_skipped", reason="keyword")
+                        processed_names.add(name)
+                        continue
+
+                    if self.lead_index and self.lead_index.is_known(place_keys(maps_url)):
+                        print(f"Skipping known lead: {name}")
+                        self.stats["clicks_avoided"] += 1
+                        tracing.count("leads_skipped", reason="known")
+                        processed_names.add(name)
+                        continue
+
+                    captured = self.captured_lead(name, maps_url)
+                    if captured:
+                        captured["Business Name"] = name
+                        captured["Maps URL"] = maps_url or captured.get("Maps URL", "")
+                        self.stats["network_leads"] += 1
+                        found += 1
+                        processed_names.add(name)
+                        yield captured
                         continue
                         
                     print(f"Processing: {name}")
-                    item.click()
-                    time.sleep(random.uniform(config.ACTION_DELAY_MIN, config.ACTION_DELAY_MAX))
+                    self.rate.wait()
+                    with tracing.span("maps.click", lead=name):
+                        item.click()
+                        self.stats["clicks"] += 1
+                        self.waits.place_panel(name)
                     
-                    details = self.extract_details()
+                    with tracing.span("maps.extract", lead=name):
+                        details = self.extract_details()
                     details["Business Name"] = name # Ensure name is captured
+                    details["Maps URL"] = maps_url
                     
-                    leads.append(details)
+                    found += 1
                     processed_names.add(name)
+                    yield details
                     
                 except Exception as e:
                     print(f"Error clicking item: {e}")
+                    click_failures[name] = click_failures.get(name, 0) + 1
+                    if click_failures[name] <= config.CARD_CLICK_RETRIES:
+                        cursor.release(item)
             
-            # Scroll again after processing this batch, just in case
-            self.driver.execute_script("arguments[0].scrollBy(0, 1000);", feed)
-            time.sleep(2)
+            # Scroll again after processing this batch, unless the list is already complete
+            if cursor.at_end:
+                continue
+            self.rate.wait()
+            with tracing.span("maps.scroll"):
+                self.driver.execute_script("arguments[0].scrollBy(0, 1000);", feed)
+                item_count = self.waits.feed_grew(item_count)
 
-        return leads
+        self.read_network_log()
+        print(f"Extraction latency: {self.extraction_stats()}")
+        print(f"Wait timings: {self.waits.stats()}")
+        print(f"Clicks: {self.stats['clicks']}, avoided via lead index: {self.stats['clicks_avoided']}, "
+              f"avoided via keywords: {self.stats['keyword_skips']}, "
+              f"avoided via network capture: {self.stats['network_leads']}")
+        if self.network:
+            print(f"Network capture: {self.network.stats}")
+        if config.NETWORK_CAPTURE_ENABLED:
+            print(f"Browser traffic: {self.stats['bytes_downloaded'] / 1024:.0f} KB downloaded, "
+                  f"{self.stats['requests_blocked']} requests blocked")
+
+    def captured_lead(self, name, maps_url):
+        """
+        A copy of the lead captured from the search responses for this card,
+        or None if there is none or it lacks a NETWORK_REQUIRED_FIELDS field
+        (the card is then clicked as usual).
+        """
+        if not self.network:
+            return None
+        lead = self.network.lookup(name, maps_url)
+        if lead is None and self.network.poll():
+            # The page of results this card belongs to may have just arrived
+            lead = self.network.lookup(name, maps_url)
+        if lead is None or not all(lead.get(field) for field in config.NETWORK_REQUIRED_FIELDS):
+            return None
+        return dict(lead)
+
+    def read_network_log(self):
+        """
+        Processes the DevTools log since the last read: search responses in
+        network mode, and in every mode the bytes downloaded and requests
+        blocked (which also keeps chromedriver from buffering the log).
+        """
+        if self.network:
+            self.network.poll()
+            return
+        if not config.NETWORK_CAPTURE_ENABLED:
+            return
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception:
+            return
+        for message in log_messages(entries):
+            count_traffic(message, self.stats)
 
     def extract_details(self):
         details = {
@@ -163,68 +389,59 @@ class MapsScraper:
             "Category": "",
             "Socials": {} 
         }
-        
-        def safe_get_text(selector):
-            try:
-                el = self.driver.find_element(By.CSS_SELECTOR, selector)
-                return el.text
-            except:
-                return ""
 
-        def safe_get_attr(selector, attr):
-            try:
-                el = self.driver.find_element(By.CSS_SELECTOR, selector)
-                return el.get_attribute(attr)
-            except:
-                return ""
-
-        # Website
-        # Look for the globe icon or "Website" text. 
-        # Often has data-item-id="authority"
-        website_url = safe_get_attr('a[data-item-id="authority"]', 'href')
-        if not website_url:
-             # Try searching by aria-label "Website: "
-             website_url = safe_get_attr('a[aria-label^="Website:"]', 'href')
-        details["Website"] = website_url
-
-        # Phone
-        phone = safe_get_text('button[data-item-id^="phone"]')
-        if not phone:
-             phone = safe_get_attr('button[data-item-id^="phone"]', 'aria-label')
-        
+        # One WebDriver round trip reads every field from the open place panel
+        start = time.perf_counter()
+        try:
+            fields = self.driver.execute_script(EXTRACT_DETAILS_JS) or {}
+        except Exception as e:
+            print(f"Error extracting details: {e}")
+            fields = {}
+        self.extract_timings.append(time.perf_counter() - start)
+
+        details["Website"] = fields.get("website") or ""
+
+        phone = fields.get("phone") or ""
         if phone:
             phone = phone.replace("Phone: ", "")
             # Remove non-ascii and extra whitespace
             phone = "".join([c for c in phone if c.isascii()]).strip()
-        else:
-            phone = ""
-            
         details["Phone"] = phone
 
-        # Address
-        address = safe_get_text('button[data-item-id="address"]')
-        if not address:
-             address = safe_get_attr('button[data-item-id="address"]', 'aria-label')
-        details["Address"] = address.replace("Address: ", "") if address else ""
+        address = fields.get("address") or ""
+        details["Address"] = address.replace("Address: ", "")
 
-        # Rating & Reviews
-        # Often in a span like "4.5 stars 100 Reviews"
-        try:
-             # Find the main rating div
-             # It's usually near the top of the pane.
-             # Use xpath to find text that looks like rating
-             rating_el = self.driver.find_element(By.XPATH, '//span[@role="img" and contains(@aria-label, "stars")]')
-             rating_text = rating_el.get_attribute("aria-label")
-             if rating_text:
-                 parts = rating_text.split()
-                 details["Rating"] = parts[0]
-                 # Reviews often follows
-        except:
-            pass
+        # Rating label looks like "4.5 stars"
+        rating_text = fields.get("rating") or ""
+        if rating_text:
+            details["Rating"] = rating_text.split()[0]
+
+        # Reviews label looks like "1,234 reviews"
+        reviews_text = fields.get("reviews") or ""
+        reviews = "".join([c for c in reviews_text.split(" ")[0] if c.isdigit()])
+        details["Reviews"] = reviews
+
+        details["Category"] = fields.get("category") or ""
             
         return details
 
+    def extraction_stats(self):
+        """
+        Per-lead extract_details latency in milliseconds.
+        """
+        timings = sorted(self.extract_timings)
+        if not timings:
+            return {"count": 0}
+        return {
+            "count": len(timings),
+            "avg_ms": round(sum(timings) / len(timings) * 1000, 1),
+            "p50_ms": round(timings[len(timings) // 2] * 1000, 1),
+            "max_ms": round(timings[-1] * 1000, 1),
+        }
+
     def close(self):
+        if not self.owns_driver:
+            return # Leased drivers go back to the pool
         try:
             self.driver.quit()
         except:
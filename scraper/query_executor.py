@@ -0,0 +1,145 @@
+# scraper/query_executor.py
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import config
+from scraper.driver_pool import get_pool
+from scraper.maps_scraper import MapsScraper
+from utils.lead_index import get_lead_index
+from utils import tracing
+from utils.rate_limit import shared_limiters, install_shared_limiters
+
+def format_query(query_template, city):
+    # Handle if template or direct string
+    if "{city}" in query_template:
+        return query_template.format(city=city)
+    return query_template
+
+def expand_queries(cities, query_templates):
+    """
+    Expands every query template for every city, keeping order and
+    dropping exact repeats (a direct query string is city independent).
+    """
+    queries = []
+    seen = set()
+    for city in cities:
+        for query_template in query_templates:
+            query = format_query(query_template, city)
+            if query not in seen:
+                seen.add(query)
+                queries.append(query)
+    return queries
+
+def add_stats(total, stats):
+    # Counters add up; peak_* values (e.g. peak_rss_mb) keep the highest
+    for name, value in stats.items():
+        if name.startswith("peak_"):
+            total[name] = max(total.get(name, 0), value)
+        else:
+            total[name] = total.get(name, 0) + value
+    return total
+
+def iter_query_leads(query, max_leads=None, stats=None, skip_names=None, harvest_mode=None, viewport=None,
+                     label=None):
+    """
+    Searches one query on a leased browser and yields raw Maps leads as
+    they are extracted, tagged with their "Search Query". The scraper's
+    click and traffic counters, plus the browser's peak RSS, are added to
+    `stats`. skip_names are feed items harvested before (see
+    MapsScraper.iter_leads). viewport (lat, lng, zoom) anchors the search to
+    a map area; label then names the search in "Search Query" instead.
+    """
+    with get_pool().lease() as session:
+        maps_scraper = MapsScraper(driver=session.driver, lead_index=get_lead_index(), harvest_mode=harvest_mode)
+        found = 0
+        peak_rss = 0.0
+        sampled_at = time.monotonic()
+        try:
+            print(f"Running Query: {query}")
+            maps_scraper.search(query, viewport)
+            for lead in maps_scraper.iter_leads(max_leads, skip_names):
+                found += 1
+                lead["Search Query"] = label or query
+                if time.monotonic() - sampled_at >= config.BROWSER_RSS_SAMPLE_SECONDS:
+                    peak_rss = max(peak_rss, session.rss_mb() or 0.0)
+                    sampled_at = time.monotonic()
+                yield lead
+            print(f"Found {found} leads from Maps for: {label or query}")
+        finally:
+            session.pages += maps_scraper.pages_loaded
+            peak_rss = max(peak_rss, session.rss_mb() or 0.0)
+            tracing.count("browser_bytes_downloaded", maps_scraper.stats["bytes_downloaded"])
+            tracing.count("browser_requests_blocked", maps_scraper.stats["requests_blocked"])
+            if stats is not None:
+                add_stats(stats, maps_scraper.stats)
+                add_stats(stats, {"peak_rss_mb": round(peak_rss, 1)})
+
+def harvest_query(query, max_leads=None, skip_names=None, harvest_mode=None, viewport=None, label=None):
+    """
+    Runs one query to completion and returns (leads, click counters).
+    This is what worker processes run (each process has its own pool).
+    """
+    stats = {}
+    leads = list(iter_query_leads(query, max_leads, stats, skip_names, harvest_mode, viewport, label))
+    return leads, stats
+
+class QueryExecutor:
+    """
+    Fans queries out to `workers` independent browser sessions, one per
+    worker process. With a single worker the queries run in this process
+    on the shared driver pool.
+    """
+    def __init__(self, workers=None, harvest_mode=None):
+        self.workers = workers or config.MAPS_WORKERS
+        self.harvest_mode = harvest_mode or config.HARVEST_MODE
+        self.stats = {"clicks": 0, "clicks_avoided": 0, "keyword_skips": 0, "network_leads": 0,
+                      "bytes_downloaded": 0, "requests_blocked": 0, "peak_rss_mb": 0}
+
+    def iter_leads(self, queries, max_leads=None, on_query_done=None, skip_names=None):
+        """
+        Yields raw leads from every query. In-process each lead is yielded
+        as soon as it is extracted; worker processes hand back a query's
+        leads when that query finishes.
+        on_query_done(query, lead_count) is called as each query finishes.
+        A query that fails in a worker process is not reported done; the
+        other queries still run, then a RuntimeError names the failed ones
+        so the run stays unfinished and a resume retries them.
+        skip_names maps a query to feed items it already harvested.
+        """
+        skip_names = skip_names or {}
+        if self.workers <= 1 or len(queries) <= 1:
+            for query in queries:
+                count = 0
+                for lead in iter_query_leads(query, max_leads, self.stats, skip_names.get(query), self.harvest_mode):
+                    count += 1
+                    yield lead
+                if on_query_done:
+                    on_query_done(query, count)
+            return
+
+        # spawn: forking a process that already holds browser sessions or
+        # Flask threads is not safe
+        context = multiprocessing.get_context("spawn")
+        workers = min(self.workers, len(queries))
+        failed = []
+        # Worker processes share this process's MAPS/FETCH rate limits
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=install_shared_limiters,
+                                 initargs=(shared_limiters(context),)) as executor:
+            futures = {
+                executor.submit(harvest_query, query, max_leads, skip_names.get(query), self.harvest_mode): query
+                for query in queries
+            }
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    leads, stats = future.result()
+                    add_stats(self.stats, stats)
+                except Exception as e:
+                    print(f"Query failed: {query}: {e}")
+                    failed.append(query)
+                    continue
+                yield from leads
+                if on_query_done:
+                    on_query_done(query, len(leads))
+        if failed:
+            raise RuntimeError(f"{len(failed)} queries failed ({', '.join(failed)}); resume the run to retry them")
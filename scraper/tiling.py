@@ -0,0 +1,374 @@
+# scraper/tiling.py
+import json
+import math
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import config
+from scraper.query_executor import iter_query_leads, harvest_query, add_stats
+from utils.http_client import http_get
+from utils.lead_index import lead_keys, normalize_text
+from utils.rate_limit import shared_limiters, install_shared_limiters
+
+# Map area beside the results panel in the 1280x720 browser window
+MAP_WIDTH_PX = 880
+MAP_HEIGHT_PX = 720
+
+class Tile:
+    """
+    One node of a city's quadtree. key is the path of quadrants from the
+    whole bounding box ("") down: 0 south-west, 1 south-east, 2 north-west,
+    3 north-east. So the level is len(key).
+    """
+    def __init__(self, bbox, key=""):
+        self.bbox = tuple(bbox)
+        self.south, self.west, self.north, self.east = self.bbox
+        self.key = key
+
+    @property
+    def level(self):
+        return len(self.key)
+
+    @classmethod
+    def from_key(cls, bbox, key):
+        tile = cls(bbox)
+        for quadrant in key:
+            tile = tile.children()[int(quadrant)]
+        return tile
+
+    def children(self):
+        mid_lat = (self.south + self.north) / 2
+        mid_lng = (self.west + self.east) / 2
+        return [
+            Tile((self.south, self.west, mid_lat, mid_lng), self.key + "0"),
+            Tile((self.south, mid_lng, mid_lat, self.east), self.key + "1"),
+            Tile((mid_lat, self.west, self.north, mid_lng), self.key + "2"),
+            Tile((mid_lat, mid_lng, self.north, self.east), self.key + "3"),
+        ]
+
+    def descendants(self, level):
+        tiles = [self]
+        while tiles and tiles[0].level < level:
+            tiles = [child for tile in tiles for child in tile.children()]
+        return tiles
+
+    def viewport(self):
+        """
+        (lat, lng, zoom) of a map that shows the whole tile.
+        """
+        lat = (self.south + self.north) / 2
+        lng = (self.west + self.east) / 2
+        lng_span = max(self.east - self.west, 1e-6)
+        lat_span = max(self.north - self.south, 1e-6)
+        # At zoom z one degree of longitude is 256 * 2**z / 360 pixels; latitude is stretched by 1/cos(lat)
+        zoom_lng = math.log2(360 * MAP_WIDTH_PX / (256 * lng_span))
+        zoom_lat = math.log2(360 * MAP_HEIGHT_PX * math.cos(math.radians(lat)) / (256 * lat_span))
+        zoom = min(max(min(zoom_lng, zoom_lat), 3), 20)
+        return round(lat, 6), round(lng, 6), round(zoom, 1)
+
+    def label(self, query):
+        # Names the tile search in the journal and in "Search Query"
+        return f"{query} @tile:{self.key or 'root'}"
+
+def tile_query(template):
+    """
+    "Dentist near {city}" -> "Dentist": the viewport says where.
+    Queries without {city} are searched as written.
+    """
+    if "{city}" not in template:
+        return template
+    query = re.sub(r"\s*\b(?:near|in|around)\s+\{city\}", "", template, flags=re.I)
+    return " ".join(query.replace("{city}", "").split()) or template
+
+def tile_queries(templates):
+    queries = []
+    for template in templates:
+        query = tile_query(template)
+        if query not in queries:
+            queries.append(query)
+    return queries
+
+def parse_bbox(text):
+    """
+    "south,west,north,east" in degrees.
+    """
+    parts = [float(part) for part in text.split(",")]
+    if len(parts) != 4 or parts[0] >= parts[2] or parts[1] >= parts[3]:
+        raise ValueError(f"Bounding box must be south,west,north,east: {text}")
+    return tuple(parts)
+
+def geocode_bbox(city):
+    """
+    The city's bounding box from the OpenStreetMap geocoder (GEOCODE_URL).
+    """
+    response = http_get(
+        config.GEOCODE_URL, params={"q": city, "format": "json", "limit": 1},
+        headers={"User-Agent": config.GEOCODE_USER_AGENT},
+        timeout=(config.FETCH_CONNECT_TIMEOUT, config.FETCH_READ_TIMEOUT),
+    )
+    response.raise_for_status()
+    results = response.json()
+    if not results:
+        raise ValueError(f"Could not find a bounding box for {city!r}; pass one with --bbox")
+    south, north, west, east = (float(value) for value in results[0]["boundingbox"])
+    return south, west, north, east
+
+def city_bbox(city, history=None):
+    # The box an earlier tiled run used, so tile keys keep meaning the same area
+    history = history or TileHistory(city)
+    saved = history.data.get("bbox")
+    return tuple(saved) if saved else geocode_bbox(city)
+
+def dedup_keys(lead):
+    # Any shared key marks the same business; leads without one fall back to name + address
+    keys = lead_keys(lead)
+    if not keys:
+        keys = [f"name:{normalize_text(lead.get('Business Name'))}|{normalize_text(lead.get('Address'))}"]
+    return keys
+
+class TileHistory:
+    """
+    What earlier tiled runs learned about a city: its bounding box and,
+    per query, the leaf tiles searched with their feed size. Kept as JSON in
+    TILE_HISTORY_DIR so the next run starts from the tiles that paid off.
+    """
+    def __init__(self, city, directory=None):
+        directory = directory or config.TILE_HISTORY_DIR
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", city).strip("_").lower()
+        self.path = os.path.join(directory, f"{slug}.json")
+        self.data = {"city": city, "bbox": None, "leaves": {}}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.data.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+
+    def plan(self, query):
+        """
+        Tile keys to start `query` from: the last run's leaves, with sparse
+        siblings (four leaves under one parent, fewer than TILE_SPARSE_CARDS
+        results in total) merged back into their parent. None without history.
+        """
+        leaves = dict(self.data["leaves"].get(query) or {})
+        if not leaves:
+            return None
+        merged = True
+        while merged:
+            merged = False
+            for parent in sorted({key[:-1] for key in leaves if key}, key=len, reverse=True):
+                siblings = [parent + quadrant for quadrant in "0123"]
+                cards = [leaves.get(key) for key in siblings]
+                if all(isinstance(count, int) for count in cards) and sum(cards) < config.TILE_SPARSE_CARDS:
+                    for key in siblings:
+                        del leaves[key]
+                    leaves[parent] = sum(cards)
+                    merged = True
+        return sorted(leaves)
+
+    def record(self, query, leaves):
+        self.data["leaves"][query] = leaves
+
+class TileHarvester:
+    """
+    Searches a city tile by tile to get past Maps' cap of roughly 120
+    results per search. Every query starts from the last run's tiles (see
+    TileHistory) or a 4**TILE_START_LEVEL grid over the bounding box. Tile
+    searches run on `workers` browser sessions. A tile whose feed lists
+    TILE_SATURATION results or more is split into four, down to
+    TILE_MAX_LEVEL. Leads seen in an earlier tile are dropped before they
+    are yielded, so overlapping tiles are only enriched once.
+    max_leads caps the unique leads for the whole city (None: no cap).
+    search is iter_query_leads unless given (in-process runs only).
+    """
+    def __init__(self, city, queries, bbox=None, workers=None, harvest_mode=None, max_leads=None,
+                 stats=None, search=None):
+        self.city = city
+        self.queries = queries
+        self.workers = workers or config.MAPS_WORKERS
+        self.harvest_mode = harvest_mode or config.HARVEST_MODE
+        self.max_leads = max_leads
+        self.stats = stats if stats is not None else {}
+        self.search = search or iter_query_leads
+        self.history = TileHistory(city)
+        self.bbox = tuple(bbox) if bbox else None
+        self.tiles = []  # One report row per tile searched
+        self.planned = 0
+        self.unique = 0
+        self._seen = set()
+        self._leaves = {query: {} for query in queries}
+
+    def resolve_bbox(self):
+        if self.bbox is None:
+            self.bbox = city_bbox(self.city, self.history)
+        saved = self.history.data.get("bbox")
+        if saved and tuple(saved) != self.bbox:
+            # Tile keys from another box name other areas
+            self.history.data["leaves"] = {}
+        self.history.data["bbox"] = list(self.bbox)
+        return self.bbox
+
+    def initial_tiles(self, query):
+        keys = self.history.plan(query)
+        if keys is None:
+            return Tile(self.bbox).descendants(config.TILE_START_LEVEL)
+        return [Tile.from_key(self.bbox, key) for key in keys]
+
+    def _is_new(self, lead):
+        keys = dedup_keys(lead)
+        if any(key in self._seen for key in keys):
+            return False
+        self._seen.update(keys)
+        return True
+
+    def _full(self):
+        return self.max_leads is not None and self.unique >= self.max_leads
+
+    def _finish_tile(self, query, tile, cards, leads, unique, pending, on_tile_done):
+        saturated = cards >= config.TILE_SATURATION
+        split = saturated and tile.level < config.TILE_MAX_LEVEL
+        if split:
+            pending.extend((query, child) for child in tile.children())
+            self.planned += 4
+        else:
+            self._leaves[query][tile.key] = cards
+        self.tiles.append({
+            "query": query, "tile": tile.key or "root", "level": tile.level, "viewport": tile.viewport(),
+            "cards": cards, "leads": leads, "unique": unique, "saturated": saturated, "split": split,
+        })
+        print(f"Tile {tile.key or 'root'} ({query}): {cards} results, {unique} new leads"
+              + (", splitting" if split else ""))
+        if on_tile_done:
+            on_tile_done(tile.label(query), leads, cards)
+
+    def iter_leads(self, done=None, harvested_names=None, on_tile_done=None, known_leads=()):
+        """
+        Yields unique raw leads tile by tile.
+        done maps tile labels a crashed run finished to their feed size
+        (they are not searched again), harvested_names(label) lists the feed
+        items a label already yielded, and known_leads are the leads replayed
+        from the journal. on_tile_done(label, lead_count, cards) is called
+        as each tile finishes.
+        """
+        done = done or {}
+        self.resolve_bbox()
+        for lead in known_leads:
+            if self._is_new(lead):
+                self.unique += 1
+
+        pending = deque()
+        for query in self.queries:
+            for tile in self.initial_tiles(query):
+                pending.append((query, tile))
+        self.planned = len(pending)
+
+        def next_task():
+            # Tiles a crashed run finished only decide whether to split
+            while pending and not self._full():
+                query, tile = pending.popleft()
+                label = tile.label(query)
+                if label in done and done[label] is not None:
+                    self._finish_tile(query, tile, done[label], 0, 0, pending, None)
+                    continue
+                skip = harvested_names(label) if harvested_names else None
+                return query, tile, label, skip
+            return None
+
+        if self.workers <= 1:
+            while True:
+                task = next_task()
+                if task is None:
+                    break
+                query, tile, label, skip = task
+                stats = {}
+                leads = unique = 0
+                for lead in self.search(query, config.TILE_MAX_LEADS, stats, skip, self.harvest_mode,
+                                        tile.viewport(), label):
+                    leads += 1
+                    if self._is_new(lead):
+                        unique += 1
+                        self.unique += 1
+                        yield lead
+                        if self._full():
+                            break
+                add_stats(self.stats, stats)
+                if self._full():
+                    # Cut short, so its feed size says nothing about splitting
+                    pending.appendleft((query, tile))
+                    break
+                self._finish_tile(query, tile, stats.get("feed_cards", 0), leads, unique, pending, on_tile_done)
+        else:
+            # spawn: see QueryExecutor
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=install_shared_limiters,
+                                     initargs=(shared_limiters(context),)) as executor:
+                running = {}
+                while True:
+                    while len(running) < self.workers:
+                        task = next_task()
+                        if task is None:
+                            break
+                        query, tile, label, skip = task
+                        future = executor.submit(harvest_query, query, config.TILE_MAX_LEADS, skip,
+                                                 self.harvest_mode, tile.viewport(), label)
+                        running[future] = (query, tile)
+                    if not running:
+                        break
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        query, tile = running.pop(future)
+                        try:
+                            leads, stats = future.result()
+                        except Exception as e:
+                            print(f"Tile failed: {tile.label(query)}: {e}")
+                            continue
+                        add_stats(self.stats, stats)
+                        unique = 0
+                        for lead in leads:
+                            if self._is_new(lead) and not self._full():
+                                unique += 1
+                                self.unique += 1
+                                yield lead
+                        self._finish_tile(query, tile, stats.get("feed_cards", 0), len(leads), unique,
+                                          pending, on_tile_done)
+
+        # Tiles never searched (the lead cap was reached) stay in the plan for next time
+        for query, tile in pending:
+            previous = self.history.data["leaves"].get(query) or {}
+            self._leaves[query].setdefault(tile.key, previous.get(tile.key))
+        for query, leaves in self._leaves.items():
+            if leaves:
+                self.history.record(query, leaves)
+        self.history.save()
+
+    def report(self):
+        """
+        Unique leads per tile, and per subdivision level the tiles searched,
+        results listed, new unique leads and the marginal yield (new unique
+        leads per tile searched at that level).
+        """
+        levels = {}
+        for row in self.tiles:
+            level = levels.setdefault(row["level"], {"tiles": 0, "cards": 0, "unique": 0, "saturated": 0})
+            level["tiles"] += 1
+            level["cards"] += row["cards"]
+            level["unique"] += row["unique"]
+            level["saturated"] += int(row["saturated"])
+        for level in levels.values():
+            level["marginal_yield"] = round(level["unique"] / level["tiles"], 1)
+        return {
+            "city": self.city,
+            "bbox": list(self.bbox) if self.bbox else None,
+            "unique_leads": self.unique,
+            "levels": {str(level): levels[level] for level in sorted(levels)},
+            "tiles": self.tiles,
+        }
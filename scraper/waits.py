@@ -0,0 +1,120 @@
+# scraper/waits.py
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+import config
+
+FEED_ITEMS_SELECTOR = 'div[role="feed"] > div > div[role="article"]'
+
+# True once the place panel shows the business that was clicked
+PANEL_MATCHES_JS = """
+const name = arguments[0];
+for (const main of document.querySelectorAll('div[role="main"]')) {
+    if (main.getAttribute('aria-label') === name) return true;
+}
+for (const h1 of document.querySelectorAll('h1')) {
+    if ((h1.innerText || '').trim() === name) return true;
+}
+return false;
+"""
+
+COUNT_FEED_ITEMS_JS = "return document.querySelectorAll(arguments[0]).length;"
+
+# True once the feed shows Maps' "You've reached the end of the list." marker
+FEED_END_JS = """
+const feed = document.querySelector('div[role="feed"]');
+if (!feed) return false;
+if (feed.querySelector('span.HlvSq')) return true;
+const last = feed.lastElementChild;
+return !!last && /reached the end/i.test(last.textContent || '');
+"""
+
+class WaitStrategy:
+    """
+    Event-driven waits for the Maps flow. Each wait returns as soon as its
+    condition holds (or after its timeout) and records how long it took,
+    so fixed sleeps are only paid where the page is actually slow.
+    `politeness_delay` is an optional floor: a wait never returns sooner
+    than that many seconds after it started.
+    """
+    def __init__(self, driver, timeout=None, politeness_delay=None):
+        self.driver = driver
+        self.timeout = timeout or config.WAIT_TIMEOUT
+        self.politeness_delay = config.POLITENESS_DELAY if politeness_delay is None else politeness_delay
+        self.timings = {}
+
+    def _until(self, name, condition, timeout=None):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = WebDriverWait(self.driver, timeout or self.timeout, poll_frequency=0.1).until(condition)
+        except TimeoutException:
+            print(f"Wait '{name}' timed out after {timeout or self.timeout}s")
+
+        elapsed = time.perf_counter() - start
+        if elapsed < self.politeness_delay:
+            time.sleep(self.politeness_delay - elapsed)
+            elapsed = self.politeness_delay
+        self.timings.setdefault(name, []).append(elapsed)
+        return result
+
+    def search_box(self, selectors):
+        """
+        Waits for the first selector whose element is displayed and enabled.
+        """
+        def interactable(driver):
+            for by, value in selectors:
+                try:
+                    element = driver.find_element(by, value)
+                    if element.is_displayed() and element.is_enabled():
+                        print(f"Found search box using {by}={value}")
+                        return element
+                except Exception:
+                    continue
+            return False
+        return self._until("search_box", interactable)
+
+    def results(self):
+        """
+        Waits for the results feed to be present after a search.
+        """
+        def ready(driver):
+            return driver.execute_script("return document.querySelector('div[role=\"feed\"]');") or False
+        return self._until("results", ready)
+
+    def place_panel(self, name):
+        """
+        Waits until the place panel heading matches the clicked card's aria-label.
+        """
+        def matches(driver):
+            return driver.execute_script(PANEL_MATCHES_JS, name)
+        return self._until("place_panel", matches, timeout=config.PANEL_WAIT_TIMEOUT)
+
+    def feed_grew(self, previous_count):
+        """
+        Waits for the feed to hold more items than before a scroll, or for
+        the end-of-list marker. Returns the new item count (unchanged on timeout).
+        """
+        def grew(driver):
+            count = driver.execute_script(COUNT_FEED_ITEMS_JS, FEED_ITEMS_SELECTOR)
+            if count > previous_count or driver.execute_script(FEED_END_JS):
+                return (count,)
+            return False
+        result = self._until("feed_grew", grew, timeout=config.SCROLL_WAIT_TIMEOUT)
+        return result[0] if result else previous_count
+
+    def feed_count(self):
+        return self.driver.execute_script(COUNT_FEED_ITEMS_JS, FEED_ITEMS_SELECTOR)
+
+    def stats(self):
+        """
+        Count, total and average seconds spent per wait type.
+        """
+        summary = {}
+        for name, timings in self.timings.items():
+            summary[name] = {
+                "count": len(timings),
+                "total_s": round(sum(timings), 2),
+                "avg_s": round(sum(timings) / len(timings), 2),
+            }
+        return summary
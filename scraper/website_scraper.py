@@ -1,21 +1,177 @@
 # scraper/website_scraper.py
 import re
-import requests
+import threading
+import time
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+from utils.quality_score import calculate_quality_score
+from utils.http_cache import get_cache
+from utils.http_client import http_get
+from utils.rate_limit import get_limiter
+from utils import tracing
+from utils.signals import EMAIL_REGEX, PHONE_REGEX, scan_signals, html_to_text
+import config
 
-# Email Regex
-EMAIL_REGEX = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-# Phone Regex (US focused)
-PHONE_REGEX = r'(\+?1[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
+
+class Page:
+    """
+    A fetched website: one download, one signal scan.
+    Every check (contacts, socials, booking, quality score) reads from this
+    object; the BeautifulSoup tree is only built if something asks for it.
+    """
+    def __init__(self, url, final_url, status_code, headers, html, truncated=False):
+        self.url = url
+        self.final_url = final_url
+        self.status_code = status_code
+        self.headers = headers
+        self.html = html
+        self.truncated = truncated # Reading stopped at a byte or time cap
+        self.error = None # Set when analyzing the page failed
+        self._soup = None
+        self._text = None
+        self._signals = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, 'lxml')
+        return self._soup
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = html_to_text(self.html)
+        return self._text
+
+    @property
+    def signals(self):
+        if self._signals is None:
+            with tracing.span("web.parse", url=self.url):
+                self._signals = scan_signals(self.html, self.text)
+        return self._signals
+
+class FetchRejected(Exception):
+    """
+    Raised when a response is not worth downloading (e.g. a PDF).
+    """
+
+# Bounded fetch counters, shared by every thread in the process
+_fetch_stats = {"fetches": 0, "rejected": 0, "truncated": 0, "bytes_read": 0, "bytes_saved": 0}
+_fetch_stats_lock = threading.Lock()
+
+def _count_fetch(**fields):
+    with _fetch_stats_lock:
+        for name, value in fields.items():
+            _fetch_stats[name] += value
+
+def fetch_stats():
+    with _fetch_stats_lock:
+        return dict(_fetch_stats)
+
+def is_html(content_type):
+    # A missing Content-Type is given the benefit of the doubt
+    if not content_type:
+        return True
+    content_type = content_type.split(";")[0].strip().lower()
+    return content_type in ("text/html", "application/xhtml+xml", "text/plain")
+
+def read_bounded(response, deadline, max_bytes=None, body_bytes=None, tail_bytes=None):
+    """
+    Reads a streamed response until it ends, max_bytes arrive or the total
+    deadline passes. Past body_bytes after the end of <head> only the last
+    tail_bytes are kept: the middle of a long page is dropped, but its
+    footer (copyright year, contact email) still reaches the signal scan.
+    Returns (content, truncated, bytes_read); truncated means reading
+    stopped before the end of the page.
+    """
+    max_bytes = max_bytes or config.FETCH_MAX_BYTES
+    body_bytes = body_bytes or config.FETCH_BODY_BYTES
+    tail_bytes = tail_bytes or config.FETCH_TAIL_BYTES
+    front = bytearray()
+    tail = bytearray()
+    size = 0
+    front_limit = None
+    overlap = b""
+    truncated = False
+    for chunk in response.iter_content(chunk_size=16384):
+        chunk = chunk[:max_bytes - size]
+        size += len(chunk)
+
+        if front_limit is None:
+            # Search the new chunk plus a tag-sized overlap with the previous one
+            window = (overlap + chunk).lower()
+            position = window.find(b"</head>")
+            if position >= 0:
+                front_limit = size - len(window) + position + body_bytes
+            overlap = chunk[-6:]
+        room = len(chunk) if front_limit is None else max(0, front_limit - len(front))
+        front += chunk[:room]
+        tail += chunk[room:]
+        if len(tail) > tail_bytes:
+            del tail[:len(tail) - tail_bytes]
+        if size >= max_bytes or time.monotonic() >= deadline:
+            truncated = True
+            break
+
+    if size > len(front) + len(tail):
+        # The middle was dropped; start the tail at a tag so no half tag is scanned
+        start = tail.find(b"<")
+        tail = tail[start:] if start >= 0 else b""
+    return bytes(front + tail), truncated, size
+
+def fetch_page(url, timeout=None, headers=None, max_bytes=None):
+    """
+    Downloads the url once and wraps the response in a Page.
+    Extra headers (e.g. conditional request validators) are sent as given.
+    The body is streamed: non-HTML responses are rejected from their
+    headers and reading stops at max_bytes (FETCH_MAX_BYTES by default) or
+    at the total `timeout` deadline (ENRICH_TIMEOUT by default). Past
+    FETCH_BODY_BYTES after </head> only the last FETCH_TAIL_BYTES are kept
+    (see read_bounded).
+    """
+    get_limiter("web").wait() # Time spent queueing for FETCH_RATE_PER_MINUTE is not part of the deadline
+    deadline = time.monotonic() + (timeout or config.ENRICH_TIMEOUT)
+    request_headers = {"User-Agent": "Mozilla/5.0"}
+    if headers:
+        request_headers.update(headers)
+    with tracing.span("web.fetch", url=url) as span:
+        response = http_get(
+            url, stream=True, headers=request_headers, deadline=deadline,
+            timeout=(config.FETCH_CONNECT_TIMEOUT, config.FETCH_READ_TIMEOUT),
+        )
+        try:
+            content_length = int(response.headers.get("Content-Length") or 0)
+            content_type = response.headers.get("Content-Type", "")
+            if response.status_code == 200 and not is_html(content_type):
+                _count_fetch(fetches=1, rejected=1, bytes_saved=content_length)
+                raise FetchRejected(f"Non-HTML content ({content_type.split(';')[0]})")
+
+            content, truncated, bytes_read = read_bounded(response, deadline, max_bytes)
+            _count_fetch(
+                fetches=1,
+                truncated=int(truncated),
+                bytes_read=bytes_read,
+                bytes_saved=max(0, content_length - bytes_read) if truncated else 0,
+            )
+        finally:
+            response.close()
+        span.set(status=response.status_code, bytes=len(content))
+        tracing.count("bytes_fetched", len(content))
+
+    encoding = response.encoding or "utf-8"
+    html = content.decode(encoding, errors="replace")
+    return Page(url, response.url, response.status_code, response.headers, html, truncated)
 
 def extract_emails(text):
     return set(re.findall(EMAIL_REGEX, text))
 
 def extract_phones(text):
-    return set(re.findall(PHONE_REGEX, text))
+    return {match.group(0) for match in re.finditer(PHONE_REGEX, text)}
 
 def get_social_links(soup, base_url):
+    return classify_social_links([a['href'] for a in soup.find_all('a', href=True)])
+
+def classify_social_links(hrefs):
     socials = {
         "Instagram": "",
         "Facebook": "",
@@ -25,8 +181,7 @@ def get_social_links(soup, base_url):
         "YouTube": ""
     }
     
-    for a in soup.find_all('a', href=True):
-        href = a['href']
+    for href in hrefs:
         lower_href = href.lower()
         
         if "instagram.com" in lower_href:
@@ -44,11 +199,117 @@ def get_social_links(soup, base_url):
             
     return socials
 
-def analyze_website(url):
+# Anchor text/href words that point at pages likely to list contact details
+CONTACT_LINK_WEIGHTS = {
+    "contact": 10,
+    "about": 6,
+    "team": 5,
+    "appointment": 4,
+    "staff": 4,
+    "doctor": 3,
+    "location": 3,
+    "office": 2,
+}
+SKIP_LINK_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".zip", ".doc", ".docx", ".mp4")
+ANCHOR_REGEX = re.compile(
+    r"<a\b[^>]*?\bhref\s*=\s*[\"']([^\"'#]*)[^>]*>(.*?)</a\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+
+def site_host(url):
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def score_contact_link(href, anchor_text):
+    # The path and the anchor text each count, so a link agreeing on both wins
+    score = 0
+    for haystack in (urlparse(href).path.lower(), anchor_text.lower()):
+        score += sum(weight for word, weight in CONTACT_LINK_WEIGHTS.items() if word in haystack)
+    return score
+
+def find_contact_links(page, limit):
+    """
+    Ranks the page's internal links by how likely they lead to contact
+    details and returns up to `limit` absolute URLs, best first.
+    """
+    host = site_host(page.final_url)
+    scores = {}
+    for href, inner in ANCHOR_REGEX.findall(page.html):
+        url = urljoin(page.final_url, html_to_text(href).strip())
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or site_host(url) != host:
+            continue
+        if parsed.path.lower().endswith(SKIP_LINK_EXTENSIONS):
+            continue
+        score = score_contact_link(url, html_to_text(inner))
+        if score > scores.get(url, 0):
+            scores[url] = score
+    ranked = sorted(scores, key=lambda url: -scores[url])
+    return ranked[:limit]
+
+def has_booking_system(page):
+    return page.signals.has_booking
+
+def analyze_page(page, data=None):
+    """
+    Runs contact extraction and quality checks against an already fetched Page.
+    """
+    if data is None:
+        data = {
+            "Website": page.url,
+            "Emails": [],
+            "Phones": [],
+            "Socials": {},
+            "Quality Score": 10,
+            "Notes": ""
+        }
+
+    if page.status_code != 200:
+        data["Notes"] = f"Error: {page.status_code}"
+        return data
+
+    # Extract Contact Details from the page's single signal scan
+    signals = page.signals
+    data["Emails"] = list(signals.emails)
+    data["Phones"] = list(signals.phones)
+    data["Socials"] = classify_social_links(signals.links)
+
+    # Quality Score reuses the same response and signals
+    with tracing.span("web.score", url=page.url):
+        data["Quality Score"] = calculate_quality_score(page)
+
+    if not has_booking_system(page):
+        data["Notes"] += "No booking system detected. "
+
+    # Kept with the (cached) result so a later contact crawl needs no re-fetch
+    if config.CONTACT_CRAWL_ENABLED:
+        data["Contact Links"] = find_contact_links(page, config.CONTACT_CRAWL_MAX_PAGES)
+
+    return data
+
+def analyze_website(url, timeout=None, cache=None):
     """
     Visits the website and extracts contact details and quality score.
     Returns a dictionary with extracted data.
+    Results are served from the enrichment cache (utils.http_cache) when enabled.
     """
+    if not url:
+        return fetch_and_analyze(url, timeout)[1]
+
+    if cache is None:
+        cache = get_cache()
+    if cache is None:
+        return fetch_and_analyze(url, timeout)[1]
+
+    data = cache.lookup(url, lambda headers: fetch_and_analyze(url, timeout, headers))
+    data["Website"] = url
+    return data
+
+def fetch_and_analyze(url, timeout=None, headers=None, max_bytes=None):
+    """
+    Returns (page, data). page is None when the request itself failed.
+    """
+    page = None
     data = {
         "Website": url,
         "Emails": [],
@@ -60,43 +321,17 @@ def analyze_website(url):
     
     if not url:
         data["Notes"] = "No Website"
-        return data
+        return page, data
 
     try:
-        response = requests.get(url, timeout=15, headers={"User-Agent": "Mozilla/5.0"})
-        if response.status_code != 200:
-            data["Notes"] = f"Error: {response.status_code}"
-            return data
-            
-        soup = BeautifulSoup(response.text, 'lxml')
-        
-        # Extract Contact Details
-        text_content = soup.get_text()
-        emails = extract_emails(text_content)
-        phones = extract_phones(text_content)
-        socials = get_social_links(soup, url)
-        
-        # Check for booking keywords
-        booking_keywords = ["book online", "schedule appointment", "request appointment", "book now"]
-        has_booking = any(keyword in text_content.lower() for keyword in booking_keywords)
-        
-        data["Emails"] = list(emails)
-        data["Phones"] = list(phones)
-        data["Socials"] = socials
-        
-        # Calculate Quality Score
-        from utils.quality_score import calculate_quality_score
-        score = calculate_quality_score(url) # This might re-request, but we can refactor later to reuse soup if needed. 
-        # Actually, quality_score.py requests strictly to do its own checks (like header checks which bs4 doesn't do easily without requests obj).
-        # We can optimize by passing response object if we refactor quality_score.
-        # For now, let's just call it.
-        
-        data["Quality Score"] = score
-        
-        if not has_booking:
-            data["Notes"] += "No booking system detected. "
-            
+        page = fetch_page(url, timeout=timeout, headers=headers, max_bytes=max_bytes)
+        if page.status_code != 304:
+            analyze_page(page, data)
+    except FetchRejected as e:
+        data["Notes"] = f"Skipped: {str(e)}"
     except Exception as e:
         data["Notes"] = f"Scraping Error: {str(e)}"
+        if page is not None:
+            page.error = str(e)
         
-    return data
+    return page, data
@@ -8,6 +8,28 @@ document.addEventListener('DOMContentLoaded', () => {
     const resultMessage = document.getElementById('resultMessage');
     const totalLeads = document.getElementById('totalLeads');
     const errorMessage = document.getElementById('errorMessage');
+    const progressMessage = document.getElementById('progressMessage');
+    const POLL_INTERVAL_MS = 2000;
+
+    const resetButton = () => {
+        scrapeBtn.disabled = false;
+        scrapeBtn.querySelector('.btn-text').textContent = 'Start Scraping';
+        scrapeBtn.querySelector('.spinner').classList.add('hidden');
+    };
+
+    const showError = (message) => {
+        loadingArea.classList.add('hidden');
+        resetButton();
+        errorArea.classList.remove('hidden');
+        errorMessage.textContent = message;
+    };
+
+    const showProgress = (progress) => {
+        if (!progress) return;
+        progressMessage.textContent =
+            `Queries ${progress.queries_done}/${progress.queries_total} · ` +
+            `${progress.leads_scraped} leads scraped · ${progress.leads_enriched} enriched`;
+    };
 
     form.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -16,6 +38,7 @@ document.addEventListener('DOMContentLoaded', () => {
         resultsArea.classList.add('hidden');
         errorArea.classList.add('hidden');
         loadingArea.classList.remove('hidden');
+        progressMessage.textContent = 'Queued...';
         scrapeBtn.disabled = true;
         scrapeBtn.querySelector('.btn-text').textContent = 'Processing...';
         scrapeBtn.querySelector('.spinner').classList.remove('hidden');
@@ -24,7 +47,8 @@ document.addEventListener('DOMContentLoaded', () => {
         const formData = {
             city: document.getElementById('city').value,
             query: document.getElementById('query').value,
-            max_leads: document.getElementById('max_leads').value
+            max_leads: document.getElementById('max_leads').value,
+            format: document.getElementById('format').value
         };
 
         try {
@@ -38,32 +62,71 @@ document.addEventListener('DOMContentLoaded', () => {
 
             const data = await response.json();
 
-            loadingArea.classList.add('hidden');
-            scrapeBtn.disabled = false;
-            scrapeBtn.querySelector('.btn-text').textContent = 'Start Scraping';
-            scrapeBtn.querySelector('.spinner').classList.add('hidden');
-
-            if (response.ok && data.status === 'success') {
-                // Success
-                resultsArea.classList.remove('hidden');
-                resultMessage.textContent = data.summary.message;
-                totalLeads.textContent = data.summary.total_leads;
-                downloadLink.href = `/download/${data.filename}`;
-            } else {
-                // Warning or Error from API
-                errorArea.classList.remove('hidden');
-                errorMessage.textContent = data.message || "An unknown error occurred.";
+            if (!response.ok) {
+                showError(data.message || "An unknown error occurred.");
+                return;
             }
 
+            // Scrape runs as a background job; follow its progress over SSE
+            const jobUrl = `/jobs/${data.job_id}`;
+            const events = new EventSource(`${jobUrl}/events`);
+            events.onmessage = (event) => {
+                if (showJob(JSON.parse(event.data))) {
+                    events.close();
+                }
+            };
+            events.onerror = () => {
+                // The stream ended (server time limit, proxy idle cut, restart); the job itself
+                // keeps running, so keep following it by polling
+                events.close();
+                pollJob(jobUrl);
+            };
+
         } catch (error) {
             console.error('Error:', error);
-            loadingArea.classList.add('hidden');
-            scrapeBtn.disabled = false;
-            scrapeBtn.querySelector('.btn-text').textContent = 'Start Scraping';
-            scrapeBtn.querySelector('.spinner').classList.add('hidden');
-
-            errorArea.classList.remove('hidden');
-            errorMessage.textContent = "Failed to connect to the server.";
+            showError("Failed to connect to the server.");
         }
     });
+
+    const pollJob = async (jobUrl) => {
+        try {
+            const response = await fetch(jobUrl);
+            if (response.status === 404) {
+                showError("The job was not found on the server.");
+                return;
+            }
+            if (response.ok && showJob(await response.json())) {
+                return;
+            }
+        } catch (error) {
+            console.error('Error polling job:', error);
+        }
+        setTimeout(() => pollJob(jobUrl), POLL_INTERVAL_MS);
+    };
+
+    // Shows a job update; returns true once the job has finished or failed
+    const showJob = (job) => {
+        showProgress(job.progress);
+
+        if (job.status !== 'finished' && job.status !== 'failed') {
+            return false;
+        }
+        resetButton();
+        const result = job.result || {};
+
+        if (result.status === 'success') {
+            // Success
+            loadingArea.classList.add('hidden');
+            resultsArea.classList.remove('hidden');
+            resultMessage.textContent = result.summary.message;
+            totalLeads.textContent = result.summary.total_leads;
+            downloadLink.href = `/download/${result.filename}`;
+            const extension = result.filename.match(/\.(csv\.gz|csv|jsonl|parquet)$/);
+            downloadLink.textContent = extension ? `Download ${extension[1].toUpperCase()}` : 'Download';
+        } else {
+            // Warning or Error from the job
+            showError(result.message || "An unknown error occurred.");
+        }
+        return true;
+    };
 });
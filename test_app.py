@@ -22,15 +22,27 @@ def test_scrape():
     try:
         print("Testing POST /scrape (this may take a moment)...")
         response = requests.post(f"{BASE_URL}/scrape", json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            if data['status'] == 'success':
-                print(f"POST /scrape passed. Filename: {data.get('filename')}")
-                return data.get('filename')
-            else:
-                print(f"POST /scrape returned non-success: {data}")
-        else:
+        if response.status_code != 202:
             print(f"POST /scrape failed: {response.status_code} - {response.text}")
+            return None
+
+        job_id = response.json()['job_id']
+        print(f"POST /scrape queued job {job_id}")
+
+        # Poll the job until the background worker finishes it
+        while True:
+            job = requests.get(f"{BASE_URL}/jobs/{job_id}").json()
+            if job['status'] in ('finished', 'failed'):
+                break
+            print(f"Job {job['status']}: {job['progress']}")
+            time.sleep(2)
+
+        result = job.get('result', {})
+        if result.get('status') == 'success':
+            print(f"Job passed. Filename: {result.get('filename')}")
+            return result.get('filename')
+        else:
+            print(f"Job returned non-success: {job}")
     except Exception as e:
         print(f"POST /scrape failed with exception: {e}")
     return None
@@ -0,0 +1,39 @@
+# tests/test_contact_crawler.py
+from scraper.contact_crawler import CrawlFrontier, merge_contacts
+
+def test_bytes_are_split_over_the_fetches_still_allowed():
+    frontier = CrawlFrontier(["http://a.com/contact", "http://a.com/about", "http://a.com/team"],
+                             max_pages=2, max_bytes=1000)
+
+    url, allowance = frontier.next()
+    assert (url, allowance) == ("http://a.com/contact", 500)
+    # The page used 100 bytes; the rest goes to the last allowed fetch
+    frontier.release(allowance, 100)
+    assert frontier.next() == ("http://a.com/about", 900)
+    assert frontier.next() == (None, 0)
+
+def test_fewer_urls_than_pages_get_a_bigger_share():
+    frontier = CrawlFrontier(["http://a.com/contact"], max_pages=5, max_bytes=1000)
+    assert frontier.next() == ("http://a.com/contact", 1000)
+    assert frontier.next() == (None, 0)
+
+def test_urls_are_handed_out_once():
+    frontier = CrawlFrontier(["http://a.com/contact", "http://A.com/contact#form", "http://a.com/"],
+                             max_pages=10, max_bytes=1000, seen=["http://a.com"])
+    frontier.add("http://a.com/contact?utm_source=x")
+
+    url, allowance = frontier.next()
+    assert url == "http://a.com/contact"
+    assert frontier.next() == (None, 0)
+
+def test_stop_ends_the_crawl():
+    frontier = CrawlFrontier(["http://a.com/1", "http://a.com/2"], max_pages=10, max_bytes=1000)
+    assert frontier.stop() == 2
+    assert frontier.next() == (None, 0)
+
+def test_merge_keeps_what_the_homepage_had():
+    data = {"Emails": [], "Phones": ["1"], "Socials": {"facebook": "fb/home"}}
+    merge_contacts(data, {"Emails": ["a@b.com"], "Phones": ["1", "2"],
+                          "Socials": {"facebook": "fb/other", "instagram": "ig"}})
+    assert data == {"Emails": ["a@b.com"], "Phones": ["1", "2"],
+                    "Socials": {"facebook": "fb/home", "instagram": "ig"}}
@@ -0,0 +1,103 @@
+# tests/test_enrichment.py
+import threading
+import time
+from scraper.enrichment import EnrichmentEngine
+
+def make_analyze(delay=0.05, fail=()):
+    """
+    Fake analyze: sleeps `delay`, records the peak concurrent fetches per
+    host, and raises for urls in `fail`.
+    """
+    lock = threading.Lock()
+    current = {}
+    peak = {}
+
+    def analyze(url, timeout=None):
+        host = url.split("/")[2]
+        with lock:
+            current[host] = current.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), current[host])
+        time.sleep(delay)
+        with lock:
+            current[host] -= 1
+        if url in fail:
+            raise ValueError("boom")
+        return {"Notes": url}
+
+    analyze.peak = peak
+    return analyze
+
+def lead(name, website=None):
+    return {"Business Name": name, "Website": website} if website else {"Business Name": name}
+
+def test_yields_in_input_order_with_errors_and_no_website():
+    leads = [lead(f"a{i}", f"http://a.com/{i}") for i in range(6)]
+    leads.insert(2, lead("no site"))
+    leads.append(lead("bad", "http://bad.com/"))
+    engine = EnrichmentEngine(concurrency=4, per_domain=2, analyze=make_analyze(fail={"http://bad.com/"}))
+
+    out = list(engine.iter_enriched(leads))
+
+    assert [l["Business Name"] for l in out] == [l["Business Name"] for l in leads]
+    assert out[2]["Notes"] == "No Website listed on Maps."
+    assert out[-1]["Notes"].startswith("Scraping Error")
+
+def test_per_host_limit_does_not_block_other_hosts():
+    analyze = make_analyze(delay=0.1)
+    leads = [lead(f"a{i}", f"http://a.com/{i}") for i in range(8)]
+    leads += [lead(f"b{i}", f"http://b{i}.com/") for i in range(8)]
+    engine = EnrichmentEngine(concurrency=8, per_domain=2, analyze=analyze)
+
+    start = time.time()
+    out = list(engine.iter_enriched(leads))
+    elapsed = time.time() - start
+
+    assert len(out) == 16
+    assert analyze.peak["a.com"] == 2
+    # 8 same-host leads at 2 at a time is 4 rounds; the other hosts run alongside them
+    assert elapsed < 0.6
+
+def test_finished_leads_are_yielded_before_a_slow_harvest_ends():
+    produced = []
+
+    def slow_producer():
+        for i in range(10):
+            time.sleep(0.1)
+            produced.append(i)
+            yield lead(f"l{i}", f"http://h{i}.com/")
+
+    engine = EnrichmentEngine(concurrency=4, per_domain=2, analyze=make_analyze(delay=0.01))
+    seen_at_yield = []
+    for _ in engine.iter_enriched(slow_producer()):
+        seen_at_yield.append(len(produced))
+
+    assert len(seen_at_yield) == 10
+    # Each lead comes out shortly after it is harvested, not once the window fills or the harvest ends
+    assert seen_at_yield[0] <= 2
+    assert all(seen <= index + 2 for index, seen in enumerate(seen_at_yield))
+
+def test_reuses_done_results_without_fetching():
+    analyze = make_analyze()
+    engine = EnrichmentEngine(concurrency=2, analyze=analyze)
+    done = {"cached": {"Business Name": "cached", "Notes": "from journal"}}
+
+    out = list(engine.iter_enriched([lead("cached", "http://c.com/")], done=done))
+
+    assert out[0]["Notes"] == "from journal"
+    assert analyze.peak == {}
+
+def test_upstream_error_is_raised_after_in_flight_leads():
+    def failing_producer():
+        yield lead("a", "http://a.com/")
+        raise RuntimeError("harvest failed")
+
+    engine = EnrichmentEngine(concurrency=2, analyze=make_analyze())
+    out = []
+    try:
+        for item in engine.iter_enriched(failing_producer()):
+            out.append(item)
+    except RuntimeError as e:
+        assert str(e) == "harvest failed"
+    else:
+        raise AssertionError("upstream error was swallowed")
+    assert [l["Business Name"] for l in out] == ["a"]
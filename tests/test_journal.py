@@ -0,0 +1,44 @@
+# tests/test_journal.py
+from utils.journal import RunJournal
+
+def test_replays_events_and_ignores_a_torn_last_line(tmp_path):
+    journal = RunJournal("run1", directory=str(tmp_path))
+    journal.append("start", params={"city": "Austin", "queries": ["q1", "q2"]})
+    journal.append("harvested", query="q1", lead={"Business Name": "A"})
+    journal.append("harvested", query="q1", lead={"Business Name": "B"})
+    journal.append("query_done", query="q1")
+    journal.append("harvested", query="q2", lead={"Business Name": "C"})
+    journal.append("query_done", query="q2", cards=7)
+    journal.append("enriched", lead={"Business Name": "A", "Notes": "ok"})
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "enriched", "lead": {"Busi')  # crash mid-write
+
+    state = RunJournal("run1", directory=str(tmp_path)).load()
+
+    assert state.params["city"] == "Austin"
+    assert [lead["Business Name"] for query, lead in state.harvested] == ["A", "B", "C"]
+    assert state.harvested_names("q1") == ["A", "B"]
+    assert state.done_queries == {"q1", "q2"}
+    assert state.query_cards == {"q1": None, "q2": 7}
+    assert list(state.enriched) == ["A"]
+    assert state.result is None
+
+def test_resumed_run_appends_to_the_same_journal(tmp_path):
+    journal = RunJournal("run2", directory=str(tmp_path))
+    journal.append("harvested", query="q", lead={"Business Name": "A"})
+    journal.close()
+
+    resumed = RunJournal("run2", directory=str(tmp_path))
+    assert resumed.exists()
+    resumed.append("harvested", query="q", lead={"Business Name": "B"})
+    resumed.append("finished", result={"leads": 2})
+    resumed.close()
+
+    state = resumed.load()
+    assert state.harvested_names() == ["A", "B"]
+    assert state.result == {"leads": 2}
+
+def test_missing_journal_loads_empty(tmp_path):
+    state = RunJournal("nope", directory=str(tmp_path)).load()
+    assert state.params is None and state.harvested == []
@@ -0,0 +1,35 @@
+# tests/test_keyword_filter.py
+import random
+import config
+from utils.keyword_filter import KeywordMatcher, get_skip_matcher
+
+def naive_match(keywords, text):
+    # The loop the matcher replaced: any keyword as a case-insensitive substring
+    text = (text or "").lower()
+    return any(k.lower() in text for k in keywords if k)
+
+def test_agrees_with_the_naive_loop():
+    keywords = ["Aspen", "dental care", "care", "he", "she", "hers", "smile direct", ""]
+    matcher = KeywordMatcher(keywords)
+    rng = random.Random(7)
+    alphabet = "aspenhrsdtlcmiy "
+    names = ["", "Aspen Dental", "ASPEN", "Bright Smile", "Ushers", "shore dental care", "Smile Direct Club"]
+    names += ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 24))) for _ in range(500)]
+
+    for name in names:
+        assert (matcher.match(name) is not None) == naive_match(keywords, name), name
+
+def test_returns_a_keyword_that_occurs_in_the_text():
+    matcher = KeywordMatcher(["hers", "she"])
+    assert matcher.match("Ushers Dental") in ("hers", "she")
+    assert matcher.match("Ushers Dental").lower() in "ushers dental"
+    assert KeywordMatcher([]).match("anything") is None
+
+def test_skip_matcher_follows_a_replaced_keyword_list(monkeypatch):
+    monkeypatch.setattr(config, "SKIP_KEYWORDS", ["Aspen"])
+    assert get_skip_matcher().match("Aspen Dental") == "Aspen"
+    assert get_skip_matcher() is get_skip_matcher()
+
+    monkeypatch.setattr(config, "SKIP_KEYWORDS", ["Western"])
+    assert get_skip_matcher().match("Aspen Dental") is None
+    assert get_skip_matcher().match("Western Dental") == "Western"
@@ -0,0 +1,73 @@
+# tests/test_lead_store.py
+import itertools
+import os
+import pytest
+from utils import lead_store
+from utils.lead_store import SQLiteLeadStore
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    # Each upsert batch gets its own, strictly later scraped_at
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(lead_store.time, "time", lambda: float(next(ticks)))
+
+def make_lead(i, city="Austin", score=9):
+    return {"Business Name": f"Dentist {i}", "Phone": f"(512) 555-{i:04d}", "City": city, "Quality Score": score}
+
+def page_through(store, limit, **filters):
+    ids = []
+    cursor = None
+    while True:
+        rows, cursor = store.query(cursor=cursor, limit=limit, **filters)
+        ids += [row["id"] for row in rows]
+        if cursor is None:
+            return ids
+
+def test_cursor_pages_cover_every_lead_once_newest_first(tmp_path):
+    store = SQLiteLeadStore(os.path.join(str(tmp_path), "leads.db"))
+    store.upsert([make_lead(i) for i in range(10)], run_id="r1")
+    store.upsert([make_lead(i) for i in range(10, 13)], run_id="r2")
+
+    ids = page_through(store, limit=3)
+
+    everything, cursor = store.query(limit=100)
+    assert cursor is None
+    assert ids == [row["id"] for row in everything]
+    assert len(set(ids)) == 13
+    # The second batch was scraped later, so it comes first
+    assert {row["lead"]["Business Name"] for row in everything[:3]} == {"Dentist 10", "Dentist 11", "Dentist 12"}
+
+def test_pages_stay_stable_when_leads_are_added_while_paging(tmp_path):
+    store = SQLiteLeadStore(os.path.join(str(tmp_path), "leads.db"))
+    store.upsert([make_lead(i) for i in range(6)])
+
+    first, cursor = store.query(limit=3)
+    store.upsert([make_lead(i) for i in range(100, 105)])
+    second, cursor = store.query(cursor=cursor, limit=3)
+
+    assert cursor is None
+    seen = [row["id"] for row in first + second]
+    assert len(set(seen)) == 6
+    assert not any(row["lead"]["Business Name"].startswith("Dentist 10") for row in second)
+
+def test_filters_apply_to_every_page(tmp_path):
+    store = SQLiteLeadStore(os.path.join(str(tmp_path), "leads.db"))
+    store.upsert([make_lead(i, city="Austin" if i % 2 else "Dallas", score=i) for i in range(10)])
+
+    ids = page_through(store, limit=2, city="austin", min_score=5)
+
+    assert len(ids) == 3  # 5, 7 and 9
+
+def test_upsert_refreshes_instead_of_adding(tmp_path):
+    store = SQLiteLeadStore(os.path.join(str(tmp_path), "leads.db"))
+    store.upsert([make_lead(1, score=5)])
+    store.upsert([make_lead(1, score=9)])
+
+    rows, cursor = store.query()
+    assert len(rows) == 1
+    assert rows[0]["lead"]["Quality Score"] == 9
+
+def test_invalid_cursor_is_rejected(tmp_path):
+    store = SQLiteLeadStore(os.path.join(str(tmp_path), "leads.db"))
+    with pytest.raises(ValueError):
+        store.query(cursor="not-a-cursor")
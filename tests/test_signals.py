@@ -0,0 +1,30 @@
+# tests/test_signals.py
+import pytest
+from benchmarks.bench_signals import legacy_analyze, single_pass_analyze, SIGNAL_NAMES
+
+def page(body, head=""):
+    return f"<html><head>{head}</head><body>{body}</body></html>"
+
+EDGE_CASES = [
+    page("Call (512) 555-0187 or +1 512.555.0188"),
+    page("Tel5125550187 ext x5125550188"),
+    page("Mail info@smile.com, or front.desk+new@smile.co.uk."),
+    page("reallylongwordwithoutanyat" * 40 + " then hello@a.io"),
+    page("<p>Book Now</p><p>request appointment</p>"),
+    page("", head='<meta name="viewport" content="width=device-width">'),
+    page("", head="<meta content='width=device-width' name=viewport>"),
+    page("", head='<meta name="viewport-ish" content="x">'),
+    page("", head='<meta data-name="viewport" content="x">'),
+    page("", head='<meta name=viewport>'),
+    page("", head='<meta name="viewport" content="uses react">'),
+    page("&copy; 2019 Smile &copy; 2023 <!-- © 2031 -->"),
+    page('<a href="/contact">Contact</a><a href=\'/About-Us\'>About</a><a>none</a>'),
+    page('<script>window.__NEXT_DATA__ = {}</script><link href="tailwind.css">'),
+    page(""),
+]
+
+@pytest.mark.parametrize("html", EDGE_CASES)
+def test_single_pass_agrees_with_legacy(html):
+    legacy = legacy_analyze(html)
+    scanned = single_pass_analyze(html)
+    assert [name for name, old, new in zip(SIGNAL_NAMES, legacy, scanned) if old != new] == []
@@ -1,56 +1,281 @@
 # utils/file_manager.py
 import csv
+import gzip
+import io
+import json
 import os
+import zlib
 from datetime import datetime
 import config
+from utils import tracing
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pyarrow = None
+    pq = None
 
 def setup_output_dir():
     if not os.path.exists(config.OUTPUT_DIR):
         os.makedirs(config.OUTPUT_DIR)
 
-def save_to_csv(data, filename=None):
-    setup_output_dir()
-    
-    if filename is None:
-        filename = config.CSV_FILENAME
-        
-    filepath = os.path.join(config.OUTPUT_DIR, filename)
-    
-    # Define headers based on the requirements
-    headers = [
-        "Business Name", "Website", "Phone", "Email", 
-        "Instagram", "Facebook", "LinkedIn", "WhatsApp", 
-        "City", "State", "Rating", "Reviews", "Quality Score", "Notes"
-    ]
-    
-    file_exists = os.path.isfile(filepath)
-    
-    with open(filepath, mode='a', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=headers)
-        
+# Define headers based on the requirements
+HEADERS = [
+    "Business Name", "Website", "Phone", "Email", 
+    "Instagram", "Facebook", "LinkedIn", "WhatsApp", 
+    "City", "State", "Rating", "Reviews", "Quality Score", "Notes"
+]
+
+# Output formats and their file extensions
+OUTPUT_FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "jsonl": ".jsonl", "parquet": ".parquet"}
+
+def resolve_format(name=None):
+    name = name or config.OUTPUT_FORMAT
+    if name not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {name!r}, expected one of {sorted(OUTPUT_FORMATS)}")
+    if name == "parquet" and pyarrow is None:
+        raise ValueError("Parquet output needs pyarrow (pip install pyarrow)")
+    return name
+
+def parquet_available():
+    return pyarrow is not None
+
+def output_filename(stem, fmt=None):
+    return stem + OUTPUT_FORMATS[resolve_format(fmt)]
+
+def output_stem(filename):
+    # The file name without its format extension (runs and journals are named after it)
+    fmt = format_of(filename)
+    if filename.endswith(OUTPUT_FORMATS[fmt]):
+        return filename[:-len(OUTPUT_FORMATS[fmt])]
+    return os.path.splitext(filename)[0]
+
+def format_of(filename):
+    for name, extension in sorted(OUTPUT_FORMATS.items(), key=lambda item: -len(item[1])):
+        if filename.endswith(extension):
+            return name
+    return "csv"
+
+class CsvLeadWriter:
+    """
+    Appends leads to a CSV one row at a time, flushing after each row so a
+    crash never loses finished leads. The file is only created once the
+    first row arrives. Rows are cut down to HEADERS, the schema every
+    writer shares.
+    """
+    span_name = "csv.write"
+
+    def __init__(self, filename=None):
+        if filename is None:
+            filename = config.CSV_FILENAME
+        self.filepath = os.path.join(config.OUTPUT_DIR, filename)
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def _open(self):
+        file_exists = os.path.isfile(self.filepath)
+        self._file = open(self.filepath, mode='a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=HEADERS)
         if not file_exists:
-            writer.writeheader()
-            
-        for row in data:
+            self._writer.writeheader()
+
+    def _write_row(self, row):
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def write(self, row):
+        if self._file is None:
+            setup_output_dir()
+            self._open()
+
+        with tracing.span(self.span_name):
             # Filter row to ensure only valid headers are written
-            filtered_row = {k: row.get(k, "") for k in headers}
-            writer.writerow(filtered_row)
+            filtered_row = {k: row.get(k, "") for k in HEADERS}
+            self._write_row(filtered_row)
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class GzipCsvLeadWriter(CsvLeadWriter):
+    """
+    CSV inside gzip. Compressed output is flushed every OUTPUT_CHUNK_ROWS
+    rows (a flush per row would undo most of the compression). Appending
+    adds a gzip member, which every gzip reader reads through.
+    """
+    span_name = "csv.gz.write"
+
+    def _open(self):
+        file_exists = os.path.isfile(self.filepath)
+        self._file = gzip.open(self.filepath, mode='at', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=HEADERS)
+        if not file_exists:
+            self._writer.writeheader()
+
+    def _write_row(self, row):
+        self._writer.writerow(row)
+        if (self.count + 1) % config.OUTPUT_CHUNK_ROWS == 0:
+            self._file.flush()
+
+class JsonlLeadWriter(CsvLeadWriter):
+    """
+    One JSON object per line, keys in HEADERS order, flushed per row.
+    """
+    span_name = "jsonl.write"
+
+    def _open(self):
+        self._file = open(self.filepath, mode='a', encoding='utf-8')
+
+    def _write_row(self, row):
+        self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+class ParquetLeadWriter(CsvLeadWriter):
+    """
+    Parquet with one string column per HEADERS entry. Rows are buffered and
+    written as a row group every OUTPUT_CHUNK_ROWS rows, so memory stays
+    flat however many leads a run writes. The file is only readable once
+    closed; a crashed run rebuilds it from its journal on resume.
+    """
+    span_name = "parquet.write"
+
+    def __init__(self, filename=None):
+        super().__init__(filename)
+        self._rows = []
+
+    def _open(self):
+        resolve_format("parquet")
+        schema = pyarrow.schema([(name, pyarrow.string()) for name in HEADERS])
+        self._file = pq.ParquetWriter(self.filepath, schema)
+
+    def _write_row(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= config.OUTPUT_CHUNK_ROWS:
+            self._flush_rows()
+
+    def _flush_rows(self):
+        if self._rows:
+            columns = {name: ["" if row[name] is None else str(row[name]) for row in self._rows] for name in HEADERS}
+            self._file.write_table(pyarrow.table(columns, schema=self._file.schema))
+            self._rows = []
+
+    def close(self):
+        if self._file is not None:
+            self._flush_rows()
+        super().close()
+
+LEAD_WRITERS = {
+    "csv": CsvLeadWriter,
+    "csv.gz": GzipCsvLeadWriter,
+    "jsonl": JsonlLeadWriter,
+    "parquet": ParquetLeadWriter,
+}
+
+def get_lead_writer(filename, fmt=None):
+    """
+    The streaming writer for `fmt` (taken from the file extension when omitted).
+    """
+    return LEAD_WRITERS[resolve_format(fmt or format_of(filename))](filename)
+
+def iter_lead_rows(filepath):
+    """
+    Reads back a file written by one of the lead writers, one row at a time.
+    """
+    fmt = format_of(filepath)
+    if fmt == "parquet":
+        resolve_format(fmt)
+        parquet_file = pq.ParquetFile(filepath)
+        for group in range(parquet_file.num_row_groups):
+            yield from parquet_file.read_row_group(group).to_pylist()
+        return
+    opener = gzip.open if fmt == "csv.gz" else open
+    with opener(filepath, mode='rt', newline='', encoding='utf-8') as f:
+        if fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+def iter_csv(rows):
+    """
+    Streams rows as CSV text (header first), one encoded line at a time.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=HEADERS, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({k: row.get(k, "") for k in HEADERS})
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def iter_gzip(filepath, chunk_size=None):
+    """
+    Streams a file gzip-compressed, one chunk at a time (for
+    Content-Encoding: gzip downloads).
+    """
+    chunk_size = chunk_size or config.DOWNLOAD_CHUNK_BYTES
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    with open(filepath, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    yield compressor.flush()
+
+def save_to_csv(data, filename=None):
+    with CsvLeadWriter(filename) as writer:
+        for row in data:
+            writer.write(row)
             
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] Saved {len(data)} leads to {filepath}")
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Saved {len(data)} leads to {writer.filepath}")
 
-def generate_summary(data):
-    total_leads = len(data)
-    high_quality_leads = len([d for d in data if d.get('Quality Score', 0) >= 8])
-    
-    summary = f"""
+class LeadSummary:
+    """
+    Running totals for the scraping summary, updated one lead at a time.
+    """
+    def __init__(self):
+        self.total_leads = 0
+        self.high_quality_leads = 0
+
+    def add(self, lead):
+        self.total_leads += 1
+        if lead.get('Quality Score', 0) >= 8:
+            self.high_quality_leads += 1
+
+    def write(self):
+        summary = f"""
     --- Scraping Summary ---
-    Total Leads Scraped: {total_leads}
-    High Quality Leads (Score >= 8): {high_quality_leads}
+    Total Leads Scraped: {self.total_leads}
+    High Quality Leads (Score >= 8): {self.high_quality_leads}
     Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     """
-    
-    summary_path = os.path.join(config.OUTPUT_DIR, "summary.txt")
-    with open(summary_path, "a") as f:
-        f.write(summary + "\n")
         
-    return summary
+        setup_output_dir()
+        summary_path = os.path.join(config.OUTPUT_DIR, "summary.txt")
+        with open(summary_path, "a") as f:
+            f.write(summary + "\n")
+            
+        return summary
+
+def generate_summary(data):
+    summary = LeadSummary()
+    for lead in data:
+        summary.add(lead)
+    return summary.write()
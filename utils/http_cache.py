@@ -0,0 +1,217 @@
+# utils/http_cache.py
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import config
+
+# Tracking parameters that never change the page content
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "msclkid", "y_source")
+
+# Response headers kept with each entry
+STORED_HEADERS = ("ETag", "Last-Modified", "Content-Type")
+
+class _Inflight:
+    """
+    One fetch other lookups of the same key are waiting on, and its outcome.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def normalize_url(url):
+    """
+    Cache key for a URL: lowercase scheme and host, no default port,
+    no fragment, tracking params dropped and the rest sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path or "/"
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ]
+    return urlunsplit((scheme, host, path, urlencode(sorted(query)), ""))
+
+class EnrichmentCache:
+    """
+    On-disk cache of analyze_website results keyed by normalized URL.
+    - Fresh entries (younger than ttl) are served without any request.
+    - Stale entries with an ETag/Last-Modified are revalidated with a
+      conditional request; a 304 extends them without re-analyzing.
+    - Concurrent lookups for the same key share one fetch, cached or not.
+    - Least recently used entries are evicted past max_entries/max_bytes.
+    """
+    def __init__(self, path=None, ttl=None, max_entries=None, max_bytes=None):
+        self.path = path or config.HTTP_CACHE_PATH
+        self.ttl = ttl or config.HTTP_CACHE_TTL
+        self.max_entries = max_entries or config.HTTP_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or config.HTTP_CACHE_MAX_BYTES
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "revalidations": 0,
+            "refreshes": 0,
+            "coalesced": 0,
+            "evictions": 0,
+        }
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                final_url TEXT,
+                status INTEGER,
+                headers TEXT,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._connect().execute("CREATE INDEX IF NOT EXISTS entries_access ON entries (last_access)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def lookup(self, url, fetch):
+        """
+        Returns the analysis for url, from the cache when possible.
+        fetch(request_headers) must return (page, data); page may be None
+        when the request failed, and page.status_code 304 means not modified.
+        Pages with page.truncated or page.error set are not cached.
+        """
+        key = normalize_url(url)
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[key] = _Inflight()
+        if not leader:
+            # The leader's outcome is handed over even when it was not cached
+            # (an error or a cut-off page), so waiters never fetch it again
+            inflight.done.wait()
+            self._count("coalesced")
+            if inflight.error is not None:
+                raise inflight.error
+            return copy.deepcopy(inflight.result)
+
+        try:
+            inflight.result = self._lookup(key, fetch)
+            return copy.deepcopy(inflight.result)
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key)
+            inflight.done.set()
+
+    def _lookup(self, key, fetch):
+        row = self._get(key)
+        now = time.time()
+
+        if row is not None and row["expires_at"] > now:
+            self._count("hits")
+            self._touch(key, now)
+            return json.loads(row["result"])
+
+        request_headers = {}
+        if row is not None:
+            headers = json.loads(row["headers"])
+            if headers.get("ETag"):
+                request_headers["If-None-Match"] = headers["ETag"]
+            if headers.get("Last-Modified"):
+                request_headers["If-Modified-Since"] = headers["Last-Modified"]
+
+        page, data = fetch(request_headers)
+
+        if row is not None and page is not None and page.status_code == 304:
+            self._count("revalidations")
+            self._connect().execute(
+                "UPDATE entries SET expires_at = ?, last_access = ? WHERE key = ?",
+                (now + self.ttl, now, key),
+            )
+            return json.loads(row["result"])
+
+        self._count("refreshes" if row is not None else "misses")
+        # Only complete, successful analyses are cached; errors and cut-off pages are retried next run
+        if page is not None and page.status_code == 200 and not page.truncated and not page.error:
+            self._put(key, page, data, now)
+        return data
+
+    def _get(self, key):
+        return self._connect().execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+
+    def _touch(self, key, now):
+        self._connect().execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+
+    def _put(self, key, page, data, now):
+        headers = {name: page.headers.get(name) for name in STORED_HEADERS if page.headers.get(name)}
+        result = json.dumps(data)
+        self._connect().execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, page.final_url, page.status_code, json.dumps(headers), result, len(result),
+             now, now + self.ttl, now),
+        )
+        self._evict()
+
+    def _evict(self):
+        conn = self._connect()
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for row in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (row["key"],))
+            count -= 1
+            total -= row["size"]
+            evicted += 1
+        with self._lock:
+            self.counters["evictions"] += evicted
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Process-wide cache, or None when HTTP_CACHE_ENABLED is off.
+    """
+    global _cache
+    if not config.HTTP_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EnrichmentCache()
+    return _cache
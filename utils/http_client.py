@@ -0,0 +1,244 @@
+# utils/http_client.py
+import os
+import socket
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from urllib3.util.timeout import Timeout
+import config
+from utils import tracing
+
+# Client counters, shared by every thread in the process
+_stats = {"requests": 0, "connections": 0, "retries": 0, "dns_hits": 0, "dns_misses": 0}
+_retry_reasons = {}
+_stats_lock = threading.Lock()
+
+def _count(**fields):
+    with _stats_lock:
+        for name, value in fields.items():
+            _stats[name] += value
+
+def http_stats():
+    """
+    Requests sent, new connections opened, connections reused (requests
+    that found a warm keep-alive connection), retries by reason and DNS
+    cache hits/misses for this process.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+        stats["reused"] = max(0, stats["requests"] - stats["connections"])
+        stats["retry_reasons"] = dict(_retry_reasons)
+    return stats
+
+class DnsCache:
+    """
+    Remembers the resolved addresses of each (host, port) for `ttl`
+    seconds; connections go to the first one. An address that fails to
+    connect is moved to the back, so the retry tries the next one (often
+    IPv4 after an unreachable IPv6 address). A host with a single address
+    is forgotten instead, so the retry resolves it again.
+    """
+    def __init__(self, ttl=None):
+        self.ttl = ttl or config.HTTP_DNS_TTL
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((host, port))
+        if entry is not None and entry[1] > now:
+            _count(dns_hits=1)
+            return entry[0][0]
+
+        _count(dns_misses=1)
+        addresses = []
+        for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+            if info[4][0] not in addresses:
+                addresses.append(info[4][0])
+        with self._lock:
+            self._entries[(host, port)] = (addresses, now + self.ttl)
+        return addresses[0]
+
+    def failed(self, host, port, address):
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry is None:
+                return
+            addresses, expires = entry
+            if len(addresses) <= 1:
+                del self._entries[(host, port)]
+            elif address in addresses:
+                rotated = [a for a in addresses if a != address] + [address]
+                self._entries[(host, port)] = (rotated, expires)
+
+_dns_cache = DnsCache()
+
+class _CachedDnsMixin:
+    # Connects to the cached address; TLS still verifies against the real host name
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            self._dns_host = _dns_cache.resolve(host, self.port)
+        except OSError:
+            pass # Let urllib3 resolve it and raise its usual error
+        try:
+            return super()._new_conn()
+        except Exception:
+            _dns_cache.failed(host, self.port, self._dns_host)
+            raise
+        finally:
+            self._dns_host = host
+
+class _CachedDnsHTTPConnection(_CachedDnsMixin, HTTPConnection):
+    pass
+
+class _CachedDnsHTTPSConnection(_CachedDnsMixin, HTTPSConnection):
+    pass
+
+def _time_left():
+    # Seconds until the calling request's deadline (see http_get), or None without one
+    deadline = getattr(_local, "deadline", None)
+    return None if deadline is None else deadline - time.monotonic()
+
+def _cap(seconds, limit):
+    if not isinstance(seconds, (int, float)):
+        return limit
+    return min(seconds, limit)
+
+class _CountingPoolMixin:
+    # urlopen runs once per attempt (retries call it again), _new_conn once per opened socket
+    def urlopen(self, *args, **kwargs):
+        _count(requests=1)
+        left = _time_left()
+        if left is not None and isinstance(kwargs.get("timeout"), Timeout):
+            # Each attempt only gets the time the request has left
+            left = max(left, 0.001)
+            timeout = kwargs["timeout"]
+            kwargs["timeout"] = Timeout(connect=_cap(timeout.connect_timeout, left), read=_cap(timeout.read_timeout, left))
+        return super().urlopen(*args, **kwargs)
+
+    def _new_conn(self):
+        _count(connections=1)
+        return super()._new_conn()
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _CachedDnsHTTPConnection
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _CachedDnsHTTPSConnection
+
+class _CountingRetry(Retry):
+    """
+    urllib3 Retry that counts each retry it allows and caps how long a
+    Retry-After header can make us wait. Under a request deadline (see
+    http_get) it stops retrying once the deadline has passed, and never
+    backs off past it.
+    """
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        left = _time_left()
+        if left is not None and left <= 0:
+            raise MaxRetryError(_pool, url, error or ResponseError("request deadline passed"))
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if error is not None:
+            reason = type(error).__name__
+        else:
+            reason = f"status_{response.status}" if response is not None else "unknown"
+        with _stats_lock:
+            _stats["retries"] += 1
+            _retry_reasons[reason] = _retry_reasons.get(reason, 0) + 1
+        tracing.count("http_retries", reason=reason)
+        return new_retry
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        retry_after = min(retry_after, config.HTTP_RETRY_AFTER_MAX)
+        left = _time_left()
+        return retry_after if left is None else max(0.0, min(retry_after, left))
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        left = _time_left()
+        return backoff if left is None else max(0.0, min(backoff, left))
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+def build_retry():
+    return _CountingRetry(
+        total=config.HTTP_RETRIES,
+        connect=config.HTTP_RETRIES,
+        read=config.HTTP_RETRIES,
+        status=config.HTTP_RETRIES,
+        status_forcelist=config.HTTP_RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        backoff_factor=config.HTTP_BACKOFF_FACTOR,
+        backoff_jitter=config.HTTP_BACKOFF_JITTER,
+        backoff_max=config.HTTP_BACKOFF_MAX,
+        respect_retry_after_header=True,
+        raise_on_status=False, # Hand back the last 429/5xx response instead of raising
+    )
+
+def build_adapter():
+    return _PooledAdapter(
+        pool_connections=config.HTTP_POOL_HOSTS,
+        pool_maxsize=config.HTTP_POOL_SIZE,
+        max_retries=build_retry(),
+    )
+
+_adapter = None
+_adapter_pid = None
+_adapter_lock = threading.Lock()
+_local = threading.local()
+
+def _get_adapter():
+    global _adapter, _adapter_pid
+    with _adapter_lock:
+        # A forked child must not share the parent's sockets
+        if _adapter is None or _adapter_pid != os.getpid():
+            _adapter = build_adapter()
+            _adapter_pid = os.getpid()
+        return _adapter
+
+def get_session():
+    """
+    requests.Session for the calling thread. Every thread's session mounts
+    the same process-wide adapter, so keep-alive connections, TLS sessions
+    and the retry policy are shared while cookies are not.
+    """
+    adapter = _get_adapter()
+    session = getattr(_local, "session", None)
+    if session is None or _local.adapter is not adapter:
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _local.session = session
+        _local.adapter = adapter
+    return session
+
+def http_get(url, deadline=None, **kwargs):
+    """
+    GET through the shared session. deadline (a time.monotonic() value)
+    bounds the whole request: every attempt's connect and read timeouts,
+    the backoff between retries and Retry-After waits are cut to the time
+    left, and no retry starts after it.
+    """
+    if deadline is None:
+        return get_session().get(url, **kwargs)
+    _local.deadline = deadline
+    try:
+        return get_session().get(url, **kwargs)
+    finally:
+        _local.deadline = None
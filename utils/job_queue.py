@@ -0,0 +1,305 @@
+# utils/job_queue.py
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+import config
+
+FINISHED_STATUSES = ("finished", "failed")
+STALE_ERROR = "Interrupted: the worker running this job stopped (server restart?). Submit it again."
+
+def new_job(params):
+    now = time.time()
+    return {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "params": params,
+        "progress": {
+            "queries_total": 0,
+            "queries_done": 0,
+            "leads_scraped": 0,
+            "leads_enriched": 0,
+            "leads_qualified": 0,
+        },
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+class InMemoryJobStore:
+    """
+    Jobs live in this process only. Fine for the CLI and a single gunicorn worker.
+    """
+    def __init__(self):
+        self._jobs = {}
+        self._pending = deque()
+        self._cond = threading.Condition()
+
+    def enqueue(self, params):
+        job = new_job(params)
+        with self._cond:
+            self._jobs[job["id"]] = job
+            self._pending.append(job["id"])
+            self._cond.notify()
+        return job["id"]
+
+    def claim(self, timeout):
+        """
+        Marks the oldest queued job as running and returns it (None on timeout).
+        """
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            if not self._pending:
+                return None
+            job = self._jobs[self._pending.popleft()]
+            job["status"] = "running"
+            job["updated_at"] = time.time()
+            return json.loads(json.dumps(job))
+
+    def update(self, job_id, **fields):
+        with self._cond:
+            job = self._jobs[job_id]
+            progress = fields.pop("progress", None)
+            if progress:
+                job["progress"].update(progress)
+            job.update(fields)
+            job["updated_at"] = time.time()
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def touch(self, job_id):
+        with self._cond:
+            self._jobs[job_id]["updated_at"] = time.time()
+
+    def fail_stale(self, max_age):
+        # Jobs here die with the process, so none are ever left behind running
+        return 0
+
+class SQLiteJobStore:
+    """
+    Jobs persist in a SQLite file, so every gunicorn worker sees the same
+    queue and status, and queued jobs survive a restart. No broker needed.
+    """
+    def __init__(self, path=None):
+        self.path = path or config.JOB_DB_PATH
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    progress TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, params):
+        job = new_job(params)
+        self._connect().execute(
+            "INSERT INTO jobs VALUES (?, ?, ?, ?, NULL, NULL, ?, ?)",
+            (job["id"], job["status"], json.dumps(job["params"]), json.dumps(job["progress"]),
+             job["created_at"], job["updated_at"]),
+        )
+        return job["id"]
+
+    def claim(self, timeout):
+        deadline = time.time() + timeout
+        conn = self._connect()
+        while True:
+            # BEGIN IMMEDIATE takes the write lock, so two workers never claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                        (time.time(), row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if row:
+                job = self._row_to_job(row)
+                job["status"] = "running"
+                return job
+            if time.time() >= deadline:
+                return None
+            time.sleep(min(1.0, max(0.0, deadline - time.time())))
+
+    def update(self, job_id, **fields):
+        conn = self._connect()
+        progress = fields.pop("progress", None)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if progress:
+                row = conn.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                merged = json.loads(row["progress"])
+                merged.update(progress)
+                fields["progress"] = json.dumps(merged)
+            if "result" in fields:
+                fields["result"] = json.dumps(fields["result"])
+            fields["updated_at"] = time.time()
+            columns = ", ".join(f"{name} = ?" for name in fields)
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, job_id):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def touch(self, job_id):
+        self._connect().execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def fail_stale(self, max_age):
+        """
+        Marks running jobs whose worker stopped heartbeating max_age
+        seconds ago (a restart or crash) as failed; returns how many.
+        Jobs other live processes are running keep heartbeating.
+        """
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE status = 'running' AND updated_at < ?",
+            (STALE_ERROR, now, now - max_age),
+        )
+        return cursor.rowcount
+
+class JobQueue:
+    """
+    Local worker pool: `workers` threads claim queued jobs from the store
+    and run them with `runner(progress=callback, **params)`.
+    """
+    def __init__(self, runner, store=None, workers=None):
+        self.runner = runner
+        self.store = store or create_store()
+        self.workers = workers or config.JOB_WORKERS
+        self._threads = []
+        self._stopping = threading.Event()
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        # Jobs left running by a process that died would otherwise stay "running" forever
+        stale = self.store.fail_stale(config.JOB_STALE_SECONDS)
+        if stale:
+            print(f"Marked {stale} interrupted jobs as failed.")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        self._stopping.set()
+
+    def submit(self, params):
+        return self.store.enqueue(params)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job = self.store.claim(timeout=1.0)
+            if job is None:
+                continue
+            self._run(job)
+
+    def _heartbeat(self):
+        # Running jobs are touched every JOB_HEARTBEAT_SECONDS, so fail_stale can tell them from orphans
+        while not self._stopping.wait(config.JOB_HEARTBEAT_SECONDS):
+            with self._running_lock:
+                running = list(self._running)
+            for job_id in running:
+                try:
+                    self.store.touch(job_id)
+                except Exception as e:
+                    print(f"Job heartbeat failed for {job_id}: {e}")
+
+    def _run(self, job):
+        job_id = job["id"]
+        print(f"Starting job {job_id}")
+        with self._running_lock:
+            self._running.add(job_id)
+
+        def progress(**fields):
+            self.store.update(job_id, progress=fields)
+
+        try:
+            result = self.runner(progress=progress, **job["params"])
+            self.store.update(job_id, status="finished", result=result)
+            print(f"Finished job {job_id}")
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.update(job_id, status="failed", error=str(e))
+        finally:
+            with self._running_lock:
+                self._running.discard(job_id)
+
+    def events(self, job_id, poll_interval=0.5, max_seconds=None):
+        """
+        Yields the job every time it changes, until it finishes or
+        max_seconds pass (the client then polls GET /jobs/<id>).
+        Polls the store so it works with either backend and across processes.
+        """
+        last_update = None
+        deadline = time.time() + max_seconds if max_seconds else None
+        while True:
+            job = self.store.get(job_id)
+            if job is None:
+                return
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+            if deadline and time.time() >= deadline:
+                return
+            time.sleep(poll_interval)
+
+def create_store(backend=None):
+    backend = backend or config.JOB_BACKEND
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    if backend == "memory":
+        return InMemoryJobStore()
+    raise ValueError(f"Unknown job backend: {backend}")
@@ -0,0 +1,90 @@
+# utils/journal.py
+import json
+import os
+import threading
+import config
+
+class RunJournal:
+    """
+    Append-only, fsync'd log of a run's progress, used to resume after a
+    crash. Events (one JSON object per line):
+        start      run parameters (city, queries, max_leads, filename)
+        harvested  a raw lead extracted for a query
+        query_done a query finished; its harvested leads are complete
+                   (tiled runs also record the tile's feed size as "cards")
+        enriched   a lead after website enrichment
+        finished   the run's final result
+    """
+    def __init__(self, run_id, directory=None):
+        self.run_id = run_id
+        self.directory = directory or config.JOURNAL_DIR
+        self.path = os.path.join(self.directory, f"{run_id}.jsonl")
+        self._lock = threading.Lock()
+        self._file = None
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def append(self, event_type, **fields):
+        fields["type"] = event_type
+        line = json.dumps(fields) + "\n"
+        with self._lock:
+            if self._file is None:
+                if not os.path.exists(self.directory):
+                    os.makedirs(self.directory)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def load(self):
+        """
+        Replays the journal into a JournalState. A torn last line (crash
+        mid-write) is ignored.
+        """
+        state = JournalState()
+        if not self.exists():
+            return state
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                state.apply(event)
+        return state
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class JournalState:
+    def __init__(self):
+        self.params = None
+        self.harvested = []  # (query, raw lead) in harvest order
+        self.done_queries = set()
+        self.query_cards = {}  # query -> feed size, for tiled runs
+        self.enriched = {}  # business name -> enriched lead
+        self.result = None
+
+    def apply(self, event):
+        event_type = event.get("type")
+        if event_type == "start":
+            self.params = event["params"]
+        elif event_type == "harvested":
+            self.harvested.append((event["query"], event["lead"]))
+        elif event_type == "query_done":
+            self.done_queries.add(event["query"])
+            self.query_cards[event["query"]] = event.get("cards")
+        elif event_type == "enriched":
+            self.enriched[event["lead"]["Business Name"]] = event["lead"]
+        elif event_type == "finished":
+            self.result = event["result"]
+
+    def harvested_names(self, query=None):
+        return [
+            lead.get("Business Name") for lead_query, lead in self.harvested
+            if query is None or lead_query == query
+        ]
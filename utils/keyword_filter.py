@@ -0,0 +1,81 @@
+# utils/keyword_filter.py
+import threading
+from collections import deque
+import config
+
+class KeywordMatcher:
+    """
+    Case-insensitive substring matcher for many keywords at once
+    (Aho-Corasick automaton). Built once; matching a name costs one pass
+    over its characters however long the keyword list is.
+    """
+    def __init__(self, keywords):
+        self.keywords = [k for k in keywords if k]
+        # goto[state] maps a character to the next state
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword.lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                    self._goto[state][char] = next_state
+                state = next_state
+            if self._output[state] is None:
+                self._output[state] = keyword
+
+        # Breadth-first pass to link each state to its longest proper suffix state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def match(self, text):
+        """
+        Returns the first keyword found in text, or None.
+        """
+        if not text or not self.keywords:
+            return None
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+_matcher = None
+_matcher_key = None
+_matcher_lock = threading.Lock()
+
+def get_skip_matcher():
+    """
+    Process-wide matcher for config.SKIP_KEYWORDS, rebuilt only if the list
+    is replaced or grows/shrinks. Callers resolve it once per run rather
+    than once per lead.
+    """
+    global _matcher, _matcher_key
+    key = (id(config.SKIP_KEYWORDS), len(config.SKIP_KEYWORDS))
+    matcher = _matcher
+    if matcher is not None and _matcher_key == key:
+        return matcher
+    with _matcher_lock:
+        if _matcher is None or _matcher_key != key:
+            _matcher = KeywordMatcher(config.SKIP_KEYWORDS)
+            _matcher_key = key
+        return _matcher
@@ -0,0 +1,125 @@
+# utils/lead_index.py
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, unquote
+import config
+
+def normalize_text(text):
+    return " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+def normalize_phone(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 10 else ""
+
+def website_domain(url):
+    host = urlsplit(url or "").hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+def place_keys(maps_url):
+    """
+    Keys available straight from a feed card link, before any click.
+    """
+    keys = []
+    if not maps_url:
+        return keys
+    match = re.search(r"!19s(ChIJ[\w-]+)", maps_url) or re.search(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)", maps_url)
+    if match:
+        keys.append(f"place:{match.group(1)}")
+        return keys
+    # No place ID: the full path (name plus coordinates in /data=) still pins one location
+    path = unquote(urlsplit(maps_url).path)
+    if "/maps/place/" in path and "/data=" in path:
+        keys.append(f"url:{path.lower()}")
+    return keys
+
+def lead_keys(lead):
+    """
+    Every stable identifier a scraped lead has. A chain's shared website
+    domain only identifies a lead together with its name.
+    """
+    keys = place_keys(lead.get("Maps URL"))
+    phone = normalize_phone(lead.get("Phone"))
+    if phone:
+        keys.append(f"phone:{phone}")
+    name = normalize_text(lead.get("Business Name"))
+    domain = website_domain(lead.get("Website"))
+    if domain and name:
+        keys.append(f"domain:{domain}|{name}")
+    address = normalize_text(lead.get("Address"))
+    if name and address:
+        keys.append(f"name_address:{name}|{address}")
+    return keys
+
+class LeadIndex:
+    """
+    Persistent index of leads seen in earlier runs, so re-scrapes skip
+    businesses we already have. A lead is known when any of its keys was
+    recorded less than refresh_days ago (None: never refresh).
+    """
+    def __init__(self, path=None, refresh_days=None):
+        self.path = path or config.LEAD_INDEX_PATH
+        self.refresh_days = config.LEAD_REFRESH_DAYS if refresh_days is None else refresh_days
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS lead_keys (
+                key TEXT PRIMARY KEY,
+                name TEXT,
+                last_seen REAL NOT NULL
+            )
+        """)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def is_known(self, keys):
+        if not keys:
+            return False
+        placeholders = ", ".join("?" for _ in keys)
+        row = self._connect().execute(
+            f"SELECT MAX(last_seen) FROM lead_keys WHERE key IN ({placeholders})", keys
+        ).fetchone()
+        last_seen = row[0]
+        if last_seen is None:
+            return False
+        if self.refresh_days is None:
+            return True
+        return time.time() - last_seen < self.refresh_days * 86400
+
+    def record(self, lead):
+        keys = lead_keys(lead)
+        if not keys:
+            return
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT OR REPLACE INTO lead_keys VALUES (?, ?, ?)",
+            [(key, lead.get("Business Name"), now) for key in keys],
+        )
+        conn.execute("COMMIT")
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_lead_index():
+    """
+    Process-wide index, or None when LEAD_INDEX_ENABLED is off.
+    """
+    global _index
+    if not config.LEAD_INDEX_ENABLED:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = LeadIndex()
+    return _index
@@ -0,0 +1,247 @@
+# utils/lead_store.py
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+import config
+from utils.file_manager import HEADERS
+from utils.lead_index import lead_keys, normalize_text, website_domain
+from utils.us_states import address_state, state_code
+
+# Filters query() and iter_leads() accept
+FILTERS = ("city", "state", "min_score", "has_email", "domain", "since", "run_id")
+
+def lead_id(lead):
+    """
+    Stable identity of a lead across runs: its Maps place key when the
+    card link has one, then phone, domain+name and name+address (see
+    lead_keys), falling back to name+city.
+    """
+    keys = lead_keys(lead)
+    if keys:
+        return keys[0]
+    return f"name_city:{normalize_text(lead.get('Business Name'))}|{normalize_text(lead.get('City'))}"
+
+def quality_score(lead):
+    try:
+        return float(lead.get("Quality Score"))
+    except (TypeError, ValueError):
+        return None
+
+def encode_cursor(scraped_at, row_id):
+    return base64.urlsafe_b64encode(json.dumps([scraped_at, row_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        scraped_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(scraped_at), str(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+class SQLiteLeadStore:
+    """
+    Every qualified lead of every run in one SQLite file, upserted on
+    lead_id() so a re-scrape refreshes the row instead of adding one.
+    The filterable fields are indexed columns; the HEADERS row is kept as
+    JSON. A backend needs upsert(leads, run_id), query(cursor, limit,
+    **filters) and iter_leads(**filters).
+    """
+    def __init__(self, path=None):
+        self.path = path or config.LEAD_STORE_PATH
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS leads (
+                id TEXT PRIMARY KEY,
+                city TEXT COLLATE NOCASE,
+                state TEXT COLLATE NOCASE,
+                quality_score REAL,
+                email TEXT,
+                domain TEXT,
+                maps_url TEXT,
+                search_query TEXT,
+                run_id TEXT,
+                first_seen REAL NOT NULL,
+                scraped_at REAL NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS leads_city ON leads (city, scraped_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS leads_score ON leads (quality_score)")
+        conn.execute("CREATE INDEX IF NOT EXISTS leads_domain ON leads (domain)")
+        conn.execute("CREATE INDEX IF NOT EXISTS leads_scraped_at ON leads (scraped_at, id)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def upsert(self, leads, run_id=None):
+        """
+        Writes a batch of leads in one transaction. first_seen survives
+        the update; everything else takes the latest scrape.
+        """
+        if not leads:
+            return 0
+        now = time.time()
+        rows = []
+        for lead in leads:
+            row = {k: lead.get(k, "") for k in HEADERS}
+            row["State"] = row["State"] or address_state(lead.get("Address")) or address_state(row["City"])
+            rows.append((
+                lead_id(lead), row["City"], row["State"], quality_score(lead), row["Email"],
+                website_domain(row["Website"]), lead.get("Maps URL"), lead.get("Search Query"), run_id,
+                now, now, json.dumps(row),
+            ))
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("""
+                INSERT INTO leads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    city = excluded.city, state = excluded.state, quality_score = excluded.quality_score,
+                    email = excluded.email, domain = excluded.domain, maps_url = excluded.maps_url,
+                    search_query = excluded.search_query, run_id = excluded.run_id,
+                    scraped_at = excluded.scraped_at, data = excluded.data
+            """, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def _where(self, city=None, state=None, min_score=None, has_email=None, domain=None, since=None,
+               run_id=None):
+        clauses = []
+        args = []
+        if city:
+            clauses.append("city = ?")
+            args.append(city)
+        if state:
+            # "TX", "tx" and "Texas" all match the stored code
+            clauses.append("state = ?")
+            args.append(state_code(state) or state)
+        if min_score is not None:
+            clauses.append("quality_score >= ?")
+            args.append(float(min_score))
+        if has_email is not None:
+            clauses.append("COALESCE(email, '') != ''" if has_email else "COALESCE(email, '') = ''")
+        if domain:
+            clauses.append("domain = ?")
+            args.append(website_domain(domain if "//" in domain else f"//{domain}"))
+        if since is not None:
+            clauses.append("scraped_at >= ?")
+            args.append(float(since))
+        if run_id:
+            clauses.append("run_id = ?")
+            args.append(run_id)
+        return clauses, args
+
+    def _row_to_lead(self, row):
+        return {
+            "id": row["id"],
+            "run_id": row["run_id"],
+            "search_query": row["search_query"],
+            "maps_url": row["maps_url"],
+            "first_seen": row["first_seen"],
+            "scraped_at": row["scraped_at"],
+            "lead": json.loads(row["data"]),
+        }
+
+    def query(self, cursor=None, limit=None, **filters):
+        """
+        One page of leads, newest scrape first, and the cursor of the next
+        page (None on the last one). The cursor is keyset-based, so pages
+        stay cheap and stable however deep the client pages.
+        """
+        limit = limit or config.LEAD_PAGE_SIZE
+        clauses, args = self._where(**filters)
+        if cursor:
+            scraped_at, row_id = decode_cursor(cursor)
+            clauses.append("(scraped_at < ? OR (scraped_at = ? AND id < ?))")
+            args += [scraped_at, scraped_at, row_id]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT * FROM leads {where} ORDER BY scraped_at DESC, id DESC LIMIT ?", (*args, limit + 1)
+        ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["scraped_at"], rows[-1]["id"])
+        return [self._row_to_lead(row) for row in rows], next_cursor
+
+    def iter_leads(self, **filters):
+        """
+        Every matching HEADERS row, newest first, read in chunks (for exports).
+        """
+        clauses, args = self._where(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(f"SELECT data FROM leads {where} ORDER BY scraped_at DESC, id DESC", args)
+        while True:
+            chunk = rows.fetchmany(config.OUTPUT_CHUNK_ROWS)
+            if not chunk:
+                return
+            for row in chunk:
+                yield json.loads(row["data"])
+
+class LeadStoreWriter:
+    """
+    Buffers a run's leads and upserts them LEAD_STORE_BATCH_SIZE at a
+    time. Leads still buffered when a run crashes are written again when
+    it resumes, since the journal replays them and upserts are idempotent.
+    """
+    def __init__(self, store, run_id=None, batch_size=None):
+        self.store = store
+        self.run_id = run_id
+        self.batch_size = batch_size or config.LEAD_STORE_BATCH_SIZE
+        self.count = 0
+        self._pending = []
+
+    def write(self, lead):
+        self._pending.append(dict(lead))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.count += self.store.upsert(self._pending, self.run_id)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def create_lead_store(backend=None):
+    backend = backend or config.LEAD_STORE_BACKEND
+    if backend == "sqlite":
+        return SQLiteLeadStore()
+    raise ValueError(f"Unknown lead store backend: {backend}")
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_lead_store():
+    """
+    Process-wide store, or None when LEAD_STORE_ENABLED is off.
+    """
+    global _store
+    if not config.LEAD_STORE_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = create_lead_store()
+    return _store
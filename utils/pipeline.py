@@ -0,0 +1,53 @@
+# utils/pipeline.py
+import queue
+import threading
+from utils import tracing
+
+_DONE = object()
+
+class _StageError:
+    def __init__(self, error):
+        self.error = error
+
+def buffered(iterable, maxsize=None, name="stage"):
+    """
+    Runs `iterable` in a background thread and yields its items through a
+    bounded queue. When the consumer falls behind the producer blocks on
+    the full queue (backpressure) instead of buffering without limit.
+    Exceptions raised by the producer are re-raised in the consumer.
+    """
+    maxsize = maxsize or 1
+    items = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_StageError(e))
+
+    thread = threading.Thread(target=tracing.bind(produce), name=f"pipeline-{name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # Consumer finished or bailed out: let the producer thread exit
+        stopped.set()
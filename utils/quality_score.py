@@ -1,84 +1,41 @@
 # utils/quality_score.py
-import requests
-from bs4 import BeautifulSoup
-import re
-
 def check_ssl(url):
     return url.startswith("https")
 
-def check_mobile_friendly(soup):
-    viewport = soup.find("meta", attrs={"name": "viewport"})
-    return viewport is not None
-
-def check_modern_tech(soup):
-    # Heuristic: Check for modern frameworks or meta generators
-    html_str = str(soup).lower()
-    modern_keywords = [
-        "react", "next.js", "gatsby", "vue", "nuxt", "tailwind", "bootstrap",
-        "wix", "squarespace", "webflow", "shopify"
-    ]
-    for keyword in modern_keywords:
-        if keyword in html_str:
-            return True
-    return False
-
-def check_copyright_year(soup):
-    html_str = str(soup).lower()
-    # Simple regex to find "copyright 20XX" or "© 20XX"
-    matches = re.findall(r"(?:copyright|©)\s*(?:20\d{2})", html_str)
-    if matches:
-        # Get the max year found
-        years = []
-        for match in matches:
-            try:
-                year = int(re.search(r"20\d{2}", match).group(0))
-                years.append(year)
-            except:
-                pass
-        if years:
-            return max(years)
-    return None
-
-def calculate_quality_score(url):
+def calculate_quality_score(page):
     """
-    Analyzes the website and returns a Quality Score.
+    Scores an already fetched page (see scraper.website_scraper.Page).
+    Uses the final URL after redirects, the status code and the page's
+    signals (utils.signals).
     10 = No website / Connection Error
     8 = Outdated / Not mobile friendly / HTTP only
     5 = Average
     0 = Modern / High Quality
     """
-    if not url:
-        return 10
-    
-    try:
-        # Add timeout to avoid hanging
-        response = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-        if response.status_code != 200:
-            return 10
-    except Exception:
+    if page is None or page.status_code != 200:
         return 10
 
-    soup = BeautifulSoup(response.text, "lxml")
+    signals = page.signals
     
     score = 5 # Default average
     
     # Check 1: SSL
-    if not check_ssl(response.url):
+    if not check_ssl(page.final_url):
         return 8 # Not secure = Outdated
         
     # Check 2: Mobile Friendly (Viewport)
-    if not check_mobile_friendly(soup):
+    if not signals.has_viewport:
         return 8 # Not mobile friendly
         
     # Check 3: Modern Tech
-    if check_modern_tech(soup):
+    if signals.has_modern_tech:
         # If it's built with modern tech, it's likely a 0 (Modern/High Quality)
         # But maybe we want to target them if they are missing something specific? 
         # For now, following instructions: 0 = Modern high-quality website (skip outreach)
         return 0
         
     # Check 4: Copyright Year
-    latest_year = check_copyright_year(soup)
+    latest_year = signals.copyright_year
     if latest_year and latest_year < 2020:
         return 8 # Old copyright
         
@@ -0,0 +1,88 @@
+# utils/rate_limit.py
+import threading
+import time
+from types import SimpleNamespace
+import config
+from utils import tracing
+
+class RateLimiter:
+    """
+    Spaces calls to wait() at least 60/per_minute seconds apart; 0 means
+    unlimited. The next free slot lives in `slot.value`, so a limiter built
+    on a multiprocessing Value and Lock holds one limit across processes.
+    """
+    def __init__(self, name, per_minute, slot=None, lock=None):
+        self.name = name
+        self.per_minute = per_minute or 0
+        self.interval = 60.0 / self.per_minute if self.per_minute else 0.0
+        self.slot = slot if slot is not None else SimpleNamespace(value=0.0)
+        self.lock = lock or threading.Lock()
+        self.stats = {"calls": 0, "waited_s": 0.0}
+
+    def wait(self):
+        """
+        Blocks until this caller's slot comes up; returns the seconds waited.
+        """
+        if not self.interval:
+            return 0.0
+        with self.lock:
+            now = time.time()
+            start = max(now, self.slot.value)
+            self.slot.value = start + self.interval
+            delay = start - now
+            self.stats["calls"] += 1
+            self.stats["waited_s"] += delay
+        if delay > 0:
+            time.sleep(delay)
+            tracing.count("rate_limit_wait_seconds", delay, limiter=self.name)
+        return delay
+
+def default_rates():
+    return {"maps": config.MAPS_RATE_PER_MINUTE, "web": config.FETCH_RATE_PER_MINUTE}
+
+_limiters = {}
+_shared = None
+_limiters_lock = threading.Lock()
+
+def get_limiter(name):
+    """
+    Process-wide limiter: "maps" (searches, card clicks and feed scrolls)
+    or "web" (website fetches).
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(name, default_rates().get(name))
+        return _limiters[name]
+
+def install_shared_limiters(shared):
+    """
+    Replaces this process's limiters with ones backed by the shared slots
+    from shared_limiters(). Used as a process pool initializer.
+    """
+    global _shared
+    with _limiters_lock:
+        _shared = shared
+        for name, (per_minute, slot, lock) in shared.items():
+            _limiters[name] = RateLimiter(name, per_minute, slot, lock)
+
+def shared_limiters(context, rates=None):
+    """
+    Slots that worker processes started from `context` can share (pass them
+    to install_shared_limiters). This process switches to them as well; a
+    process that already uses shared slots hands out the same ones.
+    rates overrides default_rates() per limiter name.
+    """
+    if _shared is not None:
+        return _shared
+    limits = default_rates()
+    limits.update(rates or {})
+    shared = {name: (per_minute, context.Value("d", 0.0, lock=False), context.Lock())
+              for name, per_minute in limits.items()}
+    install_shared_limiters(shared)
+    return shared
+
+def rate_limit_stats():
+    with _limiters_lock:
+        return {name: {"per_minute": limiter.per_minute, "calls": limiter.stats["calls"],
+                       "waited_s": round(limiter.stats["waited_s"], 1)}
+                for name, limiter in _limiters.items()}
@@ -0,0 +1,102 @@
+# utils/signals.py
+import html as html_lib
+import re
+
+# Email Regex
+EMAIL_REGEX = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+# Phone Regex (US focused)
+PHONE_REGEX = r'(\+?1[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
+
+MODERN_TECH_KEYWORDS = [
+    "react", "next.js", "gatsby", "vue", "nuxt", "tailwind", "bootstrap",
+    "wix", "squarespace", "webflow", "shopify"
+]
+
+BOOKING_KEYWORDS = ["book online", "schedule appointment", "request appointment", "book now"]
+
+# One pass over the lowercased HTML finds every markup-level signal.
+# The lookahead lists the characters a signal can start with, so most
+# positions are rejected before any alternative is tried. Links and the
+# viewport tag are read in lookaheads, so tech keywords inside a tag (an
+# href, a data- attribute) are still found.
+HTML_SIGNALS = re.compile(
+    r"(?=[<c©&" + "".join(sorted({k[0] for k in MODERN_TECH_KEYWORDS})) + "])(?:"
+    r"<meta\b(?=(?P<viewport>[^>]*(?<![\w-])name\s*=\s*(?:\"viewport\"|'viewport'|viewport(?=[\s/>]))))"
+    r"|(?:copyright|©|&copy;|&#169;|&#xa9;)(?:\s|&nbsp;)*(?P<year>20\d{2})"
+    r"|<a\b(?=[^>]*?\bhref\s*=\s*(?:\"(?P<href_dq>[^\"]*)\"|'(?P<href_sq>[^']*)'))"
+    r"|(?P<tech>" + "|".join(re.escape(k) for k in MODERN_TECH_KEYWORDS) + ")"
+    r")"
+)
+
+# One pass over the visible text finds every contact-level signal.
+# Emails only start where a word starts, so the inside of a long word is
+# skipped instead of being tried (and backtracked) from every position.
+# Phones and booking phrases may also be glued to a word ("Tel5551234567"),
+# as the per-signal searches allowed; they are only tried at a character
+# they can start with.
+TEXT_SIGNALS = re.compile(
+    r"(?<![a-z0-9._%+-])(?P<email>" + EMAIL_REGEX + ")"
+    r"|(?=[0-9+(" + "".join(sorted({k[0] for k in BOOKING_KEYWORDS})) + "])(?:"
+    r"(?P<phone>" + PHONE_REGEX + ")"
+    r"|(?P<booking>" + "|".join(re.escape(k) for k in BOOKING_KEYWORDS) + ")"
+    r")",
+    re.IGNORECASE,
+)
+
+# Script, style and comment bodies are not visible text
+HIDDEN_REGEX = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+TAG_REGEX = re.compile(r"<[^>]*>")
+
+class PageSignals:
+    """
+    Everything scoring and contact extraction need from a page, produced
+    by scan_signals in one pass over the HTML and one over its text.
+    """
+    def __init__(self):
+        self.has_viewport = False
+        self.has_modern_tech = False
+        self.copyright_year = None
+        self.has_booking = False
+        self.emails = set()
+        self.phones = set()
+        self.links = []
+
+def html_to_text(html):
+    return html_lib.unescape(TAG_REGEX.sub(" ", HIDDEN_REGEX.sub(" ", html)))
+
+def scan_signals(html, text=None):
+    """
+    Extracts all signals from raw HTML. `text` defaults to the visible
+    text (see html_to_text).
+    """
+    signals = PageSignals()
+    lower = html.lower()
+
+    for match in HTML_SIGNALS.finditer(lower):
+        kind = match.lastgroup
+        if kind == "viewport":
+            signals.has_viewport = True
+        elif kind == "year":
+            year = int(match.group("year"))
+            if signals.copyright_year is None or year > signals.copyright_year:
+                signals.copyright_year = year
+        elif kind in ("href_dq", "href_sq"):
+            # Slice the original HTML so the link keeps its case
+            start, end = match.span(kind)
+            signals.links.append(html_lib.unescape(html[start:end]))
+        elif kind == "tech":
+            signals.has_modern_tech = True
+
+    if text is None:
+        text = html_to_text(html)
+
+    for match in TEXT_SIGNALS.finditer(text):
+        kind = match.lastgroup
+        if kind == "email":
+            signals.emails.add(match.group("email"))
+        elif kind == "phone":
+            signals.phones.add(match.group("phone"))
+        elif kind == "booking":
+            signals.has_booking = True
+
+    return signals
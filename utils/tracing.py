@@ -0,0 +1,271 @@
+# utils/tracing.py
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+import config
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRIC_PREFIX = "scraper_"
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _render_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+class Histogram:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+class Metrics:
+    """
+    Process-wide counters and histograms, rendered for Prometheus by /metrics.
+    Values accumulate over every run the process has done.
+    """
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self):
+        """
+        Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, label_key), value in sorted(self._counters.items()):
+                metric = f"{METRIC_PREFIX}{name}_total"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{_render_labels(label_key)} {value}")
+
+            for (name, label_key), histogram in sorted(self._histograms.items()):
+                metric = f"{METRIC_PREFIX}{name}"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_render_labels(label_key, [('le', bound)])} {cumulative}")
+                lines.append(f"{metric}_bucket{_render_labels(label_key, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{metric}_sum{_render_labels(label_key)} {histogram.sum:.6f}")
+                lines.append(f"{metric}_count{_render_labels(label_key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def _percentile(ordered, pct):
+    # Nearest-rank percentile of an already sorted list
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+class RunTrace:
+    """
+    Spans and counters of one scraper run, summarized to JSON when the run
+    ends. Durations are kept per stage; only the slowest spans keep their
+    attributes (lead, query, url...).
+    """
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.durations = {}
+        self.counters = {}
+        self.errors = {}
+        self.slowest = []
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add_span(self, name, duration, attrs, error):
+        with self._lock:
+            self.durations.setdefault(name, []).append(duration)
+            if len(self.slowest) < config.TRACE_SLOWEST_SPANS or duration > self.slowest[-1]["seconds"]:
+                span = {"stage": name, "seconds": round(duration, 4), **attrs}
+                if error:
+                    span["error"] = error
+                self.slowest.append(span)
+                self.slowest.sort(key=lambda s: -s["seconds"])
+                del self.slowest[config.TRACE_SLOWEST_SPANS:]
+
+    def count(self, name, value=1, **labels):
+        key = name
+        if labels:
+            key += "{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def count_error(self, stage, error_type):
+        key = f"{stage}:{error_type}"
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self):
+        with self._lock:
+            stages = {}
+            for name, durations in sorted(self.durations.items()):
+                ordered = sorted(durations)
+                stages[name] = {
+                    "count": len(ordered),
+                    "total_s": round(sum(ordered), 3),
+                    "p50_ms": round(_percentile(ordered, 50) * 1000, 2),
+                    "p95_ms": round(_percentile(ordered, 95) * 1000, 2),
+                    "max_ms": round(ordered[-1] * 1000, 2),
+                }
+            return {
+                "run_id": self.run_id,
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+                "duration_s": round(time.perf_counter() - self._start, 3),
+                "stages": stages,
+                "counters": dict(sorted(self.counters.items())),
+                "errors": dict(sorted(self.errors.items())),
+                "slowest_spans": list(self.slowest),
+            }
+
+    def write(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+_current_run = contextvars.ContextVar("run_trace", default=None)
+
+def start_run(run_id):
+    """
+    Starts collecting a RunTrace for the calling context (None when
+    TRACING_ENABLED is off). Threads started with bind() report to it too.
+    """
+    if not config.TRACING_ENABLED:
+        return None
+    trace = RunTrace(run_id)
+    trace._token = _current_run.set(trace)
+    return trace
+
+def end_run(trace):
+    if trace is not None and trace._token is not None:
+        _current_run.reset(trace._token)
+        trace._token = None
+
+def bind(fn):
+    """
+    Wraps fn so it reports to the caller's run when called on another thread.
+    """
+    if not config.TRACING_ENABLED:
+        return fn
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self._start = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        metrics.observe("stage_duration_seconds", duration, stage=self.name)
+        error = exc_type.__name__ if exc_type is not None else None
+        if error:
+            metrics.inc("errors", stage=self.name, type=error)
+        trace = _current_run.get()
+        if trace is not None:
+            trace.add_span(self.name, duration, self.attrs, error)
+            if error:
+                trace.count_error(self.name, error)
+        return False
+
+class _NoopSpan:
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name, **attrs):
+    """
+    Times a block as one `name` stage:
+
+        with span("fetch", url=url) as s:
+            ...
+            s.set(bytes=len(content))
+
+    Costs one config lookup when tracing is off.
+    """
+    if not config.TRACING_ENABLED:
+        return _NOOP_SPAN
+    return Span(name, attrs)
+
+def count(name, value=1, **labels):
+    """
+    Adds to a counter of the current run and of the process.
+    """
+    if not config.TRACING_ENABLED:
+        return
+    metrics.inc(name, value, **labels)
+    trace = _current_run.get()
+    if trace is not None:
+        trace.count(name, value, **labels)
+
+def count_error(stage, error):
+    """
+    Records an error that was handled (not raised through a span).
+    """
+    if not config.TRACING_ENABLED:
+        return
+    error_type = type(error).__name__
+    metrics.inc("errors", stage=stage, type=error_type)
+    trace = _current_run.get()
+    if trace is not None:
+        trace.count_error(stage, error_type)
@@ -0,0 +1,49 @@
+# utils/us_states.py
+import re
+
+US_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "DC": "District of Columbia",
+    "FL": "Florida", "GA": "Georgia", "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois",
+    "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana",
+    "ME": "Maine", "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota",
+    "MS": "Mississippi", "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada",
+    "NH": "New Hampshire", "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York",
+    "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon",
+    "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota",
+    "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont", "VA": "Virginia",
+    "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+    "PR": "Puerto Rico",
+}
+STATE_NAMES = {name.lower(): code for code, name in US_STATES.items()}
+
+COUNTRY_PARTS = ("usa", "us", "united states", "united states of america")
+ZIP_REGEX = re.compile(r"\s+\d{5}(?:-\d{4})?$")
+
+def state_code(text):
+    """
+    "TX", "tx" or "Texas" -> "TX"; "" when it is not a US state.
+    """
+    text = (text or "").strip().rstrip(".")
+    if text.upper() in US_STATES:
+        return text.upper()
+    return STATE_NAMES.get(text.lower(), "")
+
+def address_state(text):
+    """
+    The state of a Maps address or "City, ST" string:
+    "500 Congress Ave, Austin, TX 78701, United States" and "Austin, Texas"
+    both give "TX". Text without a comma-separated state part gives "".
+    """
+    parts = [part.strip() for part in (text or "").split(",") if part.strip()]
+    while parts and parts[-1].lower() in COUNTRY_PARTS:
+        parts.pop()
+    if len(parts) < 2:
+        return ""
+    last = ZIP_REGEX.sub("", parts[-1]).strip()
+    code = state_code(last)
+    if code:
+        return code
+    # "Austin TX 78701": a trailing upper-case code after the city
+    match = re.search(r"\s([A-Z]{2})$", last)
+    return match.group(1) if match and match.group(1) in US_STATES else ""